@@ -4,7 +4,7 @@ from django.utils.html import format_html
 from django.urls import reverse
 from django.contrib import messages
 from django.utils import timezone
-from .models import VolleyballCourt, UserProfile, Game, GameParticipation, Friendship
+from .models import VolleyballCourt, UserProfile, Game, GameParticipation, Friendship, PricingRule, BlockedInterval
 
 class VolleyballCourtAdmin(admin.ModelAdmin):
     list_display = [
@@ -182,10 +182,34 @@ class SimpleVolleyballCourtAdmin(admin.ModelAdmin):
     list_filter = ['status', 'court_type', 'city']
     search_fields = ['name', 'city', 'address']
     readonly_fields = ['created_at', 'updated_at', 'suggested_by']
+    actions = ['approve_selected', 'reject_selected', 'request_info_selected']
+    
+    # Модерация идёт через save() каждой площадки, а не queryset.update():
+    # updated_at (для courts_api?since=) и сигналы сброса кэшей карты
+    # срабатывают так же, как при правке одной площадки
+    @admin.action(description='✅ Одобрить выбранные')
+    def approve_selected(self, request, queryset):
+        for court in queryset:
+            court.approve(request.user)
+        self.message_user(request, f'✅ Одобрено {len(queryset)} площадок')
+    
+    @admin.action(description='❌ Отклонить выбранные')
+    def reject_selected(self, request, queryset):
+        for court in queryset:
+            court.reject(request.user)
+        self.message_user(request, f'❌ Отклонено {len(queryset)} площадок')
+    
+    @admin.action(description='❓ Запросить информацию')
+    def request_info_selected(self, request, queryset):
+        for court in queryset:
+            court.request_info(request.user)
+        self.message_user(request, f'❓ Запрошена информация по {len(queryset)} площадкам')
 
 # Регистрация моделей
 admin.site.register(VolleyballCourt, SimpleVolleyballCourtAdmin)  # Используйте простую версию
 admin.site.register(UserProfile)
 admin.site.register(Game)
 admin.site.register(GameParticipation)
-admin.site.register(Friendship)
\ No newline at end of file
+admin.site.register(Friendship)
+admin.site.register(PricingRule)
+admin.site.register(BlockedInterval)
\ No newline at end of file
@@ -0,0 +1,105 @@
+"""
+Автодополнение площадок по названию и адресу
+
+В каждом воркере держится отсортированный список ключей: нормализованные
+(нижний регистр, ё -> е) хвосты названия и адреса, начиная с каждого
+слова. Поиск по префиксу - bisect и короткий проход вперёд, без
+обращений к базе. Индекс пересобирается при смене версии слоя площадок;
+версия проверяется не чаще раза в VERSION_CHECK_INTERVAL секунд.
+"""
+import re
+import threading
+import time
+from bisect import bisect_left
+
+from .court_layer import approved_courts, get_layer_version
+
+
+DEFAULT_LIMIT = 10
+MAX_LIMIT = 20
+
+VERSION_CHECK_INTERVAL = 2.0
+
+# Начало текста и каждое слово после небуквенного символа:
+# 'динамо-арена', '(север)', 'ул.ленина'
+_WORD_START = re.compile(r'^(?=.)|(?<=\W)\w')
+
+
+def normalize(text):
+    """Нижний регистр, ё -> е, одиночные пробелы"""
+    return ' '.join((text or '').lower().replace('ё', 'е').split())
+
+
+def _word_suffixes(text):
+    """'зал динамо-арена' -> ['зал динамо-арена', 'динамо-арена', 'арена']"""
+    return [text[match.start():] for match in _WORD_START.finditer(text)]
+
+
+class PrefixIndex:
+    """Отсортированный префиксный индекс названий и адресов"""
+
+    def __init__(self, courts):
+        self.courts = {}
+        name_keys = []
+        address_keys = []
+        for court in courts:
+            self.courts[court['id']] = court
+            for key in _word_suffixes(normalize(court['name'])):
+                name_keys.append((key, court['id']))
+            for key in _word_suffixes(normalize(court['address'])):
+                address_keys.append((key, court['id']))
+        name_keys.sort()
+        address_keys.sort()
+        # Совпадения по названию показываются раньше совпадений по адресу
+        self.sections = [name_keys, address_keys]
+
+    def search(self, query, limit=DEFAULT_LIMIT):
+        query = normalize(query)
+        if not query:
+            return []
+
+        found = []
+        seen = set()
+        for keys in self.sections:
+            position = bisect_left(keys, (query,))
+            while position < len(keys) and len(found) < limit:
+                key, court_id = keys[position]
+                if not key.startswith(query):
+                    break
+                if court_id not in seen:
+                    seen.add(court_id)
+                    found.append(self.courts[court_id])
+                position += 1
+        return found
+
+
+_index = None
+_index_version = None
+_checked_at = 0.0
+_index_lock = threading.Lock()
+
+
+def build_index():
+    """Индекс по одобренным площадкам"""
+    return PrefixIndex(approved_courts().values('id', 'name', 'address'))
+
+
+def get_index():
+    """Индекс текущего воркера (пересобирается при смене версии слоя)"""
+    global _index, _index_version, _checked_at
+    now = time.monotonic()
+    if _index is not None and now - _checked_at < VERSION_CHECK_INTERVAL:
+        return _index
+
+    version = get_layer_version()
+    with _index_lock:
+        if _index is None or _index_version != version:
+            _index = build_index()
+            _index_version = version
+        _checked_at = now
+    return _index
+
+
+def autocomplete_courts(query, limit=DEFAULT_LIMIT):
+    """Подсказки площадок (id, name, address) по началу слова"""
+    return get_index().search(query, limit)
@@ -0,0 +1,403 @@
+"""
+Движок занятости площадок
+
+Для каждой пары (площадка, дата) хранится битовая карта дня из
+ячеек по CELL_MINUTES минут: отдельно занятые бронированиями
+(CourtBooking в статусах pending/confirmed и активные игры Game на
+площадке, кроме игр в рамках брони) и заблокированные
+(интервалы BlockedInterval и старые слоты TimeSlot.is_blocked). На площадке может быть несколько кортов
+(courts_count): число одновременных игр по ячейкам считается
+сканирующей прямой и хранится уровнями масок, время занято, когда
+заняты все корты. Карты кэшируются и сбрасываются сигналами
+при изменении бронирований и слотов, а проверка интервала - это
+одна побитовая операция над целыми числами.
+
+Удержания времени (BookingHold) хранятся в той же записи кэша
+списком (пользователь, маска, срок действия): истёкшие удержания
+просто не учитываются, поэтому сбрасывать кэш по их истечении не нужно.
+"""
+from datetime import datetime, time, timedelta
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import VolleyballCourt, Game, CourtBooking, TimeSlot, BookingHold, BlockedInterval
+
+
+CELL_MINUTES = 15
+CELLS_PER_DAY = 24 * 60 // CELL_MINUTES
+
+# Статусы бронирований, которые занимают площадку
+ACTIVE_BOOKING_STATUSES = ('pending', 'confirmed')
+
+# Длительность игры на площадке, если время окончания не указано
+DEFAULT_GAME_HOURS = 2
+
+AVAILABILITY_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Сообщения для пользователя по причине занятости
+AVAILABILITY_CONFLICT_MESSAGES = {
+    'booked': 'Выбранное время уже занято',
+    'blocked': 'Выбранное время временно недоступно',
+    'held': 'Выбранное время сейчас оформляет другой игрок',
+}
+
+
+def time_to_cell(value):
+    """Номер ячейки, в которую попадает момент времени (с округлением вниз)"""
+    return (value.hour * 60 + value.minute) // CELL_MINUTES
+
+
+def time_to_cell_end(value):
+    """Номер ячейки после окончания интервала (с округлением вверх)"""
+    minutes = value.hour * 60 + value.minute + (1 if value.second or value.microsecond else 0)
+    return -(-minutes // CELL_MINUTES)
+
+
+def cell_to_time(cell):
+    """Время начала ячейки (ячейка CELLS_PER_DAY - полночь следующих суток)"""
+    minutes = (cell % CELLS_PER_DAY) * CELL_MINUTES
+    return time(minutes // 60, minutes % 60)
+
+
+def cell_range(start_time, end_time):
+    """
+    Ячейки интервала [start, end). Окончание в полночь или раньше начала
+    считается концом суток.
+    """
+    start = time_to_cell(start_time)
+    end = time_to_cell_end(end_time)
+    if end <= start:
+        end = CELLS_PER_DAY
+    return start, end
+
+
+def range_mask(start, end):
+    """Битовая маска ячеек [start, end)"""
+    if end <= start:
+        return 0
+    return ((1 << (end - start)) - 1) << start
+
+
+def opening_cells(opening_time, closing_time):
+    """
+    Ячейки, целиком попадающие в часы работы. Закрытие в полночь или
+    раньше открытия считается концом суток.
+    """
+    start = time_to_cell_end(opening_time)
+    end = time_to_cell(closing_time)
+    if closing_time <= opening_time:
+        end = CELLS_PER_DAY
+    return start, end
+
+
+def free_runs(busy, start, end):
+    """Непрерывные свободные отрезки [run_start, run_end) внутри [start, end)"""
+    free = ~busy & range_mask(start, end)
+    while free:
+        run_start = (free & -free).bit_length() - 1
+        shifted = free >> run_start
+        run_end = run_start + (shifted ^ (shifted + 1)).bit_length() - 1
+        yield run_start, run_end
+        free &= ~range_mask(run_start, run_end)
+
+
+def game_cells(game_time, end_time=None):
+    """Ячейки игры; без времени окончания игра длится DEFAULT_GAME_HOURS"""
+    if end_time:
+        return cell_range(game_time, end_time)
+    start = time_to_cell(game_time)
+    return start, min(start + DEFAULT_GAME_HOURS * 60 // CELL_MINUTES, CELLS_PER_DAY)
+
+
+def day_bounds(day):
+    """Начало и конец суток day в текущем часовом поясе"""
+    start = timezone.make_aware(datetime.combine(day, time.min))
+    return start, timezone.make_aware(datetime.combine(day + timedelta(days=1), time.min))
+
+
+def interval_cells(start_at, end_at, day):
+    """
+    Ячейки дня day, которые покрывает интервал [start_at, end_at)
+    из моментов времени: (start, end) или None, если не пересекаются.
+    """
+    day_start, day_end = day_bounds(day)
+    if start_at >= day_end or end_at <= day_start:
+        return None
+    start = 0 if start_at <= day_start else time_to_cell(timezone.localtime(start_at).time())
+    end = CELLS_PER_DAY if end_at >= day_end else time_to_cell_end(timezone.localtime(end_at).time())
+    return start, end
+
+
+def add_to_levels(levels, mask):
+    """
+    Прибавить единицу к счётчику занятости ячеек mask. levels[i] - маска
+    ячеек, в которых занято больше i площадок (унарный счётчик по битам).
+    """
+    levels = list(levels)
+    for i in range(len(levels) - 1, 0, -1):
+        levels[i] |= levels[i - 1] & mask
+    if levels:
+        levels[0] |= mask
+    return levels
+
+
+def sweep_levels(intervals, capacity):
+    """
+    Уровни занятости дня по интервалам ячеек [(start, end), ...]:
+    сканирующая прямая по событиям начала и конца, на каждом отрезке
+    между событиями известно число одновременных игр.
+    """
+    events = []
+    for start, end in intervals:
+        events.append((start, 1))
+        events.append((end, -1))
+    events.sort()
+
+    levels = [0] * capacity
+    count = 0
+    previous = 0
+    for cell, delta in events:
+        if cell > previous and count:
+            segment = range_mask(previous, cell)
+            for i in range(min(count, capacity)):
+                levels[i] |= segment
+        count += delta
+        previous = cell
+    return tuple(levels)
+
+
+class DayAvailability:
+    """
+    Битовые карты одного дня площадки с несколькими кортами (capacity =
+    courts_count). levels[i] - ячейки, где одновременно идёт больше i игр;
+    время занято, когда заняты все корты. holds - удержания времени:
+    кортежи (user_id, маска, срок действия в секундах unix-времени),
+    каждое удержание занимает один корт.
+    """
+
+    __slots__ = ('levels', 'blocked', 'holds', 'capacity')
+
+    def __init__(self, levels=(), blocked=0, holds=(), capacity=1):
+        self.levels = tuple(levels)
+        self.blocked = blocked
+        self.holds = holds
+        self.capacity = max(capacity, 1)
+
+    @property
+    def booked(self):
+        """Ячейки, где бронированиями заняты все корты"""
+        if len(self.levels) < self.capacity:
+            return 0
+        return self.levels[self.capacity - 1]
+
+    def active_holds(self, user_id=None):
+        """Маски действующих удержаний, кроме удержаний пользователя user_id"""
+        now = timezone.now().timestamp()
+        return [
+            hold_mask for hold_user_id, hold_mask, expires in self.holds
+            if expires > now and hold_user_id != user_id
+        ]
+
+    def _levels_with_holds(self, user_id=None):
+        levels = list(self.levels) + [0] * (self.capacity - len(self.levels))
+        for hold_mask in self.active_holds(user_id):
+            levels = add_to_levels(levels, hold_mask)
+        return levels
+
+    def held(self, user_id=None):
+        """Ячейки, где все корты заняты бронированиями и удержаниями других игроков"""
+        if not self.holds:
+            return self.booked
+        return self._levels_with_holds(user_id)[self.capacity - 1]
+
+    @property
+    def busy(self):
+        return self.blocked | self.held()
+
+    def free_courts_cells(self, start, end, user_id=None):
+        """Сколько кортов свободно на всём отрезке ячеек [start, end)"""
+        if self.blocked & range_mask(start, end):
+            return 0
+        mask = range_mask(start, end)
+        levels = self._levels_with_holds(user_id) if self.holds else self.levels
+        return self.capacity - sum(1 for level in levels[:self.capacity] if level & mask)
+
+    def conflict_cells(self, start, end, user_id=None):
+        """
+        Причина занятости ячеек [start, end): None, 'booked', 'blocked'
+        или 'held' (удержания пользователя user_id не мешают ему самому)
+        """
+        mask = range_mask(start, end)
+        if self.booked & mask:
+            return 'booked'
+        if self.blocked & mask:
+            return 'blocked'
+        if self.holds and self.held(user_id) & mask:
+            return 'held'
+        return None
+
+    def conflict(self, start_time, end_time, user_id=None):
+        """Причина занятости интервала времени (см. conflict_cells)"""
+        return self.conflict_cells(*cell_range(start_time, end_time), user_id=user_id)
+
+    def is_free(self, start_time, end_time, user_id=None):
+        return self.conflict(start_time, end_time, user_id) is None
+
+    def is_free_cells(self, start, end, user_id=None):
+        return self.conflict_cells(start, end, user_id) is None
+
+    def to_cache(self):
+        return (self.levels, self.blocked, self.holds, self.capacity)
+
+
+def availability_cache_key(court_id, day):
+    return f'availability:courts:{court_id}:{day.isoformat()}'
+
+
+def build_availability(court_ids, dates):
+    """
+    Битовые карты площадок на даты: {(court_id, date): DayAvailability}.
+    Шесть запросов на все площадки и даты.
+    """
+    capacities = dict(
+        VolleyballCourt.objects.filter(id__in=court_ids).values_list('id', 'courts_count')
+    )
+    intervals = {(court_id, day): [] for court_id in court_ids for day in dates}
+    blocked = dict.fromkeys(intervals, 0)
+
+    bookings = CourtBooking.objects.filter(
+        court_id__in=court_ids,
+        booking_date__in=dates,
+        status__in=ACTIVE_BOOKING_STATUSES
+    ).values_list('court_id', 'booking_date', 'start_time', 'end_time')
+    for court_id, day, start_time, end_time in bookings:
+        intervals[court_id, day].append(cell_range(start_time, end_time))
+
+    # Игра в рамках действующей брони занимает время брони; после отмены
+    # или снятия брони игра занимает площадку сама
+    games = Game.objects.filter(
+        Q(court_booking__isnull=True) | ~Q(court_booking__status__in=ACTIVE_BOOKING_STATUSES),
+        court_id__in=court_ids,
+        game_date__in=dates,
+        is_active=True
+    ).values_list('court_id', 'game_date', 'game_time', 'end_time')
+    for court_id, day, game_time, end_time in games:
+        intervals[court_id, day].append(game_cells(game_time, end_time))
+
+    blocked_slots = TimeSlot.objects.filter(
+        court_id__in=court_ids,
+        date__in=dates,
+        is_blocked=True
+    ).values_list('court_id', 'date', 'start_time', 'end_time')
+    for court_id, day, start_time, end_time in blocked_slots:
+        blocked[court_id, day] |= range_mask(*cell_range(start_time, end_time))
+
+    if dates:
+        first_start, _ = day_bounds(min(dates))
+        _, last_end = day_bounds(max(dates))
+        blocked_intervals = BlockedInterval.objects.filter(
+            court_id__in=court_ids,
+            start_at__lt=last_end,
+            end_at__gt=first_start
+        ).values_list('court_id', 'start_at', 'end_at')
+        for court_id, start_at, end_at in blocked_intervals:
+            for day in dates:
+                cells = interval_cells(start_at, end_at, day)
+                if cells:
+                    blocked[court_id, day] |= range_mask(*cells)
+
+    holds = {}
+    active_holds = BookingHold.objects.filter(
+        court_id__in=court_ids,
+        date__in=dates,
+        expires_at__gt=timezone.now()
+    ).values_list('court_id', 'date', 'user_id', 'start_time', 'end_time', 'expires_at')
+    for court_id, day, user_id, start_time, end_time, expires_at in active_holds:
+        holds.setdefault((court_id, day), []).append(
+            (user_id, range_mask(*cell_range(start_time, end_time)), expires_at.timestamp())
+        )
+
+    result = {}
+    for (court_id, day), day_intervals in intervals.items():
+        capacity = max(capacities.get(court_id) or 1, 1)
+        result[court_id, day] = DayAvailability(
+            sweep_levels(day_intervals, capacity),
+            blocked[court_id, day],
+            tuple(holds.get((court_id, day), ())),
+            capacity
+        )
+    return result
+
+
+def get_courts_availability(court_ids, dates):
+    """
+    Карты занятости нескольких площадок: {(court_id, date): DayAvailability}.
+
+    Закэшированные дни читаются одним get_many, остальные строятся
+    одним проходом по базе.
+    """
+    court_ids = list(dict.fromkeys(court_ids))
+    dates = list(dict.fromkeys(dates))
+    keys = {
+        availability_cache_key(court_id, day): (court_id, day)
+        for court_id in court_ids for day in dates
+    }
+    cached = cache.get_many(list(keys))
+
+    result = {}
+    for key, value in cached.items():
+        result[keys[key]] = DayAvailability(*value)
+
+    missing = [pair for pair in keys.values() if pair not in result]
+    if missing:
+        built = build_availability(
+            sorted({court_id for court_id, _ in missing}),
+            sorted({day for _, day in missing})
+        )
+        built = {pair: built[pair] for pair in missing}
+        cache.set_many(
+            {
+                availability_cache_key(*pair): day_map.to_cache()
+                for pair, day_map in built.items()
+            },
+            AVAILABILITY_CACHE_TIMEOUT
+        )
+        result.update(built)
+
+    return result
+
+
+def get_availability(court_id, dates):
+    """Карты занятости площадки на даты: {date: DayAvailability}"""
+    maps = get_courts_availability([court_id], dates)
+    return {day: day_map for (_, day), day_map in maps.items()}
+
+
+def get_day_availability(court_id, day):
+    """Карта занятости площадки на один день"""
+    return get_availability(court_id, [day])[day]
+
+
+def invalidate_availability(court_id, *dates):
+    """
+    Сбросить карты занятости. Сбрасываем сразу и ещё раз после коммита,
+    чтобы параллельный запрос не закэшировал карту до фиксации изменений.
+    """
+    keys = [availability_cache_key(court_id, day) for day in dates if day]
+    if not keys:
+        return
+    cache.delete_many(keys)
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def invalidate_court_availability(court_id, days_ahead):
+    """
+    Сбросить карты площадки со вчерашнего дня на days_ahead дней вперёд
+    (например, при изменении числа кортов). Более старые карты истекают
+    сами через AVAILABILITY_CACHE_TIMEOUT.
+    """
+    today = timezone.localdate()
+    invalidate_availability(court_id, *(today + timedelta(days=offset) for offset in range(-1, days_ahead + 1)))
@@ -0,0 +1,100 @@
+"""
+Закрытие площадок на время (ремонт, частные мероприятия)
+
+Закрытие хранится одним интервалом BlockedInterval независимо от
+длины: месяц ремонта - одна строка, а не сотни почасовых слотов.
+Пересекающиеся и смежные интервалы площадки склеиваются при закрытии,
+открытие части интервала режет его на остатки. Изменения идут под
+блокировкой строки площадки (как бронирования, см. myapp.booking),
+поэтому интервалы площадки не пересекаются и на SQLite. Карты
+занятости сбрасываются сигналами удаления и сохранения интервалов.
+"""
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import CourtBooking, BlockedInterval
+from .availability import cell_range, interval_cells, ACTIVE_BOOKING_STATUSES
+from .booking import _lock_court
+
+
+# Ограничение одного запроса: закрыть площадку можно не больше чем на год
+MAX_BLOCK_DAYS = 366
+
+
+def interval_dates(start_at, end_at):
+    """Даты (в текущем часовом поясе), которые задевает интервал"""
+    first = timezone.localtime(start_at).date()
+    last = timezone.localtime(end_at - timedelta(microseconds=1)).date()
+    return [first + timedelta(days=offset) for offset in range((last - first).days + 1)]
+
+
+def affected_bookings(court, start_at, end_at):
+    """Действующие брони площадки, которые пересекаются с интервалом"""
+    bookings = CourtBooking.objects.filter(
+        court=court,
+        booking_date__in=interval_dates(start_at, end_at),
+        status__in=ACTIVE_BOOKING_STATUSES
+    ).only('id', 'booking_number', 'booking_date', 'start_time', 'end_time')
+
+    affected = []
+    for booking in bookings:
+        cells = interval_cells(start_at, end_at, booking.booking_date)
+        start, end = cell_range(booking.start_time, booking.end_time)
+        if cells and start < cells[1] and end > cells[0]:
+            affected.append(booking)
+    return affected
+
+
+def block_court(court, start_at, end_at, reason='', user=None):
+    """
+    Закрыть площадку на [start_at, end_at). Пересекающиеся и смежные
+    закрытия склеиваются с новым в один интервал, который и возвращается.
+    Брони не отменяются - см. affected_bookings.
+    """
+    with transaction.atomic():
+        _lock_court(court)
+        merged = list(BlockedInterval.objects.filter(
+            court=court, start_at__lte=end_at, end_at__gte=start_at
+        ))
+        for interval in merged:
+            start_at = min(start_at, interval.start_at)
+            end_at = max(end_at, interval.end_at)
+        BlockedInterval.objects.filter(id__in=[interval.id for interval in merged]).delete()
+        interval = BlockedInterval.objects.create(
+            court=court,
+            start_at=start_at,
+            end_at=end_at,
+            reason=reason or next((interval.reason for interval in merged if interval.reason), ''),
+            created_by=user
+        )
+    return interval
+
+
+def unblock_court(court, start_at, end_at):
+    """
+    Открыть площадку на [start_at, end_at). Закрытия, которые выходят за
+    границы, укорачиваются или делятся на два. Возвращает число
+    изменённых закрытий.
+    """
+    with transaction.atomic():
+        _lock_court(court)
+        overlapping = list(BlockedInterval.objects.filter(
+            court=court, start_at__lt=end_at, end_at__gt=start_at
+        ))
+        rest = []
+        for interval in overlapping:
+            if interval.start_at < start_at:
+                rest.append(BlockedInterval(
+                    court=court, start_at=interval.start_at, end_at=start_at,
+                    reason=interval.reason, created_by_id=interval.created_by_id
+                ))
+            if interval.end_at > end_at:
+                rest.append(BlockedInterval(
+                    court=court, start_at=end_at, end_at=interval.end_at,
+                    reason=interval.reason, created_by_id=interval.created_by_id
+                ))
+        BlockedInterval.objects.filter(id__in=[interval.id for interval in overlapping]).delete()
+        BlockedInterval.objects.bulk_create(rest)
+    return len(overlapping)
@@ -0,0 +1,353 @@
+"""
+Создание бронирований площадок
+
+Проверка занятости и запись брони с её слотами выполняются в одной
+транзакции под блокировкой строки площадки (select_for_update), поэтому
+параллельные запросы на одну площадку проходят по очереди и не могут
+оба пройти проверку. Слоты создаются одним bulk_create; уникальность
+(court, date, start_time, lane) у TimeSlot - дополнительная защита для баз
+без блокировок строк (SQLite).
+
+Регулярные игры (create_booking_series) проверяются на все даты серии
+сразу и создаются пачкой через bulk_create.
+
+Игры Game на площадке занимают время в том же движке занятости, что и
+брони (schedule_game), поэтому игра и бронь не могут занять одно время.
+
+Пока игрок заполняет форму, выбранное время удерживается за ним на
+HOLD_TTL (BookingHold): другим оно показывается занятым. Удержание
+снимается при создании брони или истекает само; истёкшие строки
+удаляются пачками.
+"""
+import uuid
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import VolleyballCourt, CourtBooking, TimeSlot, BookingHold
+from .availability import (
+    build_availability, invalidate_availability, game_cells,
+    AVAILABILITY_CONFLICT_MESSAGES, ACTIVE_BOOKING_STATUSES
+)
+from .pricing import get_price_vectors, quote_price
+
+
+HOLD_TTL = timedelta(minutes=5)
+HOLD_SWEEP_BATCH = 1000
+
+MAX_SERIES_WEEKS = 12
+
+
+class BookingConflict(Exception):
+    """Выбранное время занято; текст исключения можно показать пользователю"""
+
+
+def booking_hours(booking_date, start_time, hours):
+    """Часовые интервалы брони: [(start_time, end_time), ...]"""
+    start = datetime.combine(booking_date, start_time)
+    return [
+        ((start + timedelta(hours=i)).time(), (start + timedelta(hours=i + 1)).time())
+        for i in range(hours)
+    ]
+
+
+def _claim_slots(bookings):
+    """
+    Занять часовые слоты броней одной площадки. На площадке с
+    несколькими кортами у одного часа несколько строк (по одной на
+    корт, TimeSlot.lane). Строки, которые никем не заняты (слоты с ценой,
+    слоты отменённых броней), переиспользуются, недостающие создаются
+    одним bulk_create на следующем свободном корте. Цену новым слотам
+    не задаём, чтобы она не перекрывала правила цен.
+    """
+    intervals = [
+        (booking, booking_hours(booking.booking_date, booking.start_time, booking.hours))
+        for booking in bookings
+    ]
+    existing = {}
+    for slot in TimeSlot.objects.select_related('booking').filter(
+        court_id=bookings[0].court_id,
+        date__in={booking.booking_date for booking in bookings},
+        start_time__in={start for _, hours in intervals for start, _ in hours}
+    ):
+        existing.setdefault((slot.date, slot.start_time), []).append(slot)
+
+    reused = []
+    created = []
+    for booking, hours in intervals:
+        for start_time, end_time in hours:
+            lanes = existing.setdefault((booking.booking_date, start_time), [])
+            if any(slot.is_blocked for slot in lanes):
+                raise BookingConflict(AVAILABILITY_CONFLICT_MESSAGES['blocked'])
+
+            slot = next(
+                (
+                    slot for slot in lanes
+                    if not slot.booking_id or slot.booking.status not in ACTIVE_BOOKING_STATUSES
+                ),
+                None
+            )
+            if slot is None:
+                # Свободность кортов уже проверена по движку занятости
+                slot = TimeSlot(
+                    court_id=booking.court_id,
+                    date=booking.booking_date,
+                    start_time=start_time,
+                    end_time=end_time,
+                    lane=max((slot.lane for slot in lanes), default=-1) + 1,
+                    is_booked=True,
+                    booking=booking
+                )
+                created.append(slot)
+                lanes.append(slot)
+            else:
+                slot.end_time = end_time
+                slot.is_booked = True
+                slot.booking = booking
+                reused.append(slot)
+
+    if reused:
+        TimeSlot.objects.bulk_update(reused, ['end_time', 'is_booked', 'booking'])
+    if created:
+        TimeSlot.objects.bulk_create(created)
+
+
+def _fill_booking(booking, vectors=None):
+    """
+    Конец брони, стоимость по ценам дня, средняя цена за час и депозит
+    """
+    court = booking.court
+    start = datetime.combine(booking.booking_date, booking.start_time)
+    booking.end_time = (start + timedelta(hours=booking.hours)).time()
+    booking.total_price = quote_price(court, booking.booking_date, booking.start_time, booking.hours, vectors)
+    booking.price_per_hour = (booking.total_price / booking.hours).quantize(Decimal('0.01'))
+    booking.deposit_amount = 0
+    if not court.is_free:
+        booking.deposit_amount = (booking.total_price * Decimal('0.3')).quantize(Decimal('0.01'))
+
+
+def _lock_court(court):
+    """
+    Брони и удержания одной площадки создаются по очереди. SQLite не
+    знает SELECT ... FOR UPDATE: там первая в транзакции запись берёт
+    блокировку всей базы до конца транзакции.
+    """
+    if connection.features.has_select_for_update:
+        list(VolleyballCourt.objects.select_for_update().filter(pk=court.pk).values_list('pk', flat=True))
+    else:
+        VolleyballCourt.objects.filter(pk=court.pk).update(courts_count=F('courts_count'))
+
+
+def _check_free(court, day, start_time, end_time, user_id):
+    """Проверка по базе, а не по кэшу: кэш мог устареть до блокировки"""
+    day_map = build_availability([court.pk], [day])[court.pk, day]
+    conflict = day_map.conflict(start_time, end_time, user_id=user_id)
+    if conflict:
+        raise BookingConflict(AVAILABILITY_CONFLICT_MESSAGES[conflict])
+
+
+def schedule_game(game):
+    """
+    Сохранить игру (game.court, game_date, game_time, end_time и organizer
+    заполнены). Игра без площадки или в рамках действующей брони
+    (court_booking) сохраняется без проверки, иначе её время проверяется
+    по движку занятости под блокировкой площадки - BookingConflict, если
+    занято.
+    """
+    in_booking = game.court_booking_id and game.court_booking.status in ACTIVE_BOOKING_STATUSES
+    if game.court_id is None or in_booking:
+        game.save()
+        return game
+
+    with transaction.atomic():
+        _lock_court(game.court)
+        day_map = build_availability([game.court_id], [game.game_date])[game.court_id, game.game_date]
+        conflict = day_map.conflict_cells(*game_cells(game.game_time, game.end_time), game.organizer_id)
+        if conflict:
+            raise BookingConflict(AVAILABILITY_CONFLICT_MESSAGES[conflict])
+        game.save()
+    return game
+
+
+def _release_holds(court_id, user_id):
+    holds = BookingHold.objects.filter(court_id=court_id, user_id=user_id)
+    dates = set(holds.values_list('date', flat=True))
+    if dates:
+        holds.delete()
+        invalidate_availability(court_id, *dates)
+
+
+def create_booking(booking):
+    """
+    Сохранить новую бронь (booking с заполненными court, user, датой,
+    start_time и hours) и занять её слоты.
+
+    Конец брони и стоимость рассчитываются здесь. При пересечении с
+    другой бронью или заблокированным временем - BookingConflict.
+    """
+    court = booking.court
+    _fill_booking(booking)
+
+    try:
+        with transaction.atomic():
+            _lock_court(court)
+            _check_free(court, booking.booking_date, booking.start_time, booking.end_time, booking.user_id)
+
+            booking.save()
+            _claim_slots([booking])
+            _release_holds(court.pk, booking.user_id)
+    except IntegrityError:
+        # Параллельная бронь успела занять тот же слот
+        booking.pk = None
+        raise BookingConflict(AVAILABILITY_CONFLICT_MESSAGES['booked'])
+
+    return booking
+
+
+def series_dates(first_date, weeks):
+    """Даты еженедельной серии начиная с first_date"""
+    return [first_date + timedelta(weeks=week) for week in range(weeks)]
+
+
+def series_conflicts(day_maps, dates, start_time, end_time, user_id=None):
+    """Даты серии, на которые время занято: [(date, причина), ...]"""
+    conflicts = []
+    for day in dates:
+        conflict = day_maps[day].conflict(start_time, end_time, user_id=user_id)
+        if conflict:
+            conflicts.append((day, conflict))
+    return conflicts
+
+
+def format_series_conflicts(conflicts):
+    return 'Время занято на даты: ' + ', '.join(day.strftime('%d.%m.%Y') for day, _ in conflicts)
+
+
+def series_too_far(court, dates, today=None):
+    """Первая дата серии дальше срока бронирования площадки или None"""
+    last_date = (today or timezone.localdate()) + timedelta(days=court.advance_booking_days)
+    return next((day for day in dates if day > last_date), None)
+
+
+def format_series_too_far(court, day):
+    return (
+        f'Дата {day.strftime("%d.%m.%Y")} дальше срока планирования игры - '
+        f'{court.advance_booking_days} дней вперед'
+    )
+
+
+def create_booking_series(booking, weeks):
+    """
+    Еженедельная серия броней: booking - первая игра серии (как для
+    create_booking), weeks - число недель. Все даты серии должны
+    укладываться в advance_booking_days площадки.
+
+    Все даты проверяются по базе одним набором запросов, брони и слоты
+    создаются через bulk_create. Если хотя бы одна дата занята -
+    BookingConflict со списком дат, ничего не создаётся.
+    """
+    court = booking.court
+    _fill_booking(booking)
+    dates = series_dates(booking.booking_date, weeks)
+    too_far = series_too_far(court, dates)
+    if too_far:
+        raise BookingConflict(format_series_too_far(court, too_far))
+    series = uuid.uuid4()
+
+    # Цены всех дат серии (и следующих дней для игр после полуночи) одним чтением
+    vectors = get_price_vectors([court], dates + [day + timedelta(days=1) for day in dates])
+
+    # bulk_create не вызывает save(), поэтому номер и депозит заполняются здесь
+    bookings = []
+    for day in dates:
+        occurrence = CourtBooking(**{
+            field.attname: getattr(booking, field.attname)
+            for field in CourtBooking._meta.concrete_fields
+            if not field.primary_key
+        })
+        occurrence.booking_date = day
+        occurrence.series = series
+        _fill_booking(occurrence, vectors)
+        # Номера внутри серии не должны совпадать (уникальность в базе)
+        numbers = {other.booking_number for other in bookings}
+        occurrence.booking_number = CourtBooking.generate_booking_number()
+        while occurrence.booking_number in numbers:
+            occurrence.booking_number = CourtBooking.generate_booking_number()
+        bookings.append(occurrence)
+
+    try:
+        with transaction.atomic():
+            _lock_court(court)
+            day_maps = {
+                day: day_map
+                for (_, day), day_map in build_availability([court.pk], dates).items()
+            }
+            conflicts = series_conflicts(day_maps, dates, booking.start_time, booking.end_time, booking.user_id)
+            if conflicts:
+                raise BookingConflict(format_series_conflicts(conflicts))
+
+            CourtBooking.objects.bulk_create(bookings)
+            if bookings[0].pk is None:
+                # База не вернула первичные ключи (старый SQLite)
+                ids = dict(CourtBooking.objects.filter(series=series).values_list('booking_number', 'id'))
+                for occurrence in bookings:
+                    occurrence.pk = ids[occurrence.booking_number]
+            _claim_slots(bookings)
+            _release_holds(court.pk, booking.user_id)
+    except IntegrityError:
+        raise BookingConflict(AVAILABILITY_CONFLICT_MESSAGES['booked'])
+
+    # bulk_create не отправляет сигналы - сбрасываем карты занятости сами
+    invalidate_availability(court.pk, *dates)
+    return bookings
+
+
+def place_hold(court, user, day, start_time, hours):
+    """
+    Удержать время за пользователем на HOLD_TTL. Прежние удержания
+    пользователя на этой площадке снимаются. BookingConflict, если
+    время занято или удерживается другим игроком.
+    """
+    start = datetime.combine(day, start_time)
+    end_time = (start + timedelta(hours=hours)).time()
+
+    with transaction.atomic():
+        _lock_court(court)
+        _check_free(court, day, start_time, end_time, user.pk)
+        _release_holds(court.pk, user.pk)
+        hold = BookingHold.objects.create(
+            court=court,
+            user=user,
+            date=day,
+            start_time=start_time,
+            end_time=end_time,
+            expires_at=timezone.now() + HOLD_TTL
+        )
+    invalidate_availability(court.pk, day)
+
+    sweep_expired_holds()
+    return hold
+
+
+def release_holds(court, user):
+    """Снять удержания пользователя на площадке"""
+    _release_holds(court.pk, user.pk)
+
+
+def sweep_expired_holds(batch_size=HOLD_SWEEP_BATCH):
+    """
+    Удалить истёкшие удержания пачками по индексу expires_at.
+    Кэш не сбрасывается: истёкшие удержания движок занятости не учитывает.
+    """
+    now = timezone.now()
+    deleted = 0
+    while True:
+        ids = list(
+            BookingHold.objects.filter(expires_at__lte=now).values_list('id', flat=True)[:batch_size]
+        )
+        if not ids:
+            return deleted
+        deleted += BookingHold.objects.filter(id__in=ids).delete()[0]
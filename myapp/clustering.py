@@ -0,0 +1,77 @@
+"""
+Серверная кластеризация площадок для карты
+
+Точки группируются по сетке в пиксельных координатах Web Mercator:
+на каждом масштабе ячейка сетки имеет одинаковый экранный размер,
+поэтому кластеры не наезжают друг на друга при любом zoom.
+Результат для каждого масштаба кэшируется на версию слоя площадок.
+"""
+from django.core.cache import cache
+
+from .court_layer import get_layer_points, layer_cache_key, LAYER_CACHE_TIMEOUT
+from .geo import project, bbox_contains
+
+
+# Размер ячейки кластеризации в экранных пикселях
+CLUSTER_CELL_SIZE = 64
+
+
+def build_clusters(points, zoom, cell_size=CLUSTER_CELL_SIZE):
+    """
+    Сгруппировать точки (id, lat, lng, court_type) в кластеры.
+
+    Возвращает список словарей с числом площадок, центроидом и
+    границами кластера. Одиночная площадка возвращается с её id.
+    """
+    cells = {}
+    for court_id, lat, lng, court_type in points:
+        x, y = project(lat, lng, zoom)
+        key = (int(x // cell_size), int(y // cell_size))
+        cell = cells.get(key)
+        if cell is None:
+            cells[key] = [1, lat, lng, lat, lat, lng, lng, court_id, {court_type: 1}]
+            continue
+        cell[0] += 1
+        cell[1] += lat
+        cell[2] += lng
+        cell[3] = min(cell[3], lat)
+        cell[4] = max(cell[4], lat)
+        cell[5] = min(cell[5], lng)
+        cell[6] = max(cell[6], lng)
+        cell[8][court_type] = cell[8].get(court_type, 0) + 1
+
+    clusters = []
+    for count, sum_lat, sum_lng, min_lat, max_lat, min_lng, max_lng, court_id, types in cells.values():
+        cluster = {
+            'latitude': round(sum_lat / count, 6),
+            'longitude': round(sum_lng / count, 6),
+            'count': count,
+            'bbox': [min_lng, min_lat, max_lng, max_lat],
+            'types': types,
+        }
+        if count == 1:
+            cluster['id'] = court_id
+        clusters.append(cluster)
+
+    return clusters
+
+
+def get_clusters(zoom):
+    """Кластеры одобренных площадок для масштаба zoom (с кэшированием)"""
+    key = layer_cache_key('clusters', zoom)
+    clusters = cache.get(key)
+    if clusters is None:
+        clusters = build_clusters(get_layer_points(), zoom)
+        cache.set(key, clusters, LAYER_CACHE_TIMEOUT)
+    return clusters
+
+
+def get_clusters_in_bbox(zoom, bbox=None):
+    """Кластеры масштаба zoom, центроид которых попадает в bbox"""
+    clusters = get_clusters(zoom)
+    if bbox is None:
+        return clusters
+    return [
+        cluster for cluster in clusters
+        if bbox_contains(bbox, cluster['latitude'], cluster['longitude'])
+    ]
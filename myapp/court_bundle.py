@@ -0,0 +1,76 @@
+"""
+Кэшированные данные страницы площадки (court_detail, court_detail_api)
+
+Площадка, последние отзывы, фотографии и агрегаты по отзывам собираются
+в один объект и кэшируются по id площадки. Кэш сбрасывается сигналами
+при изменении площадки, её отзывов или фотографий (см. myapp.signals).
+Для каждого запроса отдельно считается только право пользователя
+оставить отзыв.
+"""
+from django.core.cache import cache
+from django.db.models import Avg, Count, Exists, OuterRef
+
+from .models import VolleyballCourt, Review, CourtPhoto, CourtBooking
+from .court_layer import LAYER_CACHE_TIMEOUT
+
+
+# Сколько последних отзывов хранится в кэше
+BUNDLE_REVIEWS_LIMIT = 20
+
+
+def court_bundle_key(court_id):
+    return f'courts:detail:{court_id}'
+
+
+def build_court_bundle(court_id):
+    """Собрать данные площадки; None, если площадки нет"""
+    court = VolleyballCourt.objects.select_related(
+        'suggested_by', 'reviewed_by'
+    ).filter(id=court_id).first()
+    if court is None:
+        return None
+
+    published_reviews = Review.objects.filter(court_id=court_id, is_published=True)
+    summary = published_reviews.aggregate(avg=Avg('rating_overall'), count=Count('id'))
+
+    return {
+        'court': court,
+        'reviews': list(
+            published_reviews.select_related('user').order_by('-created_at')[:BUNDLE_REVIEWS_LIMIT]
+        ),
+        'photos': list(CourtPhoto.objects.filter(court_id=court_id).order_by('-is_main')),
+        'reviews_count': summary['count'],
+        'avg_review_rating': float(summary['avg'] or 0),
+    }
+
+
+def get_court_bundle(court_id):
+    """Данные площадки из кэша (отсутствующие площадки не кэшируются)"""
+    key = court_bundle_key(court_id)
+    bundle = cache.get(key)
+    if bundle is None:
+        bundle = build_court_bundle(court_id)
+        if bundle is not None:
+            cache.set(key, bundle, LAYER_CACHE_TIMEOUT)
+    return bundle
+
+
+def invalidate_court_bundle(*court_ids):
+    """Сбросить кэш страниц площадок"""
+    cache.delete_many([court_bundle_key(court_id) for court_id in court_ids])
+
+
+def user_can_review(user, court_id):
+    """
+    Может ли пользователь оставить отзыв: есть подтверждённое или
+    завершённое бронирование и ещё нет отзыва (один запрос)
+    """
+    if not user.is_authenticated:
+        return False
+    return CourtBooking.objects.filter(
+        court_id=court_id,
+        user=user,
+        status__in=['confirmed', 'completed']
+    ).filter(
+        ~Exists(Review.objects.filter(court_id=OuterRef('court_id'), user=user))
+    ).exists()
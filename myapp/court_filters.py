@@ -0,0 +1,105 @@
+"""
+Фильтры площадок из GET-параметров (общие для поисковых API)
+
+Разбор параметров вынесен отдельно, чтобы одни и те же фильтры
+применялись и к QuerySet, и к данным площадок в памяти.
+"""
+from django.db.models import Q
+
+
+# GET-параметр -> поле удобства модели VolleyballCourt
+AMENITY_PARAMS = {
+    'with_lighting': 'is_lighted',
+    'with_parking': 'has_parking',
+    'with_showers': 'has_showers',
+    'with_locker_rooms': 'has_locker_rooms',
+    'with_equipment': 'has_equipment_rental',
+}
+
+
+def _parse_price(value):
+    if not value:
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        return None
+
+
+def parse_court_filters(params):
+    """Разобрать фильтры search_courts_api из request.GET"""
+    return {
+        'query': params.get('query', ''),
+        'court_type': params.get('court_type', ''),
+        'surface': params.get('surface', ''),
+        'city': params.get('city', ''),
+        'price_min': _parse_price(params.get('price_min', '')),
+        'price_max': _parse_price(params.get('price_max', '')),
+        'free_only': params.get('free_only', '') == 'true',
+        'amenities': [
+            field for param, field in AMENITY_PARAMS.items()
+            if params.get(param, '') == 'true'
+        ],
+    }
+
+
+def apply_court_filters(courts, filters):
+    """Применить фильтры к QuerySet площадок"""
+    if filters['query']:
+        courts = courts.filter(
+            Q(name__icontains=filters['query']) | Q(address__icontains=filters['query'])
+        )
+
+    if filters['court_type']:
+        courts = courts.filter(court_type=filters['court_type'])
+
+    if filters['surface']:
+        courts = courts.filter(surface=filters['surface'])
+
+    if filters['city']:
+        courts = courts.filter(city__icontains=filters['city'])
+
+    if filters['price_min'] is not None:
+        courts = courts.filter(price_per_hour__gte=filters['price_min'])
+
+    if filters['price_max'] is not None:
+        courts = courts.filter(price_per_hour__lte=filters['price_max'])
+
+    if filters['free_only']:
+        courts = courts.filter(is_free=True)
+
+    for field in filters['amenities']:
+        courts = courts.filter(**{field: True})
+
+    return courts
+
+
+def match_court_filters(court, filters):
+    """
+    Проверить словарь площадки (поля модели) на соответствие фильтрам.
+
+    Аналог apply_court_filters для данных, уже загруженных в память.
+    """
+    query = filters['query'].lower()
+    if query and query not in court['name'].lower() and query not in court['address'].lower():
+        return False
+
+    if filters['court_type'] and court['court_type'] != filters['court_type']:
+        return False
+
+    if filters['surface'] and court['surface'] != filters['surface']:
+        return False
+
+    if filters['city'] and filters['city'].lower() not in court['city'].lower():
+        return False
+
+    if filters['price_min'] is not None and court['price_per_hour'] < filters['price_min']:
+        return False
+
+    if filters['price_max'] is not None and court['price_per_hour'] > filters['price_max']:
+        return False
+
+    if filters['free_only'] and not court['is_free']:
+        return False
+
+    return all(court[field] for field in filters['amenities'])
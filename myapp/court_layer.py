@@ -0,0 +1,149 @@
+"""
+Слой одобренных площадок для карты: версия слоя и общие выборки
+
+Версия хранится в кэше и меняется при любом изменении площадки
+(см. myapp.signals). Все производные данные карты (кластеры и т.п.)
+кэшируются под ключом с версией, поэтому старые записи просто
+перестают читаться и истекают по таймауту.
+
+Готовые снимки карты (map_view/full_map_view) лежат под постоянными
+ключами и удаляются при смене версии - чтение снимка стоит ровно
+одного обращения к кэшу.
+"""
+import hashlib
+import json
+import uuid
+
+from django.core.cache import cache
+
+from .models import VolleyballCourt
+from .serializers import CourtSerializer, MAP_FIELDS, FULL_MAP_FIELDS
+
+
+LAYER_VERSION_KEY = 'courts:layer:version'
+
+# Время жизни производных данных слоя (секунды)
+LAYER_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Снимки карты: map - публичная карта, full - все активные площадки
+SNAPSHOT_KEYS = {
+    'map': 'courts:snapshot:map',
+    'full': 'courts:snapshot:full',
+}
+
+
+def get_layer_version():
+    """Текущая версия слоя площадок"""
+    version = cache.get(LAYER_VERSION_KEY)
+    if version is None:
+        version = uuid.uuid4().hex
+        # add() не перезапишет версию, выставленную параллельным запросом
+        if not cache.add(LAYER_VERSION_KEY, version, None):
+            version = cache.get(LAYER_VERSION_KEY, version)
+    return version
+
+
+def bump_layer_version():
+    """Пометить слой площадок как изменённый"""
+    cache.set(LAYER_VERSION_KEY, uuid.uuid4().hex, None)
+    cache.delete_many(list(SNAPSHOT_KEYS.values()))
+
+
+def layer_cache_key(name, *parts):
+    """Ключ кэша для данных, зависящих от версии слоя"""
+    suffix = ':'.join(str(part) for part in parts)
+    key = f'courts:{name}:{get_layer_version()}'
+    return f'{key}:{suffix}' if suffix else key
+
+
+def approved_courts():
+    """Площадки, которые показываются на публичной карте"""
+    return VolleyballCourt.objects.filter(status='approved', is_active=True)
+
+
+def get_layer_points():
+    """
+    Координаты площадок слоя: список кортежей (id, lat, lng, court_type).
+
+    Кэшируется на версию слоя - общий источник для кластеризации.
+    """
+    key = layer_cache_key('points')
+    points = cache.get(key)
+    if points is None:
+        rows = approved_courts().filter(
+            latitude__isnull=False,
+            longitude__isnull=False
+        ).values_list('id', 'latitude', 'longitude', 'court_type')
+        points = [
+            (court_id, float(lat), float(lng), court_type)
+            for court_id, lat, lng, court_type in rows
+        ]
+        cache.set(key, points, LAYER_CACHE_TIMEOUT)
+    return points
+
+
+# ============================================================================
+# СНИМКИ КАРТЫ
+# ============================================================================
+
+def snapshot_stats(courts_data):
+    """Статистика карты по списку площадок (один проход вместо пяти COUNT)"""
+    stats = {
+        'courts_count': len(courts_data),
+        'free_courts_count': 0,
+        'indoor_courts_count': 0,
+        'outdoor_courts_count': 0,
+        'beach_courts_count': 0,
+    }
+    for court in courts_data:
+        if court['is_free']:
+            stats['free_courts_count'] += 1
+        type_key = f"{court['court_type']}_courts_count"
+        if type_key in stats:
+            stats[type_key] += 1
+    return stats
+
+
+def _snapshot_queryset(layer):
+    if layer == 'full':
+        return VolleyballCourt.objects.filter(is_active=True)
+    return approved_courts().filter(is_verified=True)
+
+
+def _snapshot_serializer(layer):
+    return CourtSerializer(FULL_MAP_FIELDS if layer == 'full' else MAP_FIELDS)
+
+
+def build_map_snapshot(layer='map'):
+    """Собрать снимок слоя: данные площадок, статистику и ETag"""
+    version = get_layer_version()
+    courts_data = _snapshot_serializer(layer).serialize_queryset(_snapshot_queryset(layer))
+    stats = snapshot_stats(courts_data)
+    courts_json = json.dumps(courts_data, ensure_ascii=False)
+    body = json.dumps(
+        {'stats': stats, 'courts': courts_data},
+        ensure_ascii=False
+    ).encode('utf-8')
+
+    return {
+        'version': version,
+        'etag': '"%s"' % hashlib.sha1(body).hexdigest(),
+        'body': body,
+        'courts': courts_data,
+        'courts_json': courts_json,
+        'stats': stats,
+    }
+
+
+def get_map_snapshot(layer='map'):
+    """
+    Снимок слоя из кэша; пересобирается только после изменения площадок.
+    """
+    key = SNAPSHOT_KEYS[layer]
+    snapshot = cache.get(key)
+    if snapshot is None:
+        snapshot = build_map_snapshot(layer)
+        # Не сохраняем снимок, если площадки изменились во время сборки
+        if cache.get(LAYER_VERSION_KEY) == snapshot['version']:
+            cache.set(key, snapshot, LAYER_CACHE_TIMEOUT)
+    return snapshot
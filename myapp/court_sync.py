@@ -0,0 +1,70 @@
+"""
+Инкрементальная синхронизация площадок (courts_api?since=<cursor>)
+
+Курсор - момент времени в ISO 8601. По нему выбираются площадки с
+updated_at позже курсора; удалённые площадки берутся из CourtTombstone.
+Курсор выдаётся с небольшим нахлёстом назад, чтобы не потерять
+изменения из транзакций, которые завершились во время ответа:
+клиент применяет изменения по id, поэтому повторы безопасны.
+"""
+from datetime import timedelta
+
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import VolleyballCourt, CourtTombstone
+
+
+# Нахлёст курсора назад (секунды)
+SYNC_CURSOR_OVERLAP = 5
+
+# Сколько хранятся отметки об удалении; более старый курсор -
+# повод для полной перезагрузки списка
+TOMBSTONE_RETENTION = timedelta(days=30)
+
+
+def make_sync_cursor():
+    """Курсор для следующего запроса клиента"""
+    return (timezone.now() - timedelta(seconds=SYNC_CURSOR_OVERLAP)).isoformat()
+
+
+def parse_sync_cursor(value):
+    """Разбор курсора; ValueError при неверном формате"""
+    since = parse_datetime(value.replace(' ', '+'))
+    if since is None:
+        raise ValueError('Неверный формат параметра since')
+    if timezone.is_naive(since):
+        since = timezone.make_aware(since)
+    return since
+
+
+def is_cursor_expired(since):
+    """Курсор старше хранимых отметок об удалении"""
+    return since < timezone.now() - TOMBSTONE_RETENTION
+
+
+def removed_court_ids(visible_courts, since):
+    """
+    id площадок, которые клиент должен убрать с карты: изменённые после
+    since, но больше не подходящие под выборку (отклонены, скрыты и т.п.),
+    и удалённые.
+    """
+    changed = VolleyballCourt.objects.filter(
+        updated_at__gt=since
+    ).exclude(
+        pk__in=visible_courts.values('pk')
+    ).values_list('id', flat=True)
+
+    deleted = CourtTombstone.objects.filter(
+        deleted_at__gt=since
+    ).values_list('court_id', flat=True)
+
+    return sorted(set(changed) | set(deleted))
+
+
+def record_tombstone(court_id):
+    """Отметить удаление площадки и убрать устаревшие отметки"""
+    CourtTombstone.objects.create(court_id=court_id)
+    CourtTombstone.objects.filter(
+        deleted_at__lt=timezone.now() - TOMBSTONE_RETENTION
+    ).delete()
@@ -0,0 +1,115 @@
+"""
+Фасетные счётчики для фильтров площадок
+
+Все счётчики (типы, покрытия, удобства, бесплатность) считаются одним
+запросом с условной агрегацией Count(filter=Q(...)) и кэшируются на
+версию слоя площадок.
+
+Фасеты с выбором одного значения (тип, покрытие, бесплатность)
+дизъюнктивные: счётчики фасета считаются без его собственного фильтра,
+иначе остальные значения фасета всегда показывали бы 0. Удобства
+складываются по И, поэтому их счётчики учитывают все фильтры.
+"""
+import hashlib
+import json
+
+from django.core.cache import cache
+from django.db.models import Count, Q
+
+from .models import VolleyballCourt
+from .court_layer import approved_courts, layer_cache_key, LAYER_CACHE_TIMEOUT
+from .court_filters import AMENITY_PARAMS, apply_court_filters
+
+
+def facet_scope_queryset(scope):
+    """
+    Базовая выборка для фасетов:
+    search - поиск (search_courts_api), map - публичная карта,
+    full - все активные площадки
+    """
+    if scope == 'full':
+        return VolleyballCourt.objects.filter(is_active=True)
+    if scope == 'map':
+        return approved_courts().filter(is_verified=True)
+    return approved_courts()
+
+
+def selected_facets(filters):
+    """Условия выбранных значений дизъюнктивных фасетов"""
+    selected = {}
+    if filters['court_type']:
+        selected['court_type'] = Q(court_type=filters['court_type'])
+    if filters['surface']:
+        selected['surface'] = Q(surface=filters['surface'])
+    if filters['free_only']:
+        selected['is_free'] = Q(is_free=True)
+    return selected
+
+
+def _count(*conditions):
+    condition = Q()
+    for q in conditions:
+        condition &= q
+    return Count('id', filter=condition) if condition else Count('id')
+
+
+def court_facets(courts, selected=None):
+    """
+    Счётчики по всем значениям фильтров для QuerySet одним запросом.
+
+    courts - выборка без фильтров дизъюнктивных фасетов, selected - их
+    условия (см. selected_facets): счётчики фасета учитывают условия
+    всех фасетов, кроме своего.
+    """
+    selected = selected or {}
+
+    def others(facet):
+        return [q for name, q in selected.items() if name != facet]
+
+    aggregates = {'total': _count(*selected.values())}
+    for code, _ in VolleyballCourt.COURT_TYPES:
+        aggregates[f'court_type__{code}'] = _count(Q(court_type=code), *others('court_type'))
+    for code, _ in VolleyballCourt.SURFACE_TYPES:
+        aggregates[f'surface__{code}'] = _count(Q(surface=code), *others('surface'))
+    for param, field in AMENITY_PARAMS.items():
+        aggregates[f'amenity__{param}'] = _count(Q(**{field: True}), *selected.values())
+    aggregates['is_free__true'] = _count(Q(is_free=True), *others('is_free'))
+    aggregates['is_free__false'] = _count(Q(is_free=False), *others('is_free'))
+
+    counts = courts.order_by().aggregate(**aggregates)
+
+    facets = {
+        'total': counts.pop('total'),
+        'court_type': {},
+        'surface': {},
+        'amenities': {},
+        'is_free': {},
+    }
+    groups = {
+        'court_type': 'court_type',
+        'surface': 'surface',
+        'amenity': 'amenities',
+        'is_free': 'is_free',
+    }
+    for key, value in counts.items():
+        group, name = key.split('__', 1)
+        facets[groups[group]][name] = value
+    return facets
+
+
+def get_court_facets(filters, scope='search'):
+    """Фасеты выборки scope с применёнными фильтрами (с кэшированием)"""
+    filters_hash = hashlib.md5(
+        json.dumps(filters, sort_keys=True).encode('utf-8')
+    ).hexdigest()
+    key = layer_cache_key('facets', scope, filters_hash)
+    facets = cache.get(key)
+    if facets is None:
+        # Фильтры дизъюнктивных фасетов применяются внутри court_facets
+        courts = apply_court_filters(
+            facet_scope_queryset(scope),
+            dict(filters, court_type='', surface='', free_only=False)
+        )
+        facets = court_facets(courts, selected_facets(filters))
+        cache.set(key, facets, LAYER_CACHE_TIMEOUT)
+    return facets
@@ -8,7 +8,6 @@ from django.utils import timezone
 import re
 from datetime import datetime, timedelta, date
 from django.contrib.auth.forms import UserCreationForm
-from django.db.models import Q
 from .models import (
     UserProfile,
     VolleyballCourt,
@@ -19,6 +18,14 @@ from .models import (
     TimeSlot,
     Review
 )
+from .availability import (
+    get_day_availability, get_availability, cell_range, game_cells, time_to_cell_end,
+    AVAILABILITY_CONFLICT_MESSAGES
+)
+from .booking import (
+    series_dates, series_conflicts, format_series_conflicts, series_too_far, format_series_too_far,
+    MAX_SERIES_WEEKS
+)
 
 class PlayerProfileForm(forms.ModelForm):
     """Форма редактирования профиля игрока"""
@@ -457,6 +464,39 @@ class CourtPhotoForm(forms.ModelForm):
             'is_main': forms.CheckboxInput(attrs={'class': 'form-check-input'}),
         }
 
+def check_booking_date(court, booking_date):
+    """Дата брони не в прошлом и не дальше advance_booking_days; ValidationError при ошибке"""
+    today = date.today()
+    
+    if booking_date < today:
+        raise ValidationError("Нельзя запланировать игру на прошедшую дату")
+    
+    if booking_date > today + timedelta(days=court.advance_booking_days):
+        raise ValidationError(
+            f"Максимальный срок планирования игры - {court.advance_booking_days} дней вперед"
+        )
+
+def check_booking_time(court, booking_date, start_time, hours):
+    """
+    Время брони в часах работы площадки и не в прошлом; ValidationError при ошибке.
+    Общая проверка формы бронирования и удержаний (booking_hold_api).
+    """
+    if start_time < court.opening_time:
+        raise ValidationError(
+            f"Площадка открывается в {court.opening_time.strftime('%H:%M')}"
+        )
+    
+    start_datetime = datetime.combine(booking_date, start_time)
+    # Бронь, которая переходит через полночь, тоже заканчивается после закрытия
+    if start_datetime + timedelta(hours=hours) > datetime.combine(booking_date, court.closing_time):
+        raise ValidationError(
+            f"Площадка закрывается в {court.closing_time.strftime('%H:%M')}. "
+            f"Пожалуйста, выберите меньшее количество часов или более раннее время начала."
+        )
+    
+    if start_datetime < datetime.now():
+        raise ValidationError("Нельзя запланировать игру на прошедшее время")
+
 class CourtBookingForm(forms.ModelForm):
     """Форма планирования игры"""
     
@@ -515,6 +555,21 @@ class CourtBookingForm(forms.ModelForm):
         help_text="Участники получат уведомления о планировании игры"
     )
     
+    repeat_weeks = forms.IntegerField(
+        required=False,
+        min_value=1,
+        max_value=MAX_SERIES_WEEKS,
+        initial=1,
+        widget=forms.NumberInput(attrs={
+            'class': 'form-control',
+            'id': 'repeat_weeks_input',
+            'min': 1,
+            'max': MAX_SERIES_WEEKS
+        }),
+        label="Повторять каждую неделю (недель)",
+        help_text=f"Регулярная игра в тот же день недели, до {MAX_SERIES_WEEKS} недель"
+    )
+    
     class Meta:
         model = CourtBooking
         fields = [
@@ -571,36 +626,21 @@ class CourtBookingForm(forms.ModelForm):
     
     def clean_booking_date(self):
         booking_date = self.cleaned_data.get('booking_date')
-        today = date.today()
         
-        if booking_date < today:
+        if self.court:
+            check_booking_date(self.court, booking_date)
+        elif booking_date < date.today():
             raise ValidationError("Нельзя запланировать игру на прошедшую дату")
         
-        if self.court and booking_date > today + timedelta(days=self.court.advance_booking_days):
-            raise ValidationError(
-                f"Максимальный срок планирования игры - {self.court.advance_booking_days} дней вперед"
-            )
-        
         return booking_date
     
     def clean_start_time(self):
         start_time = self.cleaned_data.get('start_time')
         
         if self.court and start_time:
-            if start_time < self.court.opening_time:
-                raise ValidationError(
-                    f"Площадка открывается в {self.court.opening_time.strftime('%H:%M')}"
-                )
-            
             hours = self.cleaned_data.get('hours', 1)
-            end_time_dt = datetime.combine(date.today(), start_time) + timedelta(hours=hours)
-            end_time = end_time_dt.time()
-            
-            if end_time > self.court.closing_time:
-                raise ValidationError(
-                    f"Площадка закрывается в {self.court.closing_time.strftime('%H:%M')}. "
-                    f"Пожалуйста, выберите меньшее количество часов или более раннее время начала."
-                )
+            booking_date = self.cleaned_data.get('booking_date') or date.today()
+            check_booking_time(self.court, booking_date, start_time, hours)
         
         return start_time
     
@@ -651,20 +691,42 @@ class CourtBookingForm(forms.ModelForm):
         if booking_date and start_time and self.court:
             start_datetime = datetime.combine(booking_date, start_time)
             end_datetime = start_datetime + timedelta(hours=hours)
+            user_id = self.user.id if self.user else None
+            
+            repeat_weeks = cleaned_data.get('repeat_weeks') or 1
+            if repeat_weeks > 1:
+                # Все даты серии проверяются одним чтением карт занятости
+                dates = series_dates(booking_date, repeat_weeks)
+                too_far = series_too_far(self.court, dates, date.today())
+                if too_far:
+                    raise ValidationError(format_series_too_far(self.court, too_far))
+                conflicts = series_conflicts(
+                    get_availability(self.court.id, dates), dates,
+                    start_time, end_datetime.time(), user_id
+                )
+                if conflicts:
+                    raise ValidationError(format_series_conflicts(conflicts))
+                return cleaned_data
             
-            overlapping_bookings = CourtBooking.objects.filter(
-                court=self.court,
-                booking_date=booking_date,
-                status__in=['confirmed', 'pending']
-            ).exclude(
-                Q(end_time__lte=start_time) | Q(start_time__gte=end_datetime.time())
+            conflict = get_day_availability(self.court.id, booking_date).conflict(
+                start_time, end_datetime.time(), user_id=user_id
             )
             
-            if overlapping_bookings.exists():
+            if conflict == 'booked':
                 raise ValidationError(
                     "Выбранное время уже занято или пересекается с другой игрой. "
                     "Пожалуйста, выберите другое время."
                 )
+            if conflict == 'blocked':
+                raise ValidationError(
+                    "Выбранное время временно недоступно. "
+                    "Пожалуйста, выберите другое время."
+                )
+            if conflict == 'held':
+                raise ValidationError(
+                    "Выбранное время сейчас оформляет другой игрок. "
+                    "Пожалуйста, выберите другое время или попробуйте через несколько минут."
+                )
         
         return cleaned_data
 
@@ -727,7 +789,7 @@ class GameCreationForm(forms.ModelForm):
         model = Game
         fields = [
             'title', 'sport_type', 'game_date', 'game_time',
-            'end_time', 'location', 'custom_location', 'court', 'description',
+            'end_time', 'location', 'custom_location', 'court', 'court_booking', 'description',
             'max_players', 'skill_level', 'price',
             'is_private', 'contact_name', 'contact_phone'
         ]
@@ -777,7 +839,7 @@ class GameCreationForm(forms.ModelForm):
         court = cleaned_data.get('court')
         
         # Если выбрана площадка, проверяем доступность
-        if court and game_date and game_time and end_time:
+        if court and game_date and game_time:
             # Проверяем, что площадка одобрена
             if court.status != 'approved':
                 raise ValidationError("Выбранная площадка еще не одобрена администрацией")
@@ -788,24 +850,24 @@ class GameCreationForm(forms.ModelForm):
                     f"Площадка открывается в {court.opening_time.strftime('%H:%M')}"
                 )
             
-            if end_time > court.closing_time:
+            # Без времени окончания игра длится DEFAULT_GAME_HOURS
+            if end_time:
+                too_late = end_time > court.closing_time
+            else:
+                too_late = game_cells(game_time)[1] > time_to_cell_end(court.closing_time)
+            if too_late:
                 raise ValidationError(
                     f"Площадка закрывается в {court.closing_time.strftime('%H:%M')}"
                 )
             
-            # Проверяем, что на это время нет других игр
-            conflicting_games = Game.objects.filter(
-                court=court,
-                game_date=game_date,
-                is_active=True
-            ).exclude(
-                Q(end_time__lte=game_time) | Q(game_time__gte=end_time)
-            )
-            
-            if conflicting_games.exists():
-                raise ValidationError(
-                    "На выбранное время уже запланирована другая игра на этой площадке"
+            # Игры и брони занимают площадку в одной карте занятости;
+            # игра в рамках своей брони её время уже занимает
+            if not court_booking:
+                conflict = get_day_availability(court.id, game_date).conflict_cells(
+                    *game_cells(game_time, end_time), user_id=self.user.id if self.user else None
                 )
+                if conflict:
+                    raise ValidationError(AVAILABILITY_CONFLICT_MESSAGES[conflict])
         
         # Автоматически заполняем поле location, если выбрана площадка
         if court and not cleaned_data.get('location'):
@@ -815,6 +877,9 @@ class GameCreationForm(forms.ModelForm):
             raise ValidationError("При выборе опции планирования игры необходимо выбрать конкретную игру")
         
         if court_booking:
+            if not court or court_booking.court_id != court.id:
+                raise ValidationError("Площадка игры должна совпадать с площадкой брони")
+            
             if game_date != court_booking.booking_date:
                 raise ValidationError("Дата игры должна совпадать с датой игры на площадке")
             
@@ -823,7 +888,11 @@ class GameCreationForm(forms.ModelForm):
                 timedelta(hours=court_booking.hours)
             ).time()
             
-            if game_time < court_booking.start_time or (end_time and end_time > booking_end_time):
+            # Игра без времени окончания длится DEFAULT_GAME_HOURS и тоже
+            # должна закончиться до конца брони
+            game_start, game_end = game_cells(game_time, end_time)
+            booking_start, booking_end = cell_range(court_booking.start_time, booking_end_time)
+            if game_start < booking_start or game_end > booking_end:
                 raise ValidationError(
                     f"Игра должна проходить в рамках запланированного времени: "
                     f"{court_booking.start_time.strftime('%H:%M')} - "
@@ -990,6 +1059,7 @@ class BookingFilterForm(forms.Form):
         ('confirmed', '✅ Подтверждено'),
         ('cancelled', '❌ Отменено'),
         ('completed', '🏐 Завершено'),
+        ('expired', '⌛ Не подтверждено вовремя'),
     ]
     
     status = forms.ChoiceField(choices=STATUS_CHOICES, required=False, widget=forms.Select(attrs={'class': 'form-control'}), label='Статус')
@@ -0,0 +1,145 @@
+"""
+Поиск свободного времени сразу по многим площадкам
+
+"Найди мне 2 часа где-нибудь рядом на этой неделе": площадки-кандидаты
+берутся из индекса ближайших площадок (если переданы координаты) или
+из фильтров поиска, занятость - из битовых карт движка занятости
+(см. myapp.availability) одним пакетным чтением на все площадки и даты.
+Окно - непрерывный свободный отрезок в часы работы площадки, в который
+помещается игра нужной длительности.
+"""
+from datetime import datetime, timedelta
+
+from django.utils import timezone
+
+from .models import VolleyballCourt
+from .availability import (
+    get_courts_availability, opening_cells, free_runs, cell_to_time, time_to_cell_end,
+    CELL_MINUTES
+)
+from .court_layer import approved_courts
+from .court_filters import apply_court_filters
+from .nearest import find_nearest_courts
+from .pricing import get_price_vectors, quote_cells, to_money
+
+
+DEFAULT_RANGE_DAYS = 7
+MAX_RANGE_DAYS = 14
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 200
+
+# Сколько площадок-кандидатов рассматривается за один запрос
+MAX_COURTS = 200
+
+SORT_OPTIONS = ('start', 'distance')
+
+# Поля площадки, нужные для расчёта окон
+COURT_FIELDS = (
+    'id', 'name', 'address', 'latitude', 'longitude', 'opening_time', 'closing_time',
+    'min_booking_hours', 'max_booking_hours', 'advance_booking_days',
+    'is_free', 'price_per_hour',
+)
+
+
+def parse_date_range(date_from, date_to, today):
+    """
+    Диапазон дат поиска (включительно); ValueError при неверных датах.
+    По умолчанию - неделя начиная с сегодняшнего дня.
+    """
+    try:
+        start = datetime.strptime(date_from, '%Y-%m-%d').date() if date_from else today
+        end = datetime.strptime(date_to, '%Y-%m-%d').date() if date_to else start + timedelta(days=DEFAULT_RANGE_DAYS - 1)
+    except ValueError:
+        raise ValueError('Неверный формат даты')
+
+    start = max(start, today)
+    if end < start:
+        raise ValueError('Дата окончания раньше даты начала')
+    if (end - start).days >= MAX_RANGE_DAYS:
+        raise ValueError(f'Диапазон поиска не больше {MAX_RANGE_DAYS} дней')
+    return start, end
+
+
+def candidate_courts(filters, lat=None, lng=None, radius_km=None):
+    """
+    Площадки, открытые для бронирования: список словарей COURT_FIELDS
+    (с distance_km, если переданы координаты)
+    """
+    if lat is not None:
+        nearest = find_nearest_courts(lat, lng, k=MAX_COURTS, radius_km=radius_km, filters=filters)
+        distances = {court['id']: court['distance_km'] for court in nearest}
+        ids = list(distances)
+    else:
+        distances = {}
+        ids = list(apply_court_filters(approved_courts(), filters).order_by('id').values_list('id', flat=True)[:MAX_COURTS])
+
+    courts = list(VolleyballCourt.objects.filter(id__in=ids, booking_enabled=True).values(*COURT_FIELDS))
+    for court in courts:
+        court['distance_km'] = distances.get(court['id'])
+    return courts
+
+
+def find_free_windows(courts, hours, date_from, date_to, sort='start', limit=DEFAULT_LIMIT):
+    """
+    Свободные окна длительностью не меньше hours часов на площадках courts
+    в диапазоне дат, с учётом часов работы, ограничений на длительность
+    брони и срока бронирования вперёд
+    """
+    now = timezone.localtime()
+    today = now.date()
+    duration_cells = hours * 60 // CELL_MINUTES
+
+    # Длительность должна укладываться в ограничения площадки
+    courts = [
+        court for court in courts
+        if court['min_booking_hours'] <= hours <= court['max_booking_hours']
+    ]
+    if not courts:
+        return []
+
+    dates = [date_from + timedelta(days=offset) for offset in range((date_to - date_from).days + 1)]
+    maps = get_courts_availability([court['id'] for court in courts], dates)
+    prices = get_price_vectors(courts, dates)
+
+    windows = []
+    for court in courts:
+        last_day = today + timedelta(days=court['advance_booking_days'])
+        open_start, open_end = opening_cells(court['opening_time'], court['closing_time'])
+
+        for day in dates:
+            if day > last_day:
+                break
+            start = open_start
+            if day == today:
+                start = max(start, time_to_cell_end(now.time()))
+
+            for run_start, run_end in free_runs(maps[court['id'], day].busy, start, open_end):
+                if run_end - run_start < duration_cells:
+                    continue
+                windows.append({
+                    'court_id': court['id'],
+                    'court_name': court['name'],
+                    'address': court['address'],
+                    'latitude': float(court['latitude']) if court['latitude'] is not None else None,
+                    'longitude': float(court['longitude']) if court['longitude'] is not None else None,
+                    'distance_km': court['distance_km'],
+                    'date': day.isoformat(),
+                    'start_time': cell_to_time(run_start).strftime('%H:%M'),
+                    'end_time': cell_to_time(run_end).strftime('%H:%M'),
+                    'latest_start': cell_to_time(run_end - duration_cells).strftime('%H:%M'),
+                    'total_price': float(to_money(
+                        quote_cells(prices[court['id'], day], run_start, run_start + duration_cells)
+                    )),
+                    '_order': (day, run_start),
+                })
+
+    if sort == 'distance':
+        windows.sort(key=lambda window: (window['distance_km'] or 0, window['_order'], window['court_id']))
+    else:
+        windows.sort(key=lambda window: (window['_order'], window['distance_km'] or 0, window['court_id']))
+
+    windows = windows[:limit]
+    for window in windows:
+        del window['_order']
+    return windows
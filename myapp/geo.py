@@ -0,0 +1,157 @@
+"""
+Геопространственные функции для карты площадок
+"""
+import math
+
+from django.db.models import Q
+
+
+# Ограничения проекции Web Mercator (как у Яндекс.Карт)
+MAX_LATITUDE = 85.05112878
+MIN_ZOOM = 0
+MAX_ZOOM = 21
+TILE_SIZE = 256
+
+
+def parse_bbox(value):
+    """
+    Разбор параметра bbox=minLng,minLat,maxLng,maxLat
+
+    Возвращает кортеж из четырёх float или выбрасывает ValueError.
+    """
+    parts = [part.strip() for part in (value or '').split(',')]
+    if len(parts) != 4:
+        raise ValueError('bbox должен содержать 4 числа: minLng,minLat,maxLng,maxLat')
+
+    min_lng, min_lat, max_lng, max_lat = (float(part) for part in parts)
+
+    if not all(math.isfinite(v) for v in (min_lng, min_lat, max_lng, max_lat)):
+        raise ValueError('bbox содержит некорректные числа')
+    if not (-90 <= min_lat <= 90 and -90 <= max_lat <= 90):
+        raise ValueError('Широта должна быть в диапазоне [-90, 90]')
+    if not (-180 <= min_lng <= 180 and -180 <= max_lng <= 180):
+        raise ValueError('Долгота должна быть в диапазоне [-180, 180]')
+    if min_lat > max_lat:
+        raise ValueError('minLat больше maxLat')
+
+    return min_lng, min_lat, max_lng, max_lat
+
+
+def parse_zoom(value):
+    """Разбор параметра zoom (целое 0..21), None если не указан"""
+    if value in (None, ''):
+        return None
+    zoom = int(value)
+    return max(MIN_ZOOM, min(MAX_ZOOM, zoom))
+
+
+def project(lat, lng, zoom):
+    """
+    Проекция Web Mercator: координаты точки в пикселях мировой карты
+    заданного масштаба
+    """
+    world_size = TILE_SIZE * (2 ** zoom)
+    lat = max(-MAX_LATITUDE, min(MAX_LATITUDE, lat))
+    x = (lng + 180.0) / 360.0 * world_size
+    y = (1.0 - math.asinh(math.tan(math.radians(lat))) / math.pi) / 2.0 * world_size
+    return x, y
+
+
+def lng_to_tile_x(lng, zoom):
+    """Номер тайла по долготе"""
+    n = 2 ** zoom
+    x = int((lng + 180.0) / 360.0 * n)
+    return max(0, min(n - 1, x))
+
+
+def lat_to_tile_y(lat, zoom):
+    """Номер тайла по широте (ось Y направлена на юг)"""
+    n = 2 ** zoom
+    lat = max(-MAX_LATITUDE, min(MAX_LATITUDE, lat))
+    lat_rad = math.radians(lat)
+    y = int((1.0 - math.asinh(math.tan(lat_rad)) / math.pi) / 2.0 * n)
+    return max(0, min(n - 1, y))
+
+
+def tile_x_to_lng(x, zoom):
+    """Долгота западной границы тайла"""
+    return x / (2 ** zoom) * 360.0 - 180.0
+
+
+def tile_y_to_lat(y, zoom):
+    """Широта северной границы тайла"""
+    n = math.pi - 2.0 * math.pi * y / (2 ** zoom)
+    return math.degrees(math.atan(math.sinh(n)))
+
+
+def tile_bounds(x, y, zoom):
+    """Границы тайла в виде (minLng, minLat, maxLng, maxLat)"""
+    return (
+        tile_x_to_lng(x, zoom),
+        tile_y_to_lat(y + 1, zoom),
+        tile_x_to_lng(x + 1, zoom),
+        tile_y_to_lat(y, zoom),
+    )
+
+
+def snap_bbox_to_tiles(bbox, zoom):
+    """
+    Расширить bbox до границ тайловой сетки заданного масштаба.
+
+    Соседние окна просмотра при небольшом сдвиге карты дают одинаковый
+    bbox, поэтому клиент может не перезапрашивать уже загруженную область.
+    """
+    min_lng, min_lat, max_lng, max_lat = bbox
+    if min_lng > max_lng:
+        # Окно пересекает 180-й меридиан - не выравниваем
+        return bbox
+
+    x_min = lng_to_tile_x(min_lng, zoom)
+    x_max = lng_to_tile_x(max_lng, zoom)
+    y_min = lat_to_tile_y(max_lat, zoom)
+    y_max = lat_to_tile_y(min_lat, zoom)
+
+    snapped_min_lng, snapped_min_lat, _, _ = tile_bounds(x_min, y_max, zoom)
+    _, _, snapped_max_lng, snapped_max_lat = tile_bounds(x_max, y_min, zoom)
+
+    # Полюса за пределами проекции оставляем как есть
+    if max_lat >= MAX_LATITUDE:
+        snapped_max_lat = max_lat
+    if min_lat <= -MAX_LATITUDE:
+        snapped_min_lat = min_lat
+
+    return (
+        round(snapped_min_lng, 6),
+        round(snapped_min_lat, 6),
+        round(snapped_max_lng, 6),
+        round(snapped_max_lat, 6),
+    )
+
+
+def bbox_q(bbox):
+    """
+    Условие попадания площадки в bbox.
+
+    Использует индекс по (latitude, longitude): диапазон по широте
+    отсекает большую часть строк, долгота проверяется в том же индексе.
+    """
+    min_lng, min_lat, max_lng, max_lat = bbox
+    condition = Q(latitude__gte=min_lat, latitude__lte=max_lat)
+
+    if min_lng <= max_lng:
+        condition &= Q(longitude__gte=min_lng, longitude__lte=max_lng)
+    else:
+        # Окно пересекает 180-й меридиан
+        condition &= Q(longitude__gte=min_lng) | Q(longitude__lte=max_lng)
+
+    return condition
+
+
+def bbox_contains(bbox, lat, lng):
+    """Попадает ли точка в bbox (проверка в памяти, аналог bbox_q)"""
+    min_lng, min_lat, max_lng, max_lat = bbox
+    if not (min_lat <= lat <= max_lat):
+        return False
+    if min_lng <= max_lng:
+        return min_lng <= lng <= max_lng
+    return lng >= min_lng or lng <= max_lng
@@ -0,0 +1,98 @@
+"""
+Ночная подготовка сетки временных слотов
+
+Для каждой площадки, открытой для бронирования, создаются часовые
+слоты TimeSlot в часы работы на advance_booking_days дней вперёд
+(существующие строки не трогаются). Прошедшие слоты удаляются пачками:
+свободные - сразу, слоты бронирований - через --retention-days дней.
+
+    python manage.py materialize_time_slots
+"""
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from django.utils import timezone
+
+from myapp.models import TimeSlot
+from myapp.availability import cell_to_time, opening_cells, CELL_MINUTES
+from myapp.court_layer import approved_courts
+
+
+SLOT_MINUTES = 60
+DEFAULT_BATCH_SIZE = 1000
+DEFAULT_RETENTION_DAYS = 365
+
+
+def court_slots(court, dates):
+    """Часовые слоты площадки в часы работы на даты"""
+    open_start, open_end = opening_cells(court.opening_time, court.closing_time)
+    step = SLOT_MINUTES // CELL_MINUTES
+    for day in dates:
+        for start in range(open_start, open_end - step + 1, step):
+            yield TimeSlot(
+                court_id=court.id,
+                date=day,
+                start_time=cell_to_time(start),
+                end_time=cell_to_time(start + step),
+            )
+
+
+class Command(BaseCommand):
+    help = 'Создать сетку временных слотов на срок бронирования и удалить прошедшие слоты'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+                            help='Размер пачки при вставке и удалении')
+        parser.add_argument('--retention-days', type=int, default=DEFAULT_RETENTION_DAYS,
+                            help='Сколько дней хранить прошедшие слоты бронирований')
+        parser.add_argument('--skip-prune', action='store_true',
+                            help='Не удалять прошедшие слоты')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        checked = self.materialize(batch_size)
+        self.stdout.write(f'Слотов в сетке (существующие пропущены): {checked}')
+
+        if not options['skip_prune']:
+            deleted = self.prune(batch_size, options['retention_days'])
+            self.stdout.write(f'Прошедших слотов удалено: {deleted}')
+
+    def materialize(self, batch_size):
+        today = timezone.localdate()
+        courts = approved_courts().filter(booking_enabled=True).only(
+            'id', 'opening_time', 'closing_time', 'advance_booking_days'
+        )
+
+        checked = 0
+        batch = []
+        for court in courts.iterator():
+            dates = [today + timedelta(days=offset) for offset in range(court.advance_booking_days + 1)]
+            for slot in court_slots(court, dates):
+                batch.append(slot)
+                if len(batch) >= batch_size:
+                    checked += self._insert(batch)
+                    batch = []
+        if batch:
+            checked += self._insert(batch)
+        return checked
+
+    @staticmethod
+    def _insert(batch):
+        # Свободные слоты не меняют занятость, сбрасывать кэш не нужно
+        TimeSlot.objects.bulk_create(batch, ignore_conflicts=True)
+        return len(batch)
+
+    def prune(self, batch_size, retention_days):
+        today = timezone.localdate()
+        stale = TimeSlot.objects.filter(
+            Q(date__lt=today, booking__isnull=True) |
+            Q(date__lt=today - timedelta(days=retention_days))
+        )
+
+        deleted = 0
+        while True:
+            ids = list(stale.order_by('id').values_list('id', flat=True)[:batch_size])
+            if not ids:
+                return deleted
+            deleted += TimeSlot.objects.filter(id__in=ids).delete()[0]
@@ -0,0 +1,90 @@
+"""
+Плановое обновление статусов бронирований
+
+Подтверждённые брони, время которых прошло, становятся completed,
+неподтверждённые - expired, их слоты TimeSlot освобождаются. Будущие
+брони не трогаются, даже если их давно не подтвердили: подтверждение
+не обязательно, и бронь держит время до самой игры. Брони выбираются по индексу (booking_date, start_time)
+и обновляются пачками UPDATE, карты занятости затронутых дней
+сбрасываются.
+
+    python manage.py update_booking_statuses
+"""
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from myapp.models import CourtBooking, TimeSlot
+from myapp.availability import invalidate_availability
+
+
+DEFAULT_BATCH_SIZE = 1000
+
+
+def finished_q(now):
+    """
+    Брони, время которых закончилось к моменту now (местное время).
+
+    Бронь с end_time <= start_time идёт через полночь и заканчивается на
+    следующий день после booking_date.
+    """
+    today = now.date()
+    yesterday = today - timedelta(days=1)
+    same_day = Q(end_time__gt=F('start_time'))
+    return (
+        Q(booking_date__lt=yesterday)
+        | Q(booking_date=yesterday) & (same_day | Q(end_time__lte=now.time()))
+        | Q(booking_date=today, end_time__lte=now.time()) & same_day
+    )
+
+
+class Command(BaseCommand):
+    help = 'Завершить прошедшие брони и снять неподтверждённые'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+                            help='Размер пачки при обновлении')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        now = timezone.localtime()
+
+        completed = self.update_status(
+            CourtBooking.objects.filter(finished_q(now), status='confirmed'),
+            'completed', batch_size
+        )
+        self.stdout.write(f'Завершено броней: {completed}')
+
+        expired = self.update_status(
+            CourtBooking.objects.filter(finished_q(now), status='pending'),
+            'expired', batch_size, release_slots=True
+        )
+        self.stdout.write(f'Снято неподтверждённых броней: {expired}')
+
+    @staticmethod
+    def update_status(bookings, status, batch_size, release_slots=False):
+        updated = 0
+        while True:
+            batch = list(
+                bookings.order_by('booking_date', 'start_time')
+                .values_list('id', 'court_id', 'booking_date')[:batch_size]
+            )
+            if not batch:
+                return updated
+
+            ids = [booking_id for booking_id, _, _ in batch]
+            with transaction.atomic():
+                # Условие выборки повторяется: бронь могли подтвердить или отменить
+                updated += bookings.filter(id__in=ids).update(status=status, updated_at=timezone.now())
+                if release_slots:
+                    TimeSlot.objects.filter(booking_id__in=ids, booking__status=status).update(booking=None, is_booked=False)
+
+            # update() не отправляет сигналы - сбрасываем карты занятости сами
+            days = {}
+            for _, court_id, day in batch:
+                days.setdefault(court_id, set()).add(day)
+            for court_id, court_days in days.items():
+                invalidate_availability(court_id, *court_days)
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-18 10:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0009_userprofile_district_userprofile_favorite_court_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='volleyballcourt',
+            index=models.Index(fields=['latitude', 'longitude'], name='myapp_volle_latitud_61d5dd_idx'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 4.2.30 on 2026-10-18 11:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0010_volleyballcourt_coordinates_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CourtTombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('court_id', models.BigIntegerField(verbose_name='ID площадки')),
+                ('deleted_at', models.DateTimeField(auto_now_add=True, db_index=True, verbose_name='Дата удаления')),
+            ],
+            options={
+                'verbose_name': 'Удалённая площадка',
+                'verbose_name_plural': 'Удалённые площадки',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='volleyballcourt',
+            index=models.Index(fields=['updated_at'], name='myapp_volle_updated_70213b_idx'),
+        ),
+    ]
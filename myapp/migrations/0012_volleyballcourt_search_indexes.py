@@ -0,0 +1,97 @@
+# Generated by Django 4.2.30 on 2026-10-18 12:20
+#
+# Индексы полнотекстового поиска площадок (см. myapp/search.py):
+# PostgreSQL - GIN по tsvector и триграммам названия,
+# SQLite - таблица FTS5 с триггерами синхронизации.
+
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations
+
+
+FTS_TABLE = 'myapp_volleyballcourt_fts'
+COURT_TABLE = 'myapp_volleyballcourt'
+
+SEARCH_VECTOR_INDEX = 'court_search_vector_idx'
+NAME_TRIGRAM_INDEX = 'court_name_trgm_idx'
+
+
+def _postgres_indexes():
+    return [
+        GinIndex(SearchVector('name', 'address', 'city', config='russian'), name=SEARCH_VECTOR_INDEX),
+        GinIndex(fields=['name'], opclasses=['gin_trgm_ops'], name=NAME_TRIGRAM_INDEX),
+    ]
+
+
+def _sqlite_has_fts5(schema_editor):
+    cursor = schema_editor.connection.cursor()
+    cursor.execute("SELECT sqlite_compileoption_used('ENABLE_FTS5')")
+    if cursor.fetchone()[0]:
+        return True
+    # Сборки с FTS5 в виде расширения не отражают его в compile options
+    try:
+        cursor.execute('CREATE VIRTUAL TABLE temp.fts5_probe USING fts5(value)')
+        cursor.execute('DROP TABLE temp.fts5_probe')
+        return True
+    except Exception:
+        return False
+
+
+def create_search_indexes(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    VolleyballCourt = apps.get_model('myapp', 'VolleyballCourt')
+
+    if vendor == 'postgresql':
+        schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        for index in _postgres_indexes():
+            schema_editor.add_index(VolleyballCourt, index)
+
+    elif vendor == 'sqlite' and _sqlite_has_fts5(schema_editor):
+        schema_editor.execute(
+            f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5("
+            f"name, address, city, content='{COURT_TABLE}', content_rowid='id', "
+            f"tokenize='unicode61 remove_diacritics 2')"
+        )
+        schema_editor.execute(
+            f"CREATE TRIGGER {FTS_TABLE}_ai AFTER INSERT ON {COURT_TABLE} BEGIN "
+            f"INSERT INTO {FTS_TABLE}(rowid, name, address, city) "
+            f"VALUES (new.id, new.name, new.address, new.city); END"
+        )
+        schema_editor.execute(
+            f"CREATE TRIGGER {FTS_TABLE}_ad AFTER DELETE ON {COURT_TABLE} BEGIN "
+            f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, address, city) "
+            f"VALUES ('delete', old.id, old.name, old.address, old.city); END"
+        )
+        schema_editor.execute(
+            f"CREATE TRIGGER {FTS_TABLE}_au AFTER UPDATE OF name, address, city ON {COURT_TABLE} BEGIN "
+            f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, address, city) "
+            f"VALUES ('delete', old.id, old.name, old.address, old.city); "
+            f"INSERT INTO {FTS_TABLE}(rowid, name, address, city) "
+            f"VALUES (new.id, new.name, new.address, new.city); END"
+        )
+        schema_editor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+
+
+def drop_search_indexes(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    VolleyballCourt = apps.get_model('myapp', 'VolleyballCourt')
+
+    if vendor == 'postgresql':
+        for index in _postgres_indexes():
+            schema_editor.remove_index(VolleyballCourt, index)
+
+    elif vendor == 'sqlite':
+        for suffix in ('ai', 'ad', 'au'):
+            schema_editor.execute(f'DROP TRIGGER IF EXISTS {FTS_TABLE}_{suffix}')
+        schema_editor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0011_courttombstone_volleyballcourt_updated_at_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 4.2.30 on 2026-10-18 13:40
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('myapp', '0012_volleyballcourt_search_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BookingHold',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='Дата')),
+                ('start_time', models.TimeField(verbose_name='Время начала')),
+                ('end_time', models.TimeField(verbose_name='Время окончания')),
+                ('expires_at', models.DateTimeField(db_index=True, verbose_name='Действует до')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Дата создания')),
+                ('court', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='booking_holds', to='myapp.volleyballcourt', verbose_name='Площадка')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='booking_holds', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+            ],
+            options={
+                'verbose_name': 'Удержание времени',
+                'verbose_name_plural': 'Удержания времени',
+                'indexes': [models.Index(fields=['court', 'date'], name='myapp_booki_court_i_aeae57_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-18 14:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0013_bookinghold'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='courtbooking',
+            name='series',
+            field=models.UUIDField(blank=True, db_index=True, null=True, verbose_name='Серия регулярных игр'),
+        ),
+    ]
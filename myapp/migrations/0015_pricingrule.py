@@ -0,0 +1,34 @@
+# Generated by Django 4.2.30 on 2026-10-18 15:00
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0014_courtbooking_series'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PricingRule',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, verbose_name='Название')),
+                ('weekdays', models.CharField(blank=True, help_text='Номера дней через запятую: 0 - понедельник, 6 - воскресенье. Пусто - все дни', max_length=20, verbose_name='Дни недели')),
+                ('start_time', models.TimeField(blank=True, null=True, verbose_name='Время начала')),
+                ('end_time', models.TimeField(blank=True, null=True, verbose_name='Время окончания')),
+                ('price_per_hour', models.DecimalField(blank=True, decimal_places=2, max_digits=8, null=True, verbose_name='Цена за час')),
+                ('multiplier', models.DecimalField(decimal_places=2, default=1, max_digits=4, verbose_name='Множитель цены')),
+                ('priority', models.IntegerField(default=0, help_text='Правило с большим приоритетом важнее', verbose_name='Приоритет')),
+                ('is_active', models.BooleanField(default=True, verbose_name='Активно')),
+                ('court', models.ForeignKey(blank=True, help_text='Пусто - правило для всех площадок', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='pricing_rules', to='myapp.volleyballcourt', verbose_name='Площадка')),
+            ],
+            options={
+                'verbose_name': 'Правило цены',
+                'verbose_name_plural': 'Правила цен',
+                'ordering': ['priority', 'id'],
+            },
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 4.2.30 on 2026-10-18 16:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0015_pricingrule'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='timeslot',
+            options={'ordering': ['date', 'start_time', 'lane'], 'verbose_name': 'Временной слот', 'verbose_name_plural': 'Временные слоты'},
+        ),
+        migrations.AddField(
+            model_name='timeslot',
+            name='lane',
+            field=models.PositiveSmallIntegerField(default=0, verbose_name='Корт'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='timeslot',
+            unique_together={('court', 'date', 'start_time', 'lane')},
+        ),
+    ]
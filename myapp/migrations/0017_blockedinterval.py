@@ -0,0 +1,95 @@
+# Generated by Django 4.2.30 on 2026-10-18 17:00
+#
+# Закрытия площадок интервалами (BlockedInterval) вместо почасовых
+# заблокированных слотов. На PostgreSQL пересечения интервалов одной
+# площадки запрещает ограничение исключения по GiST (court_id, tstzrange),
+# на SQLite остаётся обычный индекс (court, start_at, end_at).
+# Существующие заблокированные слоты переносятся в интервалы.
+
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.db import migrations, models
+from django.utils import timezone
+import django.db.models.deletion
+
+
+INTERVAL_TABLE = 'myapp_blockedinterval'
+EXCLUSION_CONSTRAINT = 'blockedinterval_no_overlap'
+
+
+def create_exclusion_constraint(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    # btree_gist нужен для сравнения court_id на равенство в GiST
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS btree_gist')
+    schema_editor.execute(
+        f"ALTER TABLE {INTERVAL_TABLE} ADD CONSTRAINT {EXCLUSION_CONSTRAINT} "
+        f"EXCLUDE USING gist (court_id WITH =, tstzrange(start_at, end_at) WITH &&)"
+    )
+
+
+def drop_exclusion_constraint(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(f'ALTER TABLE {INTERVAL_TABLE} DROP CONSTRAINT IF EXISTS {EXCLUSION_CONSTRAINT}')
+
+
+def move_blocked_slots(apps, schema_editor):
+    """Склеить идущие подряд заблокированные слоты в интервалы"""
+    TimeSlot = apps.get_model('myapp', 'TimeSlot')
+    BlockedInterval = apps.get_model('myapp', 'BlockedInterval')
+
+    def aware(day, value):
+        return timezone.make_aware(datetime.combine(day, value))
+
+    intervals = []
+    slots = TimeSlot.objects.filter(is_blocked=True).order_by('court_id', 'date', 'start_time')
+    for slot in slots.iterator():
+        start_at = aware(slot.date, slot.start_time)
+        end_at = aware(slot.date, slot.end_time)
+        if end_at <= start_at:
+            end_at = aware(slot.date + timedelta(days=1), slot.end_time)
+
+        last = intervals[-1] if intervals else None
+        if last and last.court_id == slot.court_id and last.end_at >= start_at:
+            last.end_at = max(last.end_at, end_at)
+        else:
+            intervals.append(BlockedInterval(court_id=slot.court_id, start_at=start_at, end_at=end_at))
+
+    BlockedInterval.objects.bulk_create(intervals, batch_size=1000)
+    # Слоты только для блокировки больше не нужны, у остальных снимаем флаг
+    TimeSlot.objects.filter(is_blocked=True, booking__isnull=True, price__isnull=True).delete()
+    TimeSlot.objects.filter(is_blocked=True).update(is_blocked=False)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('myapp', '0016_timeslot_lane'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BlockedInterval',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('start_at', models.DateTimeField(verbose_name='Начало')),
+                ('end_at', models.DateTimeField(verbose_name='Окончание')),
+                ('reason', models.CharField(blank=True, max_length=200, verbose_name='Причина')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Дата создания')),
+                ('court', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='blocked_intervals', to='myapp.volleyballcourt', verbose_name='Площадка')),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='blocked_intervals', to=settings.AUTH_USER_MODEL, verbose_name='Кто закрыл')),
+            ],
+            options={
+                'verbose_name': 'Закрытие площадки',
+                'verbose_name_plural': 'Закрытия площадок',
+                'ordering': ['court', 'start_at'],
+                'indexes': [models.Index(fields=['court', 'start_at', 'end_at'], name='myapp_block_court_i_6ff42f_idx')],
+                'constraints': [models.CheckConstraint(check=models.Q(('end_at__gt', models.F('start_at'))), name='blockedinterval_end_after_start')],
+            },
+        ),
+        migrations.RunPython(create_exclusion_constraint, drop_exclusion_constraint),
+        migrations.RunPython(move_blocked_slots, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 4.2.30 on 2026-10-18 18:00
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0017_blockedinterval'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='game',
+            name='court_booking',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='games', to='myapp.courtbooking', verbose_name='Бронь площадки'),
+        ),
+    ]
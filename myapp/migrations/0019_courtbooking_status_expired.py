@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-18 19:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0018_game_court_booking'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='courtbooking',
+            name='status',
+            field=models.CharField(choices=[('pending', '⏳ Ожидает подтверждения'), ('confirmed', '✅ Подтверждено'), ('cancelled', '❌ Отменено'), ('completed', '🏐 Завершено'), ('rejected', '🚫 Отклонено'), ('expired', '⌛ Не подтверждено вовремя')], default='pending', max_length=20, verbose_name='Статус игры'),
+        ),
+    ]
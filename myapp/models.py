@@ -149,6 +149,12 @@ class VolleyballCourt(models.Model):
         ordering = ['city', 'name']
         verbose_name = "Волейбольная площадка"
         verbose_name_plural = "Волейбольные площадки"
+        indexes = [
+            # Выборка площадок по окну карты (bbox)
+            models.Index(fields=['latitude', 'longitude']),
+            # Инкрементальная синхронизация карты (courts_api?since=)
+            models.Index(fields=['updated_at']),
+        ]
     
     def __str__(self):
         return f"{self.name} ({self.city})"
@@ -230,6 +236,18 @@ class CourtPhoto(models.Model):
     def __str__(self):
         return f"Фото для {self.court.name}"
 
+class CourtTombstone(models.Model):
+    """Отметка об удалённой площадке для инкрементальной синхронизации карты"""
+    court_id = models.BigIntegerField('ID площадки')
+    deleted_at = models.DateTimeField('Дата удаления', auto_now_add=True, db_index=True)
+
+    class Meta:
+        verbose_name = 'Удалённая площадка'
+        verbose_name_plural = 'Удалённые площадки'
+
+    def __str__(self):
+        return f"Площадка #{self.court_id} удалена {self.deleted_at:%d.%m.%Y %H:%M}"
+
 class Game(models.Model):
     GAME_TYPES = [
         ('beach', 'Пляжный волейбол (2x2)'),
@@ -305,6 +323,17 @@ class Game(models.Model):
         verbose_name="Выбранная площадка"
     )
     
+    # Бронь площадки, в рамках которой проходит игра: её время уже
+    # занято бронью и второй раз в занятости не учитывается
+    court_booking = models.ForeignKey(
+        'CourtBooking',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='games',
+        verbose_name="Бронь площадки"
+    )
+    
     # Описание
     description = models.TextField(blank=True, verbose_name="Описание")
     
@@ -394,6 +423,7 @@ class CourtBooking(models.Model):
         ('cancelled', '❌ Отменено'),
         ('completed', '🏐 Завершено'),
         ('rejected', '🚫 Отклонено'),
+        ('expired', '⌛ Не подтверждено вовремя'),
     ]
     
     PAYMENT_STATUS_CHOICES = [
@@ -424,6 +454,9 @@ class CourtBooking(models.Model):
     end_time = models.TimeField(verbose_name="Время окончания")
     hours = models.PositiveIntegerField(verbose_name="Количество часов", default=1)
     
+    # Регулярные игры: все брони серии имеют одинаковый идентификатор
+    series = models.UUIDField(null=True, blank=True, db_index=True, verbose_name="Серия регулярных игр")
+    
     # Участники
     participants_count = models.PositiveIntegerField(
         default=6,
@@ -501,12 +534,16 @@ class CourtBooking(models.Model):
     def __str__(self):
         return f"{self.booking_number} - {self.court.name} ({self.booking_date})"
     
+    @staticmethod
+    def generate_booking_number():
+        """Номер брони: BOOK-YYYYMMDD-XXXX"""
+        date_part = timezone.now().strftime('%Y%m%d')
+        unique_part = uuid.uuid4().hex[:4].upper()
+        return f"BOOK-{date_part}-{unique_part}"
+    
     def save(self, *args, **kwargs):
         if not self.booking_number:
-            # Генерация уникального номера брони: BOOK-YYYYMMDD-XXXX
-            date_part = timezone.now().strftime('%Y%m%d')
-            unique_part = uuid.uuid4().hex[:4].upper()
-            self.booking_number = f"BOOK-{date_part}-{unique_part}"
+            self.booking_number = self.generate_booking_number()
         
         if not self.total_price:
             self.total_price = self.price_per_hour * self.hours
@@ -563,6 +600,9 @@ class TimeSlot(models.Model):
     is_booked = models.BooleanField(default=False, verbose_name="Занят")
     is_blocked = models.BooleanField(default=False, verbose_name="Заблокирован")
     
+    # Номер корта на площадке с несколькими кортами (courts_count)
+    lane = models.PositiveSmallIntegerField(default=0, verbose_name="Корт")
+    
     # Связанная игра
     booking = models.ForeignKey(
         CourtBooking,
@@ -585,8 +625,8 @@ class TimeSlot(models.Model):
     class Meta:
         verbose_name = "Временной слот"
         verbose_name_plural = "Временные слоты"
-        unique_together = ['court', 'date', 'start_time']
-        ordering = ['date', 'start_time']
+        unique_together = ['court', 'date', 'start_time', 'lane']
+        ordering = ['date', 'start_time', 'lane']
     
     def __str__(self):
         return f"{self.court.name} - {self.date} {self.start_time}"
@@ -611,6 +651,130 @@ class TimeSlot(models.Model):
         """Текущий ли слот"""
         return self.datetime_start <= timezone.now() <= self.datetime_end
 
+class BookingHold(models.Model):
+    """Временное удержание времени на площадке, пока игрок оформляет игру"""
+    court = models.ForeignKey(
+        VolleyballCourt,
+        on_delete=models.CASCADE,
+        related_name='booking_holds',
+        verbose_name="Площадка"
+    )
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='booking_holds',
+        verbose_name="Пользователь"
+    )
+    date = models.DateField(verbose_name="Дата")
+    start_time = models.TimeField(verbose_name="Время начала")
+    end_time = models.TimeField(verbose_name="Время окончания")
+    expires_at = models.DateTimeField(db_index=True, verbose_name="Действует до")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Дата создания")
+    
+    class Meta:
+        verbose_name = "Удержание времени"
+        verbose_name_plural = "Удержания времени"
+        indexes = [
+            models.Index(fields=['court', 'date']),
+        ]
+    
+    def __str__(self):
+        return f"{self.court_id} - {self.date} {self.start_time}-{self.end_time} до {self.expires_at:%H:%M}"
+
+class BlockedInterval(models.Model):
+    """
+    Закрытие площадки на интервал времени (ремонт, частное мероприятие).
+    Один интервал может длиться сколько угодно дней; пересекающихся
+    интервалов у площадки нет (на PostgreSQL это проверяет ограничение
+    исключения, см. миграцию).
+    """
+    court = models.ForeignKey(
+        VolleyballCourt,
+        on_delete=models.CASCADE,
+        related_name='blocked_intervals',
+        verbose_name="Площадка"
+    )
+    start_at = models.DateTimeField(verbose_name="Начало")
+    end_at = models.DateTimeField(verbose_name="Окончание")
+    reason = models.CharField(max_length=200, blank=True, verbose_name="Причина")
+    created_by = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='blocked_intervals',
+        verbose_name="Кто закрыл"
+    )
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Дата создания")
+    
+    class Meta:
+        verbose_name = "Закрытие площадки"
+        verbose_name_plural = "Закрытия площадок"
+        ordering = ['court', 'start_at']
+        indexes = [
+            models.Index(fields=['court', 'start_at', 'end_at']),
+        ]
+        constraints = [
+            models.CheckConstraint(
+                check=models.Q(end_at__gt=models.F('start_at')),
+                name='blockedinterval_end_after_start'
+            ),
+        ]
+    
+    def __str__(self):
+        return f"{self.court_id}: {self.start_at:%d.%m.%Y %H:%M} - {self.end_at:%d.%m.%Y %H:%M}"
+
+class PricingRule(models.Model):
+    """Правило цены: часы пик, выходные, особые цены отдельных площадок"""
+    name = models.CharField(max_length=100, verbose_name="Название")
+    court = models.ForeignKey(
+        VolleyballCourt,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='pricing_rules',
+        verbose_name="Площадка",
+        help_text="Пусто - правило для всех площадок"
+    )
+    weekdays = models.CharField(
+        max_length=20,
+        blank=True,
+        verbose_name="Дни недели",
+        help_text="Номера дней через запятую: 0 - понедельник, 6 - воскресенье. Пусто - все дни"
+    )
+    start_time = models.TimeField(null=True, blank=True, verbose_name="Время начала")
+    end_time = models.TimeField(null=True, blank=True, verbose_name="Время окончания")
+    
+    # Цена: либо фиксированная за час, либо множитель к цене площадки
+    price_per_hour = models.DecimalField(
+        max_digits=8,
+        decimal_places=2,
+        null=True,
+        blank=True,
+        verbose_name="Цена за час"
+    )
+    multiplier = models.DecimalField(
+        max_digits=4,
+        decimal_places=2,
+        default=1,
+        verbose_name="Множитель цены"
+    )
+    
+    priority = models.IntegerField(default=0, verbose_name="Приоритет", help_text="Правило с большим приоритетом важнее")
+    is_active = models.BooleanField(default=True, verbose_name="Активно")
+    
+    class Meta:
+        verbose_name = "Правило цены"
+        verbose_name_plural = "Правила цен"
+        ordering = ['priority', 'id']
+    
+    def __str__(self):
+        return self.name
+    
+    def weekday_set(self):
+        """Дни недели правила (пустое множество - все дни)"""
+        return {int(day) for day in self.weekdays.split(',') if day.strip().isdigit()}
+
 class UserProfile(models.Model):
     """Расширенный профиль пользователя"""
     POSITION_CHOICES = [
@@ -0,0 +1,191 @@
+"""
+Поиск ближайших площадок ("площадки рядом со мной")
+
+В каждом воркере держится сеточный индекс одобренных площадок:
+координаты разложены по ячейкам GRID_CELL_DEG x GRID_CELL_DEG градусов.
+Поиск обходит кольца ячеек вокруг точки запроса и останавливается,
+как только следующее кольцо заведомо дальше k-й найденной площадки
+или радиуса поиска. Индекс пересобирается при смене версии слоя.
+"""
+import heapq
+import math
+import threading
+
+from .court_layer import approved_courts, get_layer_version
+from .court_filters import match_court_filters
+
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180.0
+
+# Размер ячейки сетки в градусах (~5.5 км по широте)
+GRID_CELL_DEG = 0.05
+
+DEFAULT_K = 10
+MAX_K = 100
+DEFAULT_RADIUS_KM = 50.0
+MAX_RADIUS_KM = 500.0
+
+# Поля площадки, которые хранятся в индексе и возвращаются клиенту
+INDEX_FIELDS = (
+    'id', 'name', 'address', 'city', 'latitude', 'longitude',
+    'court_type', 'surface', 'is_free', 'price_per_hour', 'rating',
+    'is_lighted', 'has_parking', 'has_showers', 'has_locker_rooms',
+    'has_equipment_rental', 'has_cafe', 'opening_time', 'closing_time',
+    'booking_enabled',
+)
+
+
+class CourtGridIndex:
+    """Сеточный пространственный индекс площадок"""
+
+    def __init__(self, courts):
+        self.cells = {}
+        self.courts = {}
+        for court in courts:
+            lat, lng = court['latitude'], court['longitude']
+            self.courts[court['id']] = court
+            self.cells.setdefault(self.cell_of(lat, lng), []).append(
+                (math.radians(lat), math.radians(lng), math.cos(math.radians(lat)), court['id'])
+            )
+
+    @staticmethod
+    def cell_of(lat, lng):
+        return int(math.floor(lat / GRID_CELL_DEG)), int(math.floor(lng / GRID_CELL_DEG))
+
+    def __len__(self):
+        return len(self.courts)
+
+    @staticmethod
+    def _ring(row, col, ring):
+        """Ячейки, отстоящие ровно на ring колец от (row, col)"""
+        if ring == 0:
+            yield row, col
+            return
+        for c in range(col - ring, col + ring + 1):
+            yield row - ring, c
+            yield row + ring, c
+        for r in range(row - ring + 1, row + ring):
+            yield r, col - ring
+            yield r, col + ring
+
+    @staticmethod
+    def _ring_lower_bound_km(lat, ring):
+        """
+        Нижняя граница расстояния до любой точки кольца ring.
+
+        Между точкой запроса и кольцом лежит не меньше ring - 1 целых
+        ячеек; по долготе ячейка сужается к полюсу, поэтому берём
+        косинус самой высокой широты, которую может задеть кольцо.
+        """
+        if ring <= 1:
+            return 0.0
+        edge_lat = min(89.9, abs(lat) + (ring + 1) * GRID_CELL_DEG)
+        return (ring - 1) * GRID_CELL_DEG * KM_PER_DEGREE * math.cos(math.radians(edge_lat))
+
+    def nearest(self, lat, lng, k=DEFAULT_K, radius_km=DEFAULT_RADIUS_KM, predicate=None):
+        """
+        k ближайших площадок в пределах radius_km.
+
+        Возвращает список (distance_km, court) по возрастанию расстояния.
+        """
+        if not self.cells or k <= 0:
+            return []
+
+        lat_rad = math.radians(lat)
+        lng_rad = math.radians(lng)
+        cos_lat = math.cos(lat_rad)
+        # max-heap из k лучших: (-distance, court_id)
+        best = []
+
+        def visit(cell_points):
+            for p_lat, p_lng, p_cos, court_id in cell_points:
+                # Гаверсинус с заранее посчитанными радианами и косинусами
+                a = math.sin((p_lat - lat_rad) / 2) ** 2 + cos_lat * p_cos * math.sin((p_lng - lng_rad) / 2) ** 2
+                distance = 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+                if distance > radius_km:
+                    continue
+                if len(best) == k and distance >= -best[0][0]:
+                    continue
+                if predicate is not None and not predicate(self.courts[court_id]):
+                    continue
+                if len(best) < k:
+                    heapq.heappush(best, (-distance, court_id))
+                else:
+                    heapq.heapreplace(best, (-distance, court_id))
+
+        row, col = self.cell_of(lat, lng)
+        ring = 0
+        visited = 0
+        while True:
+            bound = self._ring_lower_bound_km(lat, ring)
+            if bound > radius_km or (len(best) == k and bound > -best[0][0]):
+                break
+            # Кольца стали больше, чем непустых ячеек в индексе -
+            # дешевле один раз проверить все оставшиеся ячейки
+            if visited + 8 * ring > len(self.cells):
+                for (r, c), cell_points in self.cells.items():
+                    if max(abs(r - row), abs(c - col)) >= ring:
+                        visit(cell_points)
+                break
+            for cell in self._ring(row, col, ring):
+                visited += 1
+                cell_points = self.cells.get(cell)
+                if cell_points:
+                    visit(cell_points)
+            ring += 1
+
+        return [
+            (-neg_distance, self.courts[court_id])
+            for neg_distance, court_id in sorted(best, reverse=True)
+        ]
+
+
+_index = None
+_index_version = None
+_index_lock = threading.Lock()
+
+
+def build_index():
+    """Построить индекс по одобренным площадкам с координатами"""
+    rows = approved_courts().filter(
+        latitude__isnull=False,
+        longitude__isnull=False
+    ).values(*INDEX_FIELDS)
+
+    courts = []
+    for row in rows:
+        row['latitude'] = float(row['latitude'])
+        row['longitude'] = float(row['longitude'])
+        row['price_per_hour'] = float(row['price_per_hour'] or 0)
+        row['rating'] = float(row['rating'] or 0)
+        row['opening_time'] = row['opening_time'].strftime('%H:%M') if row['opening_time'] else None
+        row['closing_time'] = row['closing_time'].strftime('%H:%M') if row['closing_time'] else None
+        courts.append(row)
+    return CourtGridIndex(courts)
+
+
+def get_index():
+    """Индекс текущего воркера (пересобирается при смене версии слоя)"""
+    global _index, _index_version
+    version = get_layer_version()
+    if _index is None or _index_version != version:
+        with _index_lock:
+            if _index is None or _index_version != version:
+                _index = build_index()
+                _index_version = version
+    return _index
+
+
+def find_nearest_courts(lat, lng, k=DEFAULT_K, radius_km=DEFAULT_RADIUS_KM, filters=None):
+    """Ближайшие одобренные площадки с учётом фильтров search_courts_api"""
+    predicate = None
+    if filters is not None:
+        predicate = lambda court: match_court_filters(court, filters)  # noqa: E731
+
+    results = []
+    for distance, court in get_index().nearest(lat, lng, k=k, radius_km=radius_km, predicate=predicate):
+        court = dict(court)
+        court['distance_km'] = round(distance, 3)
+        results.append(court)
+    return results
@@ -0,0 +1,237 @@
+"""
+Цены площадок по времени: часы пик, выходные, особые цены площадок
+
+Для пары (площадка, дата) один раз считается вектор цен за час по
+ячейкам дня (CELL_MINUTES минут, см. myapp.availability):
+
+1. базовая цена площадки (0 для бесплатных площадок);
+2. правила PricingRule по возрастанию приоритета - более важное правило
+   перекрывает менее важное, правило площадки - общее правило;
+3. цена конкретного слота TimeSlot.price.
+
+Векторы кэшируются под ключом с версией общих правил (меняется при
+изменении правил без площадки) и версией цен площадки (меняется при
+изменении её цены или её правил), поэтому правка одной площадки не
+сбрасывает цены остальных. Изменение слота сбрасывает вектор его дня.
+Сетка слотов, расчёт стоимости и поиск окон только читают готовые
+векторы.
+"""
+import uuid
+from datetime import time, timedelta
+from decimal import Decimal
+
+from django.core.cache import cache
+
+from .models import PricingRule, TimeSlot
+from .availability import cell_range, time_to_cell, time_to_cell_end, CELL_MINUTES, CELLS_PER_DAY
+from .court_layer import LAYER_CACHE_TIMEOUT
+
+
+RULES_VERSION_KEY = 'pricing:rules:version'
+GLOBAL_RULES_VERSION_KEY = 'pricing:global:version'
+
+
+def _get_version(key):
+    version = cache.get(key)
+    if version is None:
+        version = uuid.uuid4().hex
+        if not cache.add(key, version, None):
+            version = cache.get(key, version)
+    return version
+
+
+def get_rules_version():
+    """Текущая версия списка правил цен (меняется при любом изменении правил)"""
+    return _get_version(RULES_VERSION_KEY)
+
+
+def get_global_rules_version():
+    """Текущая версия общих правил (без площадки)"""
+    return _get_version(GLOBAL_RULES_VERSION_KEY)
+
+
+def court_version_key(court_id):
+    return f'pricing:court:{court_id}:version'
+
+
+def get_court_versions(court_ids):
+    """Версии цен площадок одним get_many: {court_id: версия}"""
+    keys = {court_version_key(court_id): court_id for court_id in court_ids}
+    versions = {keys[key]: version for key, version in cache.get_many(list(keys)).items()}
+    for court_id in court_ids:
+        if court_id not in versions:
+            versions[court_id] = _get_version(court_version_key(court_id))
+    return versions
+
+
+def bump_court_price_version(court_id):
+    """Пометить цены площадки как изменённые"""
+    cache.set(court_version_key(court_id), uuid.uuid4().hex, None)
+
+
+def bump_rules_version(*court_ids):
+    """
+    Пометить правила цен как изменённые. court_ids - площадки изменённых
+    правил (None - общее правило, меняет цены всех площадок).
+    """
+    cache.set(RULES_VERSION_KEY, uuid.uuid4().hex, None)
+    for court_id in set(court_ids):
+        if court_id is None:
+            cache.set(GLOBAL_RULES_VERSION_KEY, uuid.uuid4().hex, None)
+        else:
+            bump_court_price_version(court_id)
+
+
+def get_rules(version=None):
+    """
+    Активные правила в порядке применения:
+    [(court_id, дни недели, start_cell, end_cell, цена или None, множитель)].
+    Правило через полночь (end_time раньше start_time) делится на две части.
+    Без start_time правило действует с начала суток, без end_time - до конца.
+    """
+    key = f'pricing:rules:{version or get_rules_version()}'
+    rules = cache.get(key)
+    if rules is None:
+        rows = sorted(
+            PricingRule.objects.filter(is_active=True),
+            key=lambda rule: (rule.priority, rule.court_id is not None, rule.id)
+        )
+        rules = []
+        for rule in rows:
+            after_midnight = 0
+            start = time_to_cell(rule.start_time) if rule.start_time is not None else 0
+            end = CELLS_PER_DAY
+            if rule.end_time is not None:
+                start, end = cell_range(rule.start_time or time.min, rule.end_time)
+                if rule.start_time is not None and rule.end_time <= rule.start_time:
+                    after_midnight = time_to_cell_end(rule.end_time)
+            weekdays = frozenset(rule.weekday_set())
+            price = float(rule.price_per_hour) if rule.price_per_hour is not None else None
+            rules.append((rule.court_id, weekdays, start, end, price, float(rule.multiplier)))
+            if after_midnight:
+                # Правило через полночь: остаток действует утром следующего дня недели
+                next_weekdays = frozenset((weekday + 1) % 7 for weekday in weekdays)
+                rules.append((rule.court_id, next_weekdays, 0, after_midnight, price, float(rule.multiplier)))
+        cache.set(key, rules, LAYER_CACHE_TIMEOUT)
+    return rules
+
+
+def _pricing_params(court):
+    """id, цена и признак бесплатности площадки (модель или словарь)"""
+    if isinstance(court, dict):
+        return court['id'], court['price_per_hour'], court['is_free']
+    return court.id, court.price_per_hour, court.is_free
+
+
+def price_cache_key(court_id, day, global_version=None, court_version=None):
+    global_version = global_version or get_global_rules_version()
+    court_version = court_version or get_court_versions([court_id])[court_id]
+    return f'pricing:{global_version}:{court_version}:{court_id}:{day.isoformat()}'
+
+
+def build_price_vectors(courts, dates, rules):
+    """Векторы цен за час по ячейкам: {(court_id, date): [цена] * CELLS_PER_DAY}"""
+    params = {court_id: (float(price or 0), is_free) for court_id, price, is_free in map(_pricing_params, courts)}
+
+    vectors = {}
+    for court_id, (base, is_free) in params.items():
+        for day in dates:
+            vector = [0.0 if is_free else base] * CELLS_PER_DAY
+            if not is_free:
+                weekday = day.weekday()
+                for rule_court_id, weekdays, start, end, price, multiplier in rules:
+                    if rule_court_id not in (None, court_id) or (weekdays and weekday not in weekdays):
+                        continue
+                    value = price if price is not None else round(base * multiplier, 2)
+                    vector[start:end] = [value] * (end - start)
+            vectors[court_id, day] = vector
+
+    slots = TimeSlot.objects.filter(
+        court_id__in=[court_id for court_id, (_, is_free) in params.items() if not is_free],
+        date__in=dates,
+        price__isnull=False
+    ).values_list('court_id', 'date', 'start_time', 'end_time', 'price')
+    for court_id, day, start_time, end_time, price in slots:
+        start, end = cell_range(start_time, end_time)
+        vectors[court_id, day][start:end] = [float(price)] * (end - start)
+
+    return vectors
+
+
+def get_price_vectors(courts, dates):
+    """
+    Векторы цен площадок на даты из кэша: {(court_id, date): [цена] * CELLS_PER_DAY}.
+    Недостающие строятся одним запросом к слотам.
+    """
+    courts = list(courts)
+    dates = list(dict.fromkeys(dates))
+    global_version = get_global_rules_version()
+    court_versions = get_court_versions([_pricing_params(court)[0] for court in courts])
+
+    keys = {}
+    for court in courts:
+        court_id = _pricing_params(court)[0]
+        for day in dates:
+            keys[price_cache_key(court_id, day, global_version, court_versions[court_id])] = (court_id, day)
+    cached = cache.get_many(list(keys))
+    result = {keys[key]: vector for key, vector in cached.items()}
+
+    missing = [pair for pair in keys.values() if pair not in result]
+    if missing:
+        missing_courts = {court_id for court_id, _ in missing}
+        built = build_price_vectors(
+            [court for court in courts if _pricing_params(court)[0] in missing_courts],
+            sorted({day for _, day in missing}),
+            get_rules()
+        )
+        built = {pair: built[pair] for pair in missing}
+        cache.set_many(
+            {
+                price_cache_key(court_id, day, global_version, court_versions[court_id]): vector
+                for (court_id, day), vector in built.items()
+            },
+            LAYER_CACHE_TIMEOUT
+        )
+        result.update(built)
+
+    return result
+
+
+def get_price_vector(court, day):
+    """Вектор цен площадки на день"""
+    court_id = _pricing_params(court)[0]
+    return get_price_vectors([court], [day])[court_id, day]
+
+
+def invalidate_prices(court_id, *dates):
+    """Сбросить векторы цен площадки на даты"""
+    cache.delete_many([price_cache_key(court_id, day) for day in dates if day])
+
+
+def quote_cells(vector, start, end):
+    """Стоимость ячеек [start, end) по вектору цен за час"""
+    return sum(vector[start:end]) * CELL_MINUTES / 60
+
+
+def to_money(value):
+    return Decimal(str(round(value, 2))).quantize(Decimal('0.01'))
+
+
+def quote_price(court, day, start_time, hours, vectors=None):
+    """
+    Стоимость игры в рублях (Decimal). Игра после полуночи считается
+    по ценам следующего дня.
+    """
+    court_id = _pricing_params(court)[0]
+    start = time_to_cell(start_time)
+    end = start + hours * 60 // CELL_MINUTES
+    next_day = day + timedelta(days=1)
+
+    days = [day, next_day] if end > CELLS_PER_DAY else [day]
+    if vectors is None or any((court_id, d) not in vectors for d in days):
+        vectors = get_price_vectors([court], days)
+
+    total = quote_cells(vectors[court_id, day], start, min(end, CELLS_PER_DAY))
+    if end > CELLS_PER_DAY:
+        total += quote_cells(vectors[court_id, next_day], 0, end - CELLS_PER_DAY)
+    return to_money(total)
@@ -0,0 +1,124 @@
+"""
+Крупные JSON-ответы API: сжатие и потоковая выдача
+
+Кодировка выбирается по заголовку Accept-Encoding: brotli, если
+установлен пакет brotli и клиент его принимает, иначе gzip.
+Потоковые ответы сжимаются только gzip.
+"""
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import JsonResponse, StreamingHttpResponse
+from django.utils.cache import patch_vary_headers
+from django.utils.text import compress_string, compress_sequence
+
+try:
+    import brotli
+except ImportError:  # brotli - необязательная зависимость
+    brotli = None
+
+
+# Меньшие ответы не сжимаем: выигрыш меньше накладных расходов
+MIN_COMPRESS_SIZE = 1024
+
+BROTLI_QUALITY = 5
+
+
+def accepted_encodings(request):
+    """Кодировки из Accept-Encoding (без отключённых через q=0)"""
+    encodings = set()
+    for part in request.META.get('HTTP_ACCEPT_ENCODING', '').split(','):
+        name, _, params = part.strip().partition(';')
+        params = params.replace(' ', '')
+        if params in ('q=0', 'q=0.0', 'q=0.00', 'q=0.000'):
+            continue
+        if name:
+            encodings.add(name.lower())
+    return encodings
+
+
+def negotiate_encoding(request):
+    """Лучшая доступная кодировка для клиента или None"""
+    encodings = accepted_encodings(request)
+    if brotli is not None and 'br' in encodings:
+        return 'br'
+    if 'gzip' in encodings:
+        return 'gzip'
+    return None
+
+
+def compress_response(request, response):
+    """Сжать тело ответа в согласованной с клиентом кодировке"""
+    patch_vary_headers(response, ('Accept-Encoding',))
+    if len(response.content) < MIN_COMPRESS_SIZE or response.has_header('Content-Encoding'):
+        return response
+
+    encoding = negotiate_encoding(request)
+    if encoding == 'br':
+        content = brotli.compress(response.content, quality=BROTLI_QUALITY)
+    elif encoding == 'gzip':
+        content = compress_string(response.content)
+    else:
+        return response
+
+    response.content = content
+    response['Content-Length'] = str(len(content))
+    response['Content-Encoding'] = encoding
+    return response
+
+
+def compressed_json_response(request, data, **kwargs):
+    """JsonResponse со сжатием по Accept-Encoding"""
+    return compress_response(request, JsonResponse(data, **kwargs))
+
+
+# ============================================================================
+# ПОТОКОВЫЕ ОТВЕТЫ
+# ============================================================================
+
+# Сколько записей склеивается в один фрагмент потока
+STREAM_BATCH_SIZE = 100
+
+
+def _json_members(data):
+    """Пары "ключ": значение JSON-объекта без фигурных скобок"""
+    return json.dumps(data, cls=DjangoJSONEncoder, ensure_ascii=False)[1:-1]
+
+
+def iter_json_object(head, list_key, items, tail=None):
+    """
+    Сборка JSON-объекта по фрагментам: {**head, list_key: [...items], **tail()}.
+
+    items может быть генератором: записи кодируются по мере чтения.
+    tail вызывается после списка, поэтому может содержать, например,
+    число выданных записей.
+    """
+    head_members = _json_members(head)
+    yield '{' + head_members + (', ' if head_members else '') + json.dumps(list_key) + ': ['
+
+    batch = []
+    first = True
+    for item in items:
+        encoded = json.dumps(item, cls=DjangoJSONEncoder, ensure_ascii=False)
+        batch.append(encoded if first else ',' + encoded)
+        first = False
+        if len(batch) >= STREAM_BATCH_SIZE:
+            yield ''.join(batch)
+            batch = []
+    if batch:
+        yield ''.join(batch)
+
+    tail_members = _json_members(tail()) if tail else ''
+    yield ']' + (', ' + tail_members if tail_members else '') + '}'
+
+
+def streaming_json_response(request, content):
+    """StreamingHttpResponse для JSON-фрагментов; gzip, если клиент принимает"""
+    content = (chunk.encode('utf-8') for chunk in content)
+    if 'gzip' in accepted_encodings(request):
+        response = StreamingHttpResponse(compress_sequence(content), content_type='application/json')
+        response['Content-Encoding'] = 'gzip'
+    else:
+        response = StreamingHttpResponse(content, content_type='application/json')
+    patch_vary_headers(response, ('Accept-Encoding',))
+    return response
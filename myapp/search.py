@@ -0,0 +1,160 @@
+"""
+Полнотекстовый поиск площадок с ранжированием и курсорной пагинацией
+
+PostgreSQL: tsvector с русской морфологией по названию, адресу и городу
+(GIN-индекс по выражению) плюс триграммное сходство названия (pg_trgm)
+для опечаток и неполных слов.
+
+SQLite: виртуальная таблица FTS5 myapp_volleyballcourt_fts, которую
+поддерживают триггеры (см. миграцию 0012). Слова запроса ищутся по
+префиксу, ранжирование - bm25.
+
+Если ни один индекс недоступен, используется поиск по вхождению
+подстроки с простым ранжированием.
+
+Курсор - пара (релевантность, id) последней выданной площадки:
+следующая страница начинается строго после неё.
+"""
+import base64
+import json
+import re
+
+from django.contrib.postgres.lookups import TrigramSimilar
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector, TrigramSimilarity
+from django.db import connection
+from django.db.models import Case, F, FloatField, Q, Value, When
+from django.db.models.expressions import RawSQL
+
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+SEARCH_CONFIG = 'russian'
+FTS_TABLE = 'myapp_volleyballcourt_fts'
+
+# Выражение должно совпадать с индексом из миграции 0012
+SEARCH_VECTOR = SearchVector('name', 'address', 'city', config=SEARCH_CONFIG)
+
+_fts_available = None
+
+
+def encode_cursor(rank, court_id):
+    payload = json.dumps([rank, court_id]).encode('utf-8')
+    return base64.urlsafe_b64encode(payload).decode('ascii').rstrip('=')
+
+
+def decode_cursor(value):
+    """Разбор курсора; ValueError при неверном формате"""
+    try:
+        padded = value + '=' * (-len(value) % 4)
+        rank, court_id = json.loads(base64.urlsafe_b64decode(padded))
+        return float(rank), int(court_id)
+    except (TypeError, ValueError):
+        raise ValueError('Неверный курсор')
+
+
+def parse_page_size(value):
+    if not value:
+        return DEFAULT_PAGE_SIZE
+    try:
+        return max(1, min(int(value), MAX_PAGE_SIZE))
+    except ValueError:
+        return DEFAULT_PAGE_SIZE
+
+
+def fts_available():
+    """
+    Есть ли в базе таблица FTS5 с триггерами (только SQLite).
+
+    SQLite пересоздаёт таблицу площадок при некоторых миграциях, и
+    триггеры пропадают - тогда индекс устарел и им нельзя пользоваться.
+    """
+    global _fts_available
+    if _fts_available is None:
+        _fts_available = False
+        if connection.vendor == 'sqlite':
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT COUNT(*) FROM sqlite_master "
+                    "WHERE (type = 'table' AND name = %s) "
+                    "OR (type = 'trigger' AND name IN (%s, %s, %s))",
+                    [FTS_TABLE, f'{FTS_TABLE}_ai', f'{FTS_TABLE}_ad', f'{FTS_TABLE}_au']
+                )
+                _fts_available = cursor.fetchone()[0] == 4
+    return _fts_available
+
+
+def _fts_match_expression(query):
+    """Запрос FTS5: каждое слово ищется по префиксу"""
+    words = re.findall(r'\w+', query.lower())
+    return ' '.join(f'"{word}"*' for word in words)
+
+
+def _rank_postgres(courts, query):
+    search_query = SearchQuery(query, config=SEARCH_CONFIG, search_type='websearch')
+    return courts.annotate(
+        search=SEARCH_VECTOR,
+        search_rank=SearchRank(SEARCH_VECTOR, search_query) + TrigramSimilarity('name', query),
+    ).filter(
+        Q(search=search_query) | Q(TrigramSimilar(F('name'), query))
+    )
+
+
+def _rank_fts(courts, query):
+    match = _fts_match_expression(query)
+    if not match:
+        return courts.none()
+    return courts.filter(
+        id__in=RawSQL(f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s', [match])
+    ).annotate(
+        # bm25 тем меньше, чем выше релевантность
+        search_rank=RawSQL(
+            f'SELECT -bm25({FTS_TABLE}) FROM {FTS_TABLE} '
+            f'WHERE {FTS_TABLE} MATCH %s AND {FTS_TABLE}.rowid = myapp_volleyballcourt.id',
+            [match],
+            output_field=FloatField()
+        )
+    )
+
+
+def _rank_substring(courts, query):
+    return courts.filter(
+        Q(name__icontains=query) | Q(address__icontains=query)
+    ).annotate(
+        search_rank=Case(
+            When(name__istartswith=query, then=Value(2.0)),
+            When(name__icontains=query, then=Value(1.0)),
+            default=Value(0.0),
+            output_field=FloatField()
+        )
+    )
+
+
+def rank_courts(courts, query):
+    """Площадки, подходящие под запрос, с аннотацией search_rank"""
+    if connection.vendor == 'postgresql':
+        return _rank_postgres(courts, query)
+    if fts_available():
+        return _rank_fts(courts, query)
+    return _rank_substring(courts, query)
+
+
+def search_courts(courts, query, cursor=None, limit=DEFAULT_PAGE_SIZE):
+    """
+    QuerySet страницы результатов, упорядоченный по релевантности;
+    limit=None - все результаты без пагинации.
+
+    Без запроса все площадки имеют одинаковую релевантность и идут по id.
+    """
+    if query:
+        courts = rank_courts(courts, query)
+    else:
+        courts = courts.annotate(search_rank=Value(0.0, output_field=FloatField()))
+
+    if cursor is not None:
+        rank, court_id = cursor
+        courts = courts.filter(
+            Q(search_rank__lt=rank) | Q(search_rank=rank, id__gt=court_id)
+        )
+
+    return courts.order_by('-search_rank', 'id')[:limit]
@@ -0,0 +1,300 @@
+"""
+Сериализация площадок для API и карт
+
+Сериализатор работает поверх QuerySet.values(): из базы читаются только
+колонки, нужные выбранным полям, модели не создаются. Набор полей
+задаётся пресетом конкретного API и может быть сужен параметром
+fields=a,b,c.
+
+Пресет - список имён полей из COURT_FIELDS или пар (ключ, поле), когда
+ключ в ответе отличается от имени поля (например, 'description' с
+обрезанным текстом). Пресеты повторяют ответы прежних view один в один:
+у каждого API свои значения по умолчанию (город для площадок без
+координат, пустая строка или null), поэтому для одной колонки бывает
+несколько полей.
+"""
+from .models import VolleyballCourt
+
+
+# Координаты по умолчанию для площадок без координат
+MOSCOW_COORDINATES = (55.7558, 37.6173)
+SAINT_PETERSBURG_COORDINATES = (59.9343, 30.3351)
+DEFAULT_CITY_COORDINATES = {
+    'Москва': MOSCOW_COORDINATES,
+    'Санкт-Петербург': SAINT_PETERSBURG_COORDINATES,
+}
+# Для прочих городов карты подставляют Петербург, а courts_api - Москву
+FALLBACK_COORDINATES = SAINT_PETERSBURG_COORDINATES
+API_FALLBACK_COORDINATES = MOSCOW_COORDINATES
+
+# Значение поля, при котором ключ не попадает в ответ
+OMIT = object()
+
+
+class Field:
+    """Поле ответа: колонки, которые нужно прочитать, и преобразование"""
+
+    def __init__(self, sources, convert):
+        self.sources = sources
+        self.convert = convert
+
+
+def _plain(name):
+    return Field((name,), lambda row: row[name])
+
+
+def _decimal(name):
+    return Field((name,), lambda row: float(row[name] or 0))
+
+
+def _text(name):
+    return Field((name,), lambda row: row[name] or '')
+
+
+def _display(name, choices):
+    labels = dict(choices)
+    return Field((name,), lambda row: labels.get(row[name], row[name]))
+
+
+def _time(name, default):
+    return Field((name,), lambda row: str(row[name]) if row[name] else default)
+
+
+def _has_coordinates(row):
+    return bool(row['latitude'] and row['longitude'])
+
+
+def _coordinate(index, fallback=FALLBACK_COORDINATES):
+    """Координата с подстановкой центра города для площадок без координат"""
+    def convert(row):
+        if _has_coordinates(row):
+            return float(row['latitude'] if index == 0 else row['longitude'])
+        return DEFAULT_CITY_COORDINATES.get(row['city'], fallback)[index]
+    return Field(('latitude', 'longitude', 'city'), convert)
+
+
+def _known_coordinate(name):
+    """Координата только у площадок с координатами, иначе ключа нет"""
+    return Field(
+        ('latitude', 'longitude'),
+        lambda row: float(row[name]) if _has_coordinates(row) else OMIT
+    )
+
+
+def _float(name):
+    return Field((name,), lambda row: float(row[name]) if row[name] is not None else None)
+
+
+COURT_FIELDS = {
+    'id': _plain('id'),
+    'name': _plain('name'),
+    'address': _plain('address'),
+    'city': _plain('city'),
+    'court_type': _plain('court_type'),
+    'court_type_display': _display('court_type', VolleyballCourt.COURT_TYPES),
+    'surface': _plain('surface'),
+    'surface_display': _display('surface', VolleyballCourt.SURFACE_TYPES),
+    'status': _plain('status'),
+    'status_display': _display('status', VolleyballCourt.MODERATION_STATUS),
+    'is_free': _plain('is_free'),
+    'price_per_hour': _decimal('price_per_hour'),
+    'rating': _decimal('rating'),
+    'capacity': _plain('courts_count'),
+    'is_lighted': _plain('is_lighted'),
+    'has_parking': _plain('has_parking'),
+    'has_showers': _plain('has_showers'),
+    'has_cafe': _plain('has_cafe'),
+    'has_locker_rooms': _plain('has_locker_rooms'),
+    'has_equipment_rental': _plain('has_equipment_rental'),
+    'description': _text('description'),
+    'description_raw': _plain('description'),
+    'description_short': Field(('description',), lambda row: (row['description'] or '')[:100]),
+    'phone': _text('phone'),
+    'phone_raw': _plain('phone'),
+    'website': _text('website'),
+    'website_raw': _plain('website'),
+    'photo_url': _text('photo_url'),
+    'photo_url_raw': _plain('photo_url'),
+    'opening_time_raw': _plain('opening_time'),
+    'closing_time_raw': _plain('closing_time'),
+    'working_days': _plain('working_days'),
+    'opening_time': _time('opening_time', '08:00'),
+    'closing_time': _time('closing_time', '22:00'),
+    'opening_time_str': Field(('opening_time',), lambda row: str(row['opening_time'])),
+    'closing_time_str': Field(('closing_time',), lambda row: str(row['closing_time'])),
+    'booking_enabled': _plain('booking_enabled'),
+    'min_booking_hours': _plain('min_booking_hours'),
+    'max_booking_hours': _plain('max_booking_hours'),
+    'advance_booking_days': _plain('advance_booking_days'),
+    'created_at': Field(('created_at',), lambda row: row['created_at'].strftime('%d.%m.%Y')),
+    'suggested_by': Field(
+        ('suggested_by__username',),
+        lambda row: row['suggested_by__username'] or 'Неизвестно'
+    ),
+    'latitude': _coordinate(0),
+    'longitude': _coordinate(1),
+    'latitude_api': _coordinate(0, API_FALLBACK_COORDINATES),
+    'longitude_api': _coordinate(1, API_FALLBACK_COORDINATES),
+    'latitude_known': _known_coordinate('latitude'),
+    'longitude_known': _known_coordinate('longitude'),
+    'latitude_raw': _float('latitude'),
+    'longitude_raw': _float('longitude'),
+    'price_per_hour_raw': _float('price_per_hour'),
+    'rating_raw': _float('rating'),
+    'has_coordinates': Field(('latitude', 'longitude'), _has_coordinates),
+}
+
+
+# ============================================================================
+# ПРЕСЕТЫ ПОЛЕЙ
+# ============================================================================
+
+# Снимок публичной карты (map_view, courts_map_api)
+MAP_FIELDS = [
+    'id', 'name', 'address', 'city', 'court_type', 'court_type_display',
+    'is_free', 'is_lighted', 'has_parking', 'has_showers', 'has_cafe',
+    'has_locker_rooms', 'has_equipment_rental',
+    ('description', 'description_short'),
+    'working_days', 'opening_time', 'closing_time', 'phone', 'website',
+    'photo_url', 'booking_enabled', 'min_booking_hours', 'max_booking_hours',
+    'advance_booking_days', ('price', 'price_per_hour'),
+    'latitude', 'longitude', 'has_coordinates',
+]
+
+# Снимок всех активных площадок (full_map_view)
+FULL_MAP_FIELDS = [
+    entry for entry in MAP_FIELDS if entry != ('price', 'price_per_hour')
+] + ['price_per_hour', 'capacity', ('surface', 'surface_display')]
+
+# courts_api
+COURTS_API_FIELDS = [
+    'id', 'name', 'address', 'city', 'court_type', 'court_type_display',
+    'status', 'status_display', 'is_free', ('price', 'price_per_hour'),
+    'is_lighted', 'has_parking', 'has_showers', 'has_cafe', 'description',
+    'phone', 'website', 'photo_url', 'created_at', 'suggested_by',
+    'booking_enabled', ('latitude', 'latitude_api'), ('longitude', 'longitude_api'),
+]
+
+# court_detail_api (рейтинг и отзывы добавляет сам view)
+COURT_DETAIL_FIELDS = [
+    'id', 'name', 'address', 'city', 'court_type', 'court_type_display',
+    'price_per_hour', 'is_free', 'is_lighted', 'has_parking', 'has_showers',
+    'has_cafe', 'has_locker_rooms', 'has_equipment_rental',
+    ('description', 'description_raw'), ('phone', 'phone_raw'),
+    ('website', 'website_raw'), ('photo_url', 'photo_url_raw'),
+    ('opening_time', 'opening_time_str'), ('closing_time', 'closing_time_str'),
+    'working_days', 'booking_enabled', 'min_booking_hours',
+    'max_booking_hours', 'advance_booking_days',
+    ('latitude', 'latitude_known'), ('longitude', 'longitude_known'),
+]
+COURT_DETAIL_EXTRA_FIELDS = ['rating', 'reviews_count', 'reviews']
+
+# search_courts_api
+SEARCH_FIELDS = [
+    'id', 'name', 'address',
+    ('latitude', 'latitude_raw'), ('longitude', 'longitude_raw'),
+    'court_type', 'surface', 'is_free', 'is_lighted', 'has_parking',
+    'has_showers', 'has_locker_rooms', 'has_equipment_rental', 'has_cafe',
+    ('description', 'description_raw'), 'status', ('price_per_hour', 'price_per_hour_raw'),
+    ('opening_time', 'opening_time_raw'), ('closing_time', 'closing_time_raw'),
+    'city', ('rating', 'rating_raw'),
+]
+
+
+def _entry_key(entry):
+    return entry[0] if isinstance(entry, tuple) else entry
+
+
+def parse_fields(value, allowed):
+    """
+    Разбор параметра fields=a,b,c.
+
+    Возвращает None, если параметр не задан; ValueError для полей,
+    которых нет в allowed.
+    """
+    if not value:
+        return None
+    requested = [name.strip() for name in value.split(',') if name.strip()]
+    allowed_keys = {_entry_key(entry) for entry in allowed}
+    unknown = [name for name in requested if name not in allowed_keys]
+    if unknown:
+        raise ValueError(f'Неизвестные поля: {", ".join(unknown)}')
+    return requested
+
+
+class CourtSerializer:
+    """Сериализатор площадок по пресету полей"""
+
+    def __init__(self, preset, fields=None):
+        if fields is not None:
+            fields = set(fields)
+        self.columns = []
+        self.fields = []
+        for entry in preset:
+            key, name = entry if isinstance(entry, tuple) else (entry, entry)
+            if fields is not None and key not in fields:
+                continue
+            field = COURT_FIELDS[name]
+            self.fields.append((key, field.convert))
+            for column in field.sources:
+                if column not in self.columns:
+                    self.columns.append(column)
+        if 'id' not in self.columns:
+            self.columns.append('id')
+
+    @property
+    def keys(self):
+        return [key for key, _ in self.fields]
+
+    def serialize(self, row):
+        data = {}
+        for key, convert in self.fields:
+            value = convert(row)
+            if value is not OMIT:
+                data[key] = value
+        return data
+
+    def values(self, queryset):
+        """Проекция QuerySet на нужные колонки"""
+        return queryset.values(*self.columns)
+
+    def serialize_queryset(self, queryset):
+        return [self.serialize(row) for row in self.values(queryset)]
+
+    def iter_queryset(self, queryset, chunk_size=2000):
+        """Ленивая сериализация: строки читаются из БД порциями"""
+        for row in self.values(queryset).iterator(chunk_size=chunk_size):
+            yield self.serialize(row)
+
+
+# ============================================================================
+# КОЛОНОЧНЫЙ ФОРМАТ
+# ============================================================================
+
+# Точность координат в колоночном формате (5 знаков - около метра)
+COLUMNAR_COORDINATE_DIGITS = 5
+COLUMNAR_COORDINATE_KEYS = ('latitude', 'longitude')
+
+
+def parse_format(value):
+    """Разбор параметра format= (json по умолчанию или columnar)"""
+    value = value or 'json'
+    if value not in ('json', 'columnar'):
+        raise ValueError('Неизвестный формат: допустимы json и columnar')
+    return value
+
+
+def to_columnar(courts, keys):
+    """
+    Список площадок -> словарь {поле: [значения]}.
+
+    Имена полей не повторяются в каждой записи, координаты округляются.
+    """
+    columns = {key: [court[key] for court in courts] for key in keys}
+    for key in COLUMNAR_COORDINATE_KEYS:
+        if key in columns:
+            columns[key] = [
+                round(value, COLUMNAR_COORDINATE_DIGITS) if value is not None else None
+                for value in columns[key]
+            ]
+    return columns
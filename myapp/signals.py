@@ -1,8 +1,18 @@
 # myapp/signals.py
-from django.db.models.signals import post_save
+from django.db.models.signals import pre_save, post_save, post_delete
 from django.dispatch import receiver
 from django.contrib.auth.models import User
-from .models import UserProfile, Friendship, Notification
+from .models import (
+    UserProfile, Friendship, Notification, VolleyballCourt, Review, CourtPhoto, Game,
+    CourtBooking, TimeSlot, PricingRule, BlockedInterval
+)
+from .court_layer import bump_layer_version
+from .tiles import invalidate_tiles
+from .court_sync import record_tombstone
+from .court_bundle import invalidate_court_bundle
+from .availability import invalidate_availability, invalidate_court_availability
+from .pricing import bump_rules_version, bump_court_price_version, invalidate_prices
+from .blocking import interval_dates
 
 @receiver(post_save, sender=User)
 def create_user_profile(sender, instance, created, **kwargs):
@@ -51,4 +61,170 @@ def create_friend_notification(sender, instance, created, **kwargs):
             title='Запрос в друзья отклонен',
             message=f'{instance.to_user.profile.nickname} отклонил(а) ваш запрос в друзья',
             related_user=instance.to_user
-        )
\ No newline at end of file
+        )
+
+@receiver(post_save, sender=VolleyballCourt)
+@receiver(post_delete, sender=VolleyballCourt)
+def invalidate_court_layer(sender, instance, **kwargs):
+    """Сбросить кэш карты при изменении площадки"""
+    bump_layer_version()
+
+# Поля площадки, от которых зависят цены и карты занятости
+COURT_PRICING_FIELDS = ('price_per_hour', 'is_free')
+COURT_AVAILABILITY_FIELDS = ('courts_count', 'opening_time', 'closing_time', 'advance_booking_days')
+
+@receiver(pre_save, sender=VolleyballCourt)
+def remember_court_position(sender, instance, **kwargs):
+    """
+    Запомнить прежние координаты площадки (для сброса её тайлов) и поля,
+    от которых зависят цены и карты занятости
+    """
+    instance._previous_position = None
+    instance._previous_schedule = None
+    instance._previous_pricing = None
+    if instance.pk:
+        previous = VolleyballCourt.objects.filter(pk=instance.pk).values_list(
+            'latitude', 'longitude', *COURT_PRICING_FIELDS, *COURT_AVAILABILITY_FIELDS
+        ).first()
+        if previous:
+            instance._previous_position = previous[:2]
+            instance._previous_pricing = previous[2:4]
+            instance._previous_schedule = previous[4:]
+
+@receiver(post_save, sender=VolleyballCourt)
+def invalidate_court_prices_on_change(sender, instance, created, **kwargs):
+    """Пересчитать цены площадки при изменении её базовой цены"""
+    previous = getattr(instance, '_previous_pricing', None)
+    if created or not previous:
+        return
+    if previous != tuple(getattr(instance, field) for field in COURT_PRICING_FIELDS):
+        bump_court_price_version(instance.pk)
+
+@receiver(post_save, sender=VolleyballCourt)
+def invalidate_court_availability_on_change(sender, instance, created, **kwargs):
+    """Сбросить карты занятости площадки при изменении числа кортов или часов работы"""
+    previous = getattr(instance, '_previous_schedule', None)
+    if created or not previous:
+        return
+    if previous != tuple(getattr(instance, field) for field in COURT_AVAILABILITY_FIELDS):
+        invalidate_court_availability(instance.pk, max(previous[-1], instance.advance_booking_days))
+
+@receiver(post_save, sender=VolleyballCourt)
+@receiver(post_delete, sender=VolleyballCourt)
+def invalidate_court_tiles_on_change(sender, instance, **kwargs):
+    """Сбросить тайлы со старым и новым положением площадки"""
+    points = [(instance.latitude, instance.longitude)]
+    previous = getattr(instance, '_previous_position', None)
+    if previous:
+        points.append(previous)
+    invalidate_tiles(points)
+
+@receiver(post_delete, sender=VolleyballCourt)
+def create_court_tombstone(sender, instance, **kwargs):
+    """Отметка об удалении для клиентов, синхронизирующих карту по since="""
+    record_tombstone(instance.pk)
+
+@receiver(post_save, sender=VolleyballCourt)
+@receiver(post_delete, sender=VolleyballCourt)
+def invalidate_court_page(sender, instance, **kwargs):
+    """Сбросить кэш страницы площадки"""
+    invalidate_court_bundle(instance.pk)
+
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=Review)
+@receiver(post_save, sender=CourtPhoto)
+@receiver(post_delete, sender=CourtPhoto)
+def invalidate_court_page_content(sender, instance, **kwargs):
+    """Сбросить кэш страницы площадки при изменении отзыва или фото"""
+    invalidate_court_bundle(instance.court_id)
+
+@receiver(pre_save, sender=CourtBooking)
+def remember_booking_day(sender, instance, **kwargs):
+    """Запомнить прежние площадку и дату бронирования для сброса карты занятости"""
+    instance._previous_day = None
+    if instance.pk:
+        instance._previous_day = CourtBooking.objects.filter(
+            pk=instance.pk
+        ).values_list('court_id', 'booking_date').first()
+
+@receiver(post_save, sender=CourtBooking)
+@receiver(post_delete, sender=CourtBooking)
+def invalidate_booking_availability(sender, instance, **kwargs):
+    """Сбросить карту занятости дня бронирования (старого и нового)"""
+    invalidate_availability(instance.court_id, instance.booking_date)
+    previous = getattr(instance, '_previous_day', None)
+    if previous:
+        invalidate_availability(*previous)
+
+@receiver(pre_save, sender=Game)
+def remember_game_day(sender, instance, **kwargs):
+    """Запомнить прежние площадку и дату игры"""
+    instance._previous_day = None
+    if instance.pk:
+        instance._previous_day = Game.objects.filter(
+            pk=instance.pk, court__isnull=False
+        ).values_list('court_id', 'game_date').first()
+
+@receiver(post_save, sender=Game)
+@receiver(post_delete, sender=Game)
+def invalidate_game_availability(sender, instance, **kwargs):
+    """Сбросить карту занятости дня игры на площадке (старого и нового)"""
+    if instance.court_id:
+        invalidate_availability(instance.court_id, instance.game_date)
+    previous = getattr(instance, '_previous_day', None)
+    if previous:
+        invalidate_availability(*previous)
+
+@receiver(pre_save, sender=TimeSlot)
+def remember_slot_day(sender, instance, **kwargs):
+    """Запомнить прежние площадку и дату слота"""
+    instance._previous_day = None
+    if instance.pk:
+        instance._previous_day = TimeSlot.objects.filter(
+            pk=instance.pk
+        ).values_list('court_id', 'date').first()
+
+@receiver(post_save, sender=TimeSlot)
+@receiver(post_delete, sender=TimeSlot)
+def invalidate_slot_availability(sender, instance, **kwargs):
+    """Сбросить карту занятости и цены дня слота"""
+    invalidate_availability(instance.court_id, instance.date)
+    invalidate_prices(instance.court_id, instance.date)
+    previous = getattr(instance, '_previous_day', None)
+    if previous:
+        invalidate_availability(*previous)
+        invalidate_prices(*previous)
+
+@receiver(pre_save, sender=BlockedInterval)
+def remember_interval_dates(sender, instance, **kwargs):
+    """Запомнить прежние границы закрытия площадки"""
+    instance._previous_interval = None
+    if instance.pk:
+        instance._previous_interval = BlockedInterval.objects.filter(
+            pk=instance.pk
+        ).values_list('court_id', 'start_at', 'end_at').first()
+
+@receiver(post_save, sender=BlockedInterval)
+@receiver(post_delete, sender=BlockedInterval)
+def invalidate_interval_availability(sender, instance, **kwargs):
+    """Сбросить карты занятости всех дней закрытия (старого и нового)"""
+    invalidate_availability(instance.court_id, *interval_dates(instance.start_at, instance.end_at))
+    previous = getattr(instance, '_previous_interval', None)
+    if previous:
+        court_id, start_at, end_at = previous
+        invalidate_availability(court_id, *interval_dates(start_at, end_at))
+
+@receiver(pre_save, sender=PricingRule)
+def remember_rule_court(sender, instance, **kwargs):
+    """Запомнить прежнюю площадку правила"""
+    instance._previous_court = []
+    if instance.pk:
+        instance._previous_court = list(
+            PricingRule.objects.filter(pk=instance.pk).values_list('court_id', flat=True)
+        )
+
+@receiver(post_save, sender=PricingRule)
+@receiver(post_delete, sender=PricingRule)
+def invalidate_pricing_rules(sender, instance, **kwargs):
+    """Пересчитать цены площадки правила (общего правила - всех площадок)"""
+    bump_rules_version(instance.court_id, *getattr(instance, '_previous_court', []))
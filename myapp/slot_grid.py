@@ -0,0 +1,79 @@
+"""
+Сетка слотов площадки на несколько дней
+
+Состояния слотов берутся из битовых карт движка занятости (см.
+myapp.availability), цены - из кэшированных векторов цен по ячейкам
+дня (см. myapp.pricing). Используется API недельной сетки и
+get_time_slots (один день, часовые слоты).
+"""
+from datetime import timedelta
+
+from django.utils import timezone
+
+from .availability import (
+    get_availability, cell_range, cell_to_time, time_to_cell_end,
+    CELL_MINUTES, CELLS_PER_DAY
+)
+from .pricing import get_price_vectors
+
+
+MAX_GRID_DAYS = 14
+DEFAULT_GRID_DAYS = 7
+
+# Допустимый шаг сетки в минутах (часовой - для get_time_slots)
+GRID_STEPS = (15, 30, 60)
+DEFAULT_GRID_STEP = 30
+
+
+def build_slot_grid(court, dates, step_minutes=DEFAULT_GRID_STEP, mark_past=True, user_id=None):
+    """
+    Слоты площадки в часы работы на каждую дату:
+    [{'date', 'slots': [{'start_time', 'end_time', 'state', 'free_courts', 'price'}]}].
+
+    state: free, booked (заняты все корты), blocked, held (последние
+    свободные корты удерживают другие игроки, удержания user_id не
+    учитываются) или past (начало слота уже прошло).
+    """
+    step_cells = step_minutes // CELL_MINUTES
+    opening_cell, closing_cell = cell_range(court.opening_time, court.closing_time)
+
+    maps = get_availability(court.id, dates)
+    prices = get_price_vectors([court], dates)
+
+    now = timezone.localtime()
+    now_cell = time_to_cell_end(now.time())
+
+    days = []
+    for day in dates:
+        day_map = maps[day]
+        day_prices = prices[court.id, day]
+        past_cells = 0
+        if mark_past:
+            if day < now.date():
+                past_cells = CELLS_PER_DAY
+            elif day == now.date():
+                past_cells = now_cell
+
+        slots = []
+        for start_cell in range(opening_cell, closing_cell, step_cells):
+            end_cell = min(start_cell + step_cells, closing_cell)
+            if start_cell < past_cells:
+                state = 'past'
+            else:
+                state = day_map.conflict_cells(start_cell, end_cell, user_id) or 'free'
+
+            slots.append({
+                'start_time': cell_to_time(start_cell).strftime('%H:%M'),
+                'end_time': cell_to_time(end_cell).strftime('%H:%M'),
+                'state': state,
+                'free_courts': day_map.free_courts_cells(start_cell, end_cell, user_id) if state != 'past' else 0,
+                'price': day_prices[start_cell],
+            })
+
+        days.append({'date': day.isoformat(), 'slots': slots})
+    return days
+
+
+def grid_dates(date_from, days):
+    """Список дат сетки начиная с date_from"""
+    return [date_from + timedelta(days=offset) for offset in range(days)]
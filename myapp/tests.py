@@ -0,0 +1,588 @@
+import sys
+import threading
+import time
+from datetime import date, datetime, timedelta, time as dt_time
+from io import StringIO
+from unittest import skipUnless
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.db.models.signals import post_save
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from .autocomplete import PrefixIndex
+from .availability import availability_cache_key, get_day_availability
+from .blocking import block_court, unblock_court
+from .court_layer import get_layer_version
+from .booking import (
+    BookingConflict, create_booking, create_booking_series, schedule_game, format_series_too_far
+)
+from .forms import CourtBookingForm, GameCreationForm
+from .management.commands.update_booking_statuses import finished_q
+from .models import BlockedInterval, CourtBooking, Game, PricingRule, TimeSlot, VolleyballCourt
+from .pricing import price_cache_key, quote_price
+from .signals import create_user_profile, save_user_profile
+
+
+class BookingFixtureMixin:
+    USERS = 2
+
+    def setUp(self):
+        # Профили пользователей в этих тестах не нужны
+        post_save.disconnect(create_user_profile, sender=User)
+        post_save.disconnect(save_user_profile, sender=User)
+        self.addCleanup(post_save.connect, create_user_profile, sender=User)
+        self.addCleanup(post_save.connect, save_user_profile, sender=User)
+
+        self.court = VolleyballCourt.objects.create(
+            name='Площадка', address='Адрес', status='approved',
+            latitude=55.75, longitude=37.62, price_per_hour=1000,
+            opening_time=dt_time(8), closing_time=dt_time(23),
+        )
+        self.users = [User.objects.create(username=f'player{i}') for i in range(self.USERS)]
+        self.day = date.today() + timedelta(days=1)
+
+    def make_booking(self, user, start_time, hours=2):
+        return CourtBooking(
+            court=self.court, user=user, booking_date=self.day,
+            start_time=start_time, hours=hours,
+            contact_name=user.username, contact_phone='+79990000000',
+        )
+
+
+class CreateBookingTests(BookingFixtureMixin, TestCase):
+
+    def test_creates_booking_and_slots(self):
+        booking = create_booking(self.make_booking(self.users[0], dt_time(19)))
+
+        self.assertEqual(booking.end_time, dt_time(21))
+        self.assertEqual(booking.total_price, 2000)
+        self.assertEqual(
+            list(TimeSlot.objects.filter(booking=booking).values_list('start_time', flat=True)),
+            [dt_time(19), dt_time(20)]
+        )
+
+    def test_overlap_is_conflict(self):
+        create_booking(self.make_booking(self.users[0], dt_time(19)))
+
+        with self.assertRaises(BookingConflict):
+            create_booking(self.make_booking(self.users[1], dt_time(20, 30)))
+        self.assertEqual(CourtBooking.objects.count(), 1)
+
+    def test_blocked_time_is_conflict(self):
+        TimeSlot.objects.create(
+            court=self.court, date=self.day, start_time=dt_time(20), end_time=dt_time(21), is_blocked=True
+        )
+
+        with self.assertRaises(BookingConflict):
+            create_booking(self.make_booking(self.users[0], dt_time(19)))
+
+    def test_cancelled_booking_slots_are_reused(self):
+        first = create_booking(self.make_booking(self.users[0], dt_time(19)))
+        first.cancel()
+
+        second = create_booking(self.make_booking(self.users[1], dt_time(19)))
+        self.assertEqual(TimeSlot.objects.filter(court=self.court).count(), 2)
+        self.assertEqual(TimeSlot.objects.filter(booking=second).count(), 2)
+
+    def test_game_and_booking_share_court_time(self):
+        schedule_game(Game(title='Игра', organizer=self.users[0], court=self.court, game_date=self.day, game_time=dt_time(19)))
+
+        with self.assertRaises(BookingConflict):
+            create_booking(self.make_booking(self.users[1], dt_time(20), hours=1))
+        with self.assertRaises(BookingConflict):
+            schedule_game(Game(title='Игра', organizer=self.users[1], court=self.court, game_date=self.day, game_time=dt_time(18)))
+
+    def test_game_of_cancelled_booking_keeps_court_time(self):
+        booking = create_booking(self.make_booking(self.users[0], dt_time(19)))
+        schedule_game(Game(
+            title='Игра', organizer=self.users[0], court=self.court, court_booking=booking,
+            game_date=self.day, game_time=dt_time(19)
+        ))
+        booking.cancel()
+
+        with self.assertRaises(BookingConflict):
+            create_booking(self.make_booking(self.users[1], dt_time(20), hours=1))
+
+    def test_multi_court_capacity(self):
+        self.court.courts_count = 2
+        self.court.save()
+
+        create_booking(self.make_booking(self.users[0], dt_time(19)))
+        create_booking(self.make_booking(self.users[1], dt_time(20)))
+        with self.assertRaises(BookingConflict):
+            create_booking(self.make_booking(self.users[0], dt_time(20), hours=1))
+        self.assertEqual(
+            list(TimeSlot.objects.filter(start_time=dt_time(20)).values_list('lane', flat=True)),
+            [0, 1]
+        )
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class CacheInvalidationTests(BookingFixtureMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def test_other_court_edits_keep_cached_maps(self):
+        create_booking(self.make_booking(self.users[0], dt_time(19)))
+        self.assertEqual(get_day_availability(self.court.id, self.day).conflict(dt_time(19), dt_time(20)), 'booked')
+
+        self.court.rating = 4.5
+        self.court.save()
+        self.assertIsNotNone(cache.get(availability_cache_key(self.court.id, self.day)))
+
+        self.court.courts_count = 2
+        self.court.save()
+        self.assertIsNone(get_day_availability(self.court.id, self.day).conflict(dt_time(19), dt_time(20)))
+
+    def test_other_court_edits_keep_cached_prices(self):
+        self.assertEqual(quote_price(self.court, self.day, dt_time(19), 1), 1000)
+        other = VolleyballCourt.objects.create(
+            name='Другая', address='Адрес', status='approved', latitude=55.7, longitude=37.6
+        )
+        key = price_cache_key(self.court.id, self.day)
+        self.assertIsNotNone(cache.get(key))
+
+        other.rating = 4.5
+        other.save()
+        PricingRule.objects.create(name='Другая площадка', court=other, price_per_hour=300)
+        self.assertIsNotNone(cache.get(key))
+
+        self.court.price_per_hour = 1200
+        self.court.save()
+        self.assertEqual(quote_price(self.court, self.day, dt_time(19), 1), 1200)
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class CourtAdminTests(BookingFixtureMixin, TestCase):
+
+    def test_moderation_action_updates_court_and_layer(self):
+        court = VolleyballCourt.objects.create(name='Новая', address='Адрес', status='pending')
+        VolleyballCourt.objects.filter(id=court.id).update(updated_at=timezone.now() - timedelta(days=1))
+        layer_version = get_layer_version()
+        admin_user = User.objects.create(username='admin', is_staff=True, is_superuser=True)
+        self.client.force_login(admin_user)
+
+        self.client.post('/admin/myapp/volleyballcourt/', {
+            'action': 'approve_selected', '_selected_action': [court.id],
+        })
+
+        court.refresh_from_db()
+        self.assertEqual(court.status, 'approved')
+        self.assertGreater(court.updated_at, timezone.now() - timedelta(minutes=1))
+        self.assertNotEqual(get_layer_version(), layer_version)
+
+
+class CourtApiOutputTests(BookingFixtureMixin, TestCase):
+    """Ответы API площадок совпадают с прежними view"""
+
+    def setUp(self):
+        super().setUp()
+        VolleyballCourt.objects.filter(id=self.court.id).update(
+            city='Казань', latitude=None, longitude=None
+        )
+
+    def test_courts_api_falls_back_to_moscow(self):
+        court = self.client.get('/api/courts/').json()['courts'][0]
+        self.assertEqual((court['latitude'], court['longitude']), (55.7558, 37.6173))
+        self.assertEqual(court['description'], '')
+
+    def test_court_detail_api_omits_unknown_coordinates(self):
+        data = self.client.get(f'/api/courts/{self.court.id}/').json()
+        self.assertNotIn('latitude', data)
+        self.assertNotIn('longitude', data)
+        self.assertEqual(data['opening_time'], '08:00:00')
+
+    def test_search_courts_api_returns_raw_values(self):
+        court = self.client.get('/api/search-courts/').json()[0]
+        self.assertIsNone(court['latitude'])
+        self.assertEqual(court['description'], '')
+        self.assertEqual(court['opening_time'], '08:00:00')
+        self.assertEqual(court['price_per_hour'], 1000.0)
+
+
+class SearchCourtsTests(BookingFixtureMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        for name, address in [('Динамо', 'Лесная, 1'), ('Зал у Динамо', 'Мира, 2'), ('Арена', 'Динамо, 3')]:
+            VolleyballCourt.objects.create(name=name, address=address, status='approved')
+
+    def search(self, **params):
+        return self.client.get('/api/search-courts/', params)
+
+    def test_without_limit_returns_all_courts(self):
+        for index in range(60):
+            VolleyballCourt.objects.create(name=f'Площадка {index}', address='Адрес', status='approved')
+        response = self.search()
+        self.assertEqual(len(response.json()), 64)
+        self.assertNotIn('X-Next-Cursor', response)
+
+    def test_ranked_search_pages_through_matches(self):
+        first = self.search(query='динам', limit=2)
+        names = [court['name'] for court in first.json()]
+        # Точное совпадение названия - выше всех
+        self.assertEqual(names[0], 'Динамо')
+        self.assertNotIn('Площадка', names)
+
+        rest = self.search(query='динам', limit=2, cursor=first['X-Next-Cursor']).json()
+        names += [court['name'] for court in rest]
+        self.assertEqual(sorted(names), ['Арена', 'Динамо', 'Зал у Динамо'])
+
+    @skipUnless(connection.vendor == 'postgresql', 'Триграммы (pg_trgm) есть только в PostgreSQL')
+    def test_trigram_search_finds_typos(self):
+        names = [court['name'] for court in self.search(query='Динамл').json()]
+        self.assertEqual(names[0], 'Динамо')
+
+
+class CourtFacetsTests(BookingFixtureMixin, TestCase):
+
+    def test_facet_counts_ignore_own_selection(self):
+        VolleyballCourt.objects.filter(id=self.court.id).update(court_type='indoor', surface='parquet')
+        VolleyballCourt.objects.create(
+            name='Пляж', address='Адрес', status='approved', court_type='beach', surface='sand',
+        )
+
+        facets = self.client.get('/api/courts/facets/', {'court_type': 'indoor'}).json()['facets']
+        self.assertEqual(facets['total'], 1)
+        self.assertEqual(facets['court_type']['beach'], 1)
+        self.assertEqual((facets['surface']['parquet'], facets['surface']['sand']), (1, 0))
+
+
+class PrefixIndexTests(TestCase):
+
+    def test_words_after_punctuation_are_found(self):
+        index = PrefixIndex([
+            {'id': 1, 'name': 'Динамо-Арена', 'address': 'ул.Ленина, 5'},
+            {'id': 2, 'name': 'Зал (Север)', 'address': 'пр. Мира'},
+        ])
+        self.assertEqual([court['id'] for court in index.search('арена')], [1])
+        self.assertEqual([court['id'] for court in index.search('север')], [2])
+        self.assertEqual([court['id'] for court in index.search('ленина')], [1])
+        self.assertEqual([court['id'] for court in index.search('динамо-ар')], [1])
+
+
+class PricingTests(BookingFixtureMixin, TestCase):
+
+    def test_rules_by_weekday_and_priority(self):
+        weekday = self.day.weekday()
+        PricingRule.objects.create(name='Вечер', start_time=dt_time(18), end_time=dt_time(23), multiplier='1.5')
+        PricingRule.objects.create(
+            name='Акция площадки', court=self.court, weekdays=str(weekday),
+            start_time=dt_time(20), end_time=dt_time(21), price_per_hour=500, priority=1
+        )
+
+        self.assertEqual(quote_price(self.court, self.day, dt_time(10), 1), 1000)
+        # 19:00-20:00 по вечернему правилу, 20:00-21:00 по правилу площадки
+        self.assertEqual(quote_price(self.court, self.day, dt_time(19), 2), 2000)
+        self.assertEqual(quote_price(self.court, self.day + timedelta(days=1), dt_time(20), 1), 1500)
+
+    def test_rule_past_midnight_applies_to_next_day(self):
+        weekday = self.day.weekday()
+        PricingRule.objects.create(
+            name='Ночь', weekdays=str(weekday), start_time=dt_time(22), end_time=dt_time(2), price_per_hour=2000
+        )
+
+        self.assertEqual(quote_price(self.court, self.day, dt_time(22), 1), 2000)
+        next_day = self.day + timedelta(days=1)
+        self.assertEqual(quote_price(self.court, next_day, dt_time(1), 1), 2000)
+        self.assertEqual(quote_price(self.court, next_day, dt_time(2), 1), 1000)
+        self.assertEqual(quote_price(self.court, self.day + timedelta(days=2), dt_time(1), 1), 1000)
+
+    def test_half_open_rules_end_at_day_boundary(self):
+        PricingRule.objects.create(name='С вечера', start_time=dt_time(20), price_per_hour=1500)
+        PricingRule.objects.create(name='До утра', end_time=dt_time(10), price_per_hour=500)
+
+        self.assertEqual(quote_price(self.court, self.day, dt_time(9), 1), 500)
+        self.assertEqual(quote_price(self.court, self.day, dt_time(12), 1), 1000)
+        self.assertEqual(quote_price(self.court, self.day, dt_time(21), 1), 1500)
+
+
+class FreeWindowsTests(BookingFixtureMixin, TestCase):
+
+    def test_windows_skip_busy_time(self):
+        create_booking(self.make_booking(self.users[0], dt_time(19)))
+        self.assertEqual(get_day_availability(self.court.id, self.day).conflict(dt_time(20), dt_time(22)), 'booked')
+
+        response = self.client.get('/api/courts/free-windows/', {
+            'hours': 2, 'date_from': self.day.isoformat(), 'date_to': self.day.isoformat(),
+        })
+        windows = [
+            (window['start_time'], window['end_time'], window['latest_start'], window['total_price'])
+            for window in response.json()['windows']
+        ]
+        self.assertEqual(windows, [('08:00', '19:00', '17:00', 2000.0), ('21:00', '23:00', '21:00', 2000.0)])
+
+
+class GameCreationFormTests(BookingFixtureMixin, TestCase):
+
+    def game_form(self, game_time, end_time='', **data):
+        return GameCreationForm(
+            {
+                'title': 'Игра', 'sport_type': 'indoor', 'game_date': self.day.isoformat(),
+                'game_time': game_time, 'end_time': end_time, 'court': self.court.id,
+                'location': 'Площадка', 'max_players': 12, 'skill_level': 'any', **data,
+            },
+            user=self.users[0]
+        )
+
+    def test_game_without_end_time_respects_opening_hours(self):
+        self.assertFalse(self.game_form('05:00').is_valid())
+        # Игра по умолчанию длится два часа: до 23:30 при закрытии в 23:00
+        self.assertFalse(self.game_form('21:30').is_valid())
+        self.assertTrue(self.game_form('21:00').is_valid())
+        self.assertTrue(self.game_form('21:30', '22:30').is_valid())
+
+    def test_game_in_booking_stays_inside_booking(self):
+        booking = create_booking(self.make_booking(self.users[0], dt_time(19)))
+        booking.confirm()
+
+        # Без времени окончания игра длится два часа и вышла бы за 21:00
+        self.assertFalse(self.game_form('20:00', court_booking=booking.id).is_valid())
+        self.assertTrue(self.game_form('19:00', court_booking=booking.id).is_valid())
+        self.assertFalse(self.game_form('19:00', court_booking=booking.id, court='').is_valid())
+
+
+class BookingSeriesTests(BookingFixtureMixin, TestCase):
+
+    def test_creates_weekly_series(self):
+        self.court.advance_booking_days = 90
+        series = create_booking_series(self.make_booking(self.users[0], dt_time(19)), 12)
+
+        self.assertEqual(len(series), 12)
+        self.assertEqual(CourtBooking.objects.filter(series=series[0].series).count(), 12)
+        self.assertEqual(
+            sorted(CourtBooking.objects.values_list('booking_date', flat=True)),
+            [self.day + timedelta(weeks=week) for week in range(12)]
+        )
+        self.assertEqual(TimeSlot.objects.filter(court=self.court, is_booked=True).count(), 24)
+        self.assertEqual(len(set(booking.booking_number for booking in series)), 12)
+        self.assertRegex(series[0].booking_number, r'^BOOK-\d{8}-[0-9A-F]{4}$')
+
+    def test_series_beyond_advance_booking_days(self):
+        with self.assertRaises(BookingConflict) as error:
+            create_booking_series(self.make_booking(self.users[0], dt_time(19)), 12)
+        self.assertIn((self.day + timedelta(weeks=2)).strftime('%d.%m.%Y'), str(error.exception))
+        self.assertEqual(CourtBooking.objects.count(), 0)
+
+        form = CourtBookingForm(
+            {
+                'booking_date': self.day.isoformat(), 'start_time': '19:00', 'hours': 2, 'repeat_weeks': 12,
+                'contact_name': 'Игрок', 'contact_phone': '+79990000000',
+            },
+            court=self.court, user=self.users[0]
+        )
+        self.assertFalse(form.is_valid())
+        self.assertIn(format_series_too_far(self.court, self.day + timedelta(weeks=2)), form.non_field_errors())
+
+    def test_conflicting_week_rejects_whole_series(self):
+        self.court.advance_booking_days = 90
+        create_booking(self.make_booking(self.users[1], dt_time(20), hours=1))
+        TimeSlot.objects.filter(court=self.court).delete()
+        CourtBooking.objects.update(booking_date=self.day + timedelta(weeks=3))
+
+        with self.assertRaises(BookingConflict) as error:
+            create_booking_series(self.make_booking(self.users[0], dt_time(19)), 4)
+        self.assertIn((self.day + timedelta(weeks=3)).strftime('%d.%m.%Y'), str(error.exception))
+        self.assertEqual(CourtBooking.objects.count(), 1)
+
+
+class HoldTests(BookingFixtureMixin, TestCase):
+
+    def hold(self, user, start_time, hours=2, day=None):
+        self.client.force_login(user)
+        return self.client.post(f'/api/courts/{self.court.id}/hold/', {
+            'date': (day or self.day).isoformat(), 'start_time': start_time, 'hours': hours,
+        })
+
+    def test_hold_outside_opening_hours_is_rejected(self):
+        self.assertEqual(self.hold(self.users[0], '03:00').status_code, 400)
+        self.assertEqual(self.hold(self.users[0], '22:00').status_code, 400)
+        self.assertEqual(self.hold(self.users[0], '10:00', day=date.today() - timedelta(days=1)).status_code, 400)
+        self.assertEqual(self.hold(self.users[0], '10:00').status_code, 200)
+
+    def test_hold_blocks_other_players_until_released(self):
+        self.assertEqual(self.hold(self.users[0], '19:00').status_code, 200)
+
+        self.assertEqual(self.hold(self.users[1], '20:00').status_code, 409)
+        with self.assertRaises(BookingConflict):
+            create_booking(self.make_booking(self.users[1], dt_time(20)))
+
+        self.client.force_login(self.users[0])
+        self.client.delete(f'/api/courts/{self.court.id}/hold/')
+        self.assertEqual(self.hold(self.users[1], '20:00').status_code, 200)
+
+    def test_own_hold_does_not_block_booking(self):
+        self.hold(self.users[0], '19:00')
+        create_booking(self.make_booking(self.users[0], dt_time(19)))
+        self.assertEqual(CourtBooking.objects.filter(court=self.court).count(), 1)
+
+
+class UpdateBookingStatusesTests(BookingFixtureMixin, TestCase):
+
+    def add_booking(self, day, start_time, end_time, status='confirmed'):
+        return CourtBooking.objects.create(
+            court=self.court, user=self.users[0], booking_date=day,
+            start_time=start_time, end_time=end_time, hours=3, price_per_hour=1000,
+            contact_name='player', contact_phone='+79990000000', status=status,
+        )
+
+    def test_booking_past_midnight_finishes_next_day(self):
+        today = date(2026, 10, 18)
+        booking = self.add_booking(today - timedelta(days=1), dt_time(22), dt_time(1))
+
+        def finished(hour, minute=0):
+            now = datetime.combine(today, dt_time(hour, minute))
+            return CourtBooking.objects.filter(finished_q(now), id=booking.id).exists()
+
+        self.assertFalse(finished(0, 30))
+        self.assertTrue(finished(1))
+
+    def test_command_completes_and_expires_past_bookings(self):
+        yesterday = date.today() - timedelta(days=1)
+        confirmed = self.add_booking(yesterday, dt_time(10), dt_time(13))
+        upcoming = self.add_booking(self.day, dt_time(10), dt_time(13))
+        pending = create_booking(self.make_booking(self.users[1], dt_time(19)))
+        CourtBooking.objects.filter(id=pending.id).update(booking_date=yesterday)
+
+        call_command('update_booking_statuses', stdout=StringIO())
+
+        statuses = dict(CourtBooking.objects.values_list('id', 'status'))
+        self.assertEqual(statuses[confirmed.id], 'completed')
+        self.assertEqual(statuses[upcoming.id], 'confirmed')
+        self.assertEqual(statuses[pending.id], 'expired')
+        self.assertFalse(TimeSlot.objects.filter(booking=pending).exists())
+
+    def test_command_keeps_old_pending_booking_for_future_date(self):
+        booking = create_booking(self.make_booking(self.users[0], dt_time(19)))
+        CourtBooking.objects.filter(id=booking.id).update(created_at=timezone.now() - timedelta(days=3))
+
+        call_command('update_booking_statuses', stdout=StringIO())
+
+        booking.refresh_from_db()
+        self.assertEqual(booking.status, 'pending')
+        self.assertEqual(TimeSlot.objects.filter(booking=booking).count(), 2)
+
+
+class BlockedIntervalTests(BookingFixtureMixin, TestCase):
+
+    def moment(self, days, hour=0):
+        return timezone.make_aware(datetime.combine(self.day + timedelta(days=days), dt_time(hour)))
+
+    def test_month_closure_is_one_row(self):
+        block_court(self.court, self.moment(0), self.moment(15))
+        block_court(self.court, self.moment(10), self.moment(30))
+
+        self.assertEqual(BlockedInterval.objects.count(), 1)
+        with self.assertRaises(BookingConflict):
+            create_booking(self.make_booking(self.users[0], dt_time(19)))
+
+    def test_unblock_splits_interval(self):
+        block_court(self.court, self.moment(-1), self.moment(1))
+        self.assertEqual(unblock_court(self.court, self.moment(0, 18), self.moment(0, 22)), 1)
+
+        self.assertEqual(
+            list(BlockedInterval.objects.values_list('start_at', 'end_at')),
+            [(self.moment(-1), self.moment(0, 18)), (self.moment(0, 22), self.moment(1))]
+        )
+        create_booking(self.make_booking(self.users[0], dt_time(19)))
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class LockedCheckTests(BookingFixtureMixin, TestCase):
+    """
+    Проверка под блокировкой в одном потоке: конфликт ищется по базе,
+    даже если карта занятости в кэше устарела
+    """
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def test_conflict_with_stale_cache_writes_nothing(self):
+        get_day_availability(self.court.id, self.day)
+        # bulk_create не отправляет сигналы - кэш остаётся пустым
+        CourtBooking.objects.bulk_create([CourtBooking(
+            court=self.court, user=self.users[0], booking_date=self.day,
+            start_time=dt_time(19), end_time=dt_time(21), hours=2,
+            price_per_hour=1000, total_price=2000, status='confirmed',
+            booking_number=CourtBooking.generate_booking_number(),
+            contact_name='player0', contact_phone='+79990000000',
+        )])
+        self.assertFalse(get_day_availability(self.court.id, self.day).conflict(dt_time(20), dt_time(22)))
+
+        with self.assertRaises(BookingConflict):
+            create_booking(self.make_booking(self.users[1], dt_time(20)))
+        self.assertEqual(CourtBooking.objects.filter(court=self.court).count(), 1)
+        self.assertFalse(TimeSlot.objects.filter(court=self.court).exists())
+
+
+class ConcurrentBookingTests(BookingFixtureMixin, TransactionTestCase):
+    """
+    Параллельные бронирования одного популярного вечернего слота.
+    Потокам нужны отдельные соединения с общей базой: на PostgreSQL
+    брони идут через SELECT ... FOR UPDATE, на SQLite тестовая база
+    лежит в файле (DATABASES TEST NAME) и брони ждут блокировку базы.
+    Пропускная способность выводится в stderr.
+    """
+
+    USERS = 16
+
+    def _race(self, start_times):
+        results = []
+        barrier = threading.Barrier(len(start_times))
+
+        def book(user, start_time):
+            try:
+                barrier.wait()
+                try:
+                    create_booking(self.make_booking(user, start_time))
+                    results.append('ok')
+                except BookingConflict:
+                    results.append('conflict')
+                except Exception as e:
+                    results.append(repr(e))
+            finally:
+                connection.close()
+
+        threads = [
+            threading.Thread(target=book, args=(user, start_time))
+            for user, start_time in zip(self.users, start_times)
+        ]
+        started = time.monotonic()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.monotonic() - started
+        sys.stderr.write(
+            f'\n{self._testMethodName}: {len(start_times)} запросов за {elapsed:.3f} с, '
+            f'{len(start_times) / elapsed:.0f} запр./с, {elapsed / len(start_times) * 1000:.1f} мс на бронь\n'
+        )
+        return results, elapsed
+
+    def test_one_slot_many_requests(self):
+        results, elapsed = self._race([dt_time(19)] * self.USERS)
+
+        self.assertEqual(results.count('ok'), 1, results)
+        self.assertEqual(results.count('conflict'), self.USERS - 1, results)
+        self.assertEqual(CourtBooking.objects.filter(court=self.court).count(), 1)
+        self.assertEqual(TimeSlot.objects.filter(court=self.court, is_booked=True).count(), 2)
+        self.assertLess(elapsed, 10)
+
+    def test_overlapping_starts(self):
+        # 18:00, 18:30, 19:00, ... - пересекающиеся двухчасовые брони
+        starts = [dt_time(18 + i // 2, 30 * (i % 2)) for i in range(8)]
+        results, _ = self._race(starts)
+
+        bookings = list(CourtBooking.objects.filter(court=self.court).order_by('start_time'))
+        self.assertEqual(len(bookings), results.count('ok'), results)
+        for previous, current in zip(bookings, bookings[1:]):
+            self.assertLessEqual(previous.end_time, current.start_time)
@@ -0,0 +1,106 @@
+"""
+Тайловый слой площадок: /tiles/courts/{z}/{x}/{y}.json
+
+Каждый тайл кэшируется под собственным ключом без версии слоя.
+При изменении площадки удаляются только тайлы, в которые попадали
+её старые и новые координаты (по одному тайлу на каждый масштаб),
+остальные тайлы продолжают отдаваться из кэша с прежним ETag.
+"""
+import hashlib
+import json
+
+from django.core.cache import cache
+
+from .court_layer import approved_courts, LAYER_CACHE_TIMEOUT
+from .geo import MIN_ZOOM, MAX_ZOOM, bbox_q, tile_bounds, lng_to_tile_x, lat_to_tile_y
+
+
+# Сколько браузер и прокси могут отдавать тайл без перепроверки (секунды)
+TILE_MAX_AGE = 60
+
+
+def tile_cache_key(zoom, x, y):
+    return f'courts:tile:{zoom}:{x}:{y}'
+
+
+def is_valid_tile(zoom, x, y):
+    """Существует ли тайл с такими координатами"""
+    if not MIN_ZOOM <= zoom <= MAX_ZOOM:
+        return False
+    n = 2 ** zoom
+    return 0 <= x < n and 0 <= y < n
+
+
+def point_tile_keys(lat, lng):
+    """Ключи кэша всех тайлов (по одному на масштаб), содержащих точку"""
+    lat, lng = float(lat), float(lng)
+    return [
+        tile_cache_key(zoom, lng_to_tile_x(lng, zoom), lat_to_tile_y(lat, zoom))
+        for zoom in range(MIN_ZOOM, MAX_ZOOM + 1)
+    ]
+
+
+def invalidate_tiles(points):
+    """Сбросить тайлы, содержащие точки [(lat, lng), ...]"""
+    keys = set()
+    for lat, lng in points:
+        if lat is None or lng is None:
+            continue
+        keys.update(point_tile_keys(lat, lng))
+    if keys:
+        cache.delete_many(list(keys))
+
+
+def build_tile(zoom, x, y):
+    """Собрать тайл: тело JSON и ETag"""
+    min_lng, min_lat, max_lng, max_lat = tile_bounds(x, y, zoom)
+    # Крайние ряды тайлов забирают и точки за пределами проекции
+    if y == 0:
+        max_lat = 90.0
+    if y == 2 ** zoom - 1:
+        min_lat = -90.0
+
+    rows = approved_courts().filter(
+        bbox_q((min_lng, min_lat, max_lng, max_lat))
+    ).values_list(
+        'id', 'name', 'latitude', 'longitude', 'court_type', 'is_free',
+        'is_lighted', 'price_per_hour'
+    ).order_by('id')
+
+    courts = []
+    for court_id, name, lat, lng, court_type, is_free, is_lighted, price in rows:
+        lat, lng = float(lat), float(lng)
+        # Точки на общей границе принадлежат одному тайлу - тому же,
+        # который сбрасывается при их изменении
+        if lng_to_tile_x(lng, zoom) != x or lat_to_tile_y(lat, zoom) != y:
+            continue
+        courts.append({
+            'id': court_id,
+            'name': name,
+            'latitude': lat,
+            'longitude': lng,
+            'court_type': court_type,
+            'is_free': is_free,
+            'is_lighted': is_lighted,
+            'price': float(price) if price else 0,
+        })
+
+    body = json.dumps(
+        {'z': zoom, 'x': x, 'y': y, 'courts': courts},
+        ensure_ascii=False
+    ).encode('utf-8')
+
+    return {
+        'etag': '"%s"' % hashlib.sha1(body).hexdigest(),
+        'body': body,
+    }
+
+
+def get_tile(zoom, x, y):
+    """Тайл из кэша; собирается при первом обращении после изменения"""
+    key = tile_cache_key(zoom, x, y)
+    tile = cache.get(key)
+    if tile is None:
+        tile = build_tile(zoom, x, y)
+        cache.set(key, tile, LAYER_CACHE_TIMEOUT)
+    return tile
@@ -83,10 +83,20 @@ urlpatterns = [
     # ============================================================================
     # API для карты и бронирования
     path('api/courts/', views.courts_api, name='courts_api'),  # API площадок
+    path('api/courts/clusters/', views.courts_clusters_api, name='courts_clusters_api'),  # Кластеры площадок для карты
+    path('api/courts/map/', views.courts_map_api, name='courts_map_api'),  # Снимок карты с ETag
+    path('tiles/courts/<int:z>/<int:x>/<int:y>.json', views.court_tile_api, name='court_tile_api'),  # Тайлы слоя площадок
     path('api/courts/<int:court_id>/', views.court_detail_api, name='court_detail_api'),  # API деталей площадки
     path('api/check-availability/', views.check_availability, name='check_availability'),  # Проверка доступности
     path('api/time-slots/<int:court_id>/', views.get_time_slots, name='get_time_slots'),  # Временные слоты
+    path('api/time-slots/<int:court_id>/grid/', views.court_slot_grid_api, name='court_slot_grid_api'),  # Сетка слотов на несколько дней
+    path('api/courts/<int:court_id>/hold/', views.booking_hold_api, name='booking_hold_api'),  # Удержание времени при бронировании
+    path('api/courts/blocks/', views.court_blocks_api, name='court_blocks_api'),  # Закрытие площадок администратором
     path('api/search-courts/', views.search_courts_api, name='search_courts_api'),  # Поиск площадок API
+    path('api/courts/autocomplete/', views.courts_autocomplete_api, name='courts_autocomplete_api'),  # Подсказки площадок
+    path('api/courts/facets/', views.courts_facets_api, name='courts_facets_api'),  # Счётчики фильтров поиска
+    path('api/courts/nearest/', views.courts_nearest_api, name='courts_nearest_api'),  # Ближайшие площадки
+    path('api/courts/free-windows/', views.courts_free_windows_api, name='courts_free_windows_api'),  # Свободное время по площадкам
     # API для игр
     path('api/games-by-date/', views.games_by_date_api, name='games_by_date_api'),  # Игры по дате
     
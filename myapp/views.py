@@ -2,17 +2,17 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.http import JsonResponse, HttpResponseForbidden, HttpResponseBadRequest, HttpResponse
+from django.http import JsonResponse, HttpResponseForbidden, HttpResponseBadRequest, HttpResponse, HttpResponseNotModified, Http404
+from django.utils.http import parse_etags
 from django.db.models import Q, Count, Avg
 from django.utils import timezone
 from django.contrib.auth.models import User
 from django.core.paginator import Paginator
-from django.views.decorators.http import require_POST, require_GET
+from django.views.decorators.http import require_POST, require_GET, require_http_methods
 from django.conf import settings
 from django.core.exceptions import ValidationError
 from django.db import IntegrityError
 import json
-import decimal
 from datetime import datetime, timedelta, date
 import calendar
 from .models import (
@@ -23,7 +23,32 @@ from .forms import (
     ProfileEditForm, AvatarUploadForm, SearchForm, FriendSearchForm,
     GameCreationForm, GameJoinForm, CourtSuggestionForm,
     CourtBookingForm, ReviewForm, QuickBookingForm,
-    CustomUserRegistrationForm
+    CustomUserRegistrationForm, check_booking_date, check_booking_time
+)
+from .geo import parse_bbox, parse_zoom, snap_bbox_to_tiles, bbox_q
+from .clustering import get_clusters_in_bbox
+from .court_layer import get_map_snapshot, snapshot_stats
+from .tiles import get_tile, is_valid_tile, TILE_MAX_AGE
+from .court_filters import parse_court_filters, apply_court_filters
+from .facets import get_court_facets
+from .responses import compressed_json_response, streaming_json_response, iter_json_object
+from .search import search_courts, encode_cursor, decode_cursor, parse_page_size
+from .court_bundle import get_court_bundle, user_can_review
+from .availability import get_day_availability, AVAILABILITY_CONFLICT_MESSAGES
+from .pricing import quote_price
+from .booking import create_booking, create_booking_series, schedule_game, place_hold, release_holds, BookingConflict
+from .blocking import block_court, unblock_court, affected_bookings, MAX_BLOCK_DAYS
+from .autocomplete import autocomplete_courts, DEFAULT_LIMIT as AUTOCOMPLETE_DEFAULT_LIMIT, MAX_LIMIT as AUTOCOMPLETE_MAX_LIMIT
+from .nearest import find_nearest_courts, DEFAULT_K, MAX_K, DEFAULT_RADIUS_KM, MAX_RADIUS_KM
+from .slot_grid import build_slot_grid, grid_dates, GRID_STEPS, DEFAULT_GRID_STEP, DEFAULT_GRID_DAYS, MAX_GRID_DAYS
+from .free_windows import (
+    candidate_courts, find_free_windows, parse_date_range, SORT_OPTIONS as FREE_WINDOWS_SORT_OPTIONS,
+    DEFAULT_LIMIT as FREE_WINDOWS_DEFAULT_LIMIT, MAX_LIMIT as FREE_WINDOWS_MAX_LIMIT
+)
+from .court_sync import make_sync_cursor, parse_sync_cursor, is_cursor_expired, removed_court_ids
+from .serializers import (
+    CourtSerializer, parse_fields, parse_format, to_columnar,
+    COURTS_API_FIELDS, COURT_DETAIL_FIELDS, COURT_DETAIL_EXTRA_FIELDS, SEARCH_FIELDS
 )
 from django.contrib.auth import login
 from django.core import serializers
@@ -350,66 +375,15 @@ def home(request):
 @login_required
 def full_map_view(request):
     """Полная карта волейбольных площадок из базы данных"""
-    # Получаем все активные площадки
-    courts = VolleyballCourt.objects.filter(
-        is_active=True
-    )
-
-    # Подготавливаем данные для карты
-    courts_data = []
-    for court in courts:
-        court_info = {
-            'id': court.id,
-            'name': court.name,
-            'address': court.address,
-            'city': court.city,
-            'court_type': court.court_type,
-            'court_type_display': court.get_court_type_display(),
-            'is_free': court.is_free,
-            'price_per_hour': float(court.price_per_hour) if court.price_per_hour else 0,
-            'is_lighted': court.is_lighted,
-            'has_parking': court.has_parking,
-            'has_showers': court.has_showers,
-            'has_cafe': court.has_cafe,
-            'has_locker_rooms': court.has_locker_rooms,
-            'has_equipment_rental': court.has_equipment_rental,
-            'description': court.description[:100] if court.description else '',
-            'working_days': court.working_days,
-            'opening_time': str(court.opening_time) if court.opening_time else '08:00',
-            'closing_time': str(court.closing_time) if court.closing_time else '22:00',
-            'phone': court.phone or '',
-            'website': court.website or '',
-            'photo_url': court.photo_url or '',
-            'booking_enabled': court.booking_enabled,
-            'min_booking_hours': court.min_booking_hours,
-            'max_booking_hours': court.max_booking_hours,
-            'advance_booking_days': court.advance_booking_days,
-            'capacity': court.courts_count,
-            'surface': court.get_surface_display(),
-        }
-
-        # Добавляем координаты если они есть
-        if court.latitude and court.longitude:
-            court_info['latitude'] = float(court.latitude)
-            court_info['longitude'] = float(court.longitude)
-            court_info['has_coordinates'] = True
-        else:
-            # Если нет координат, используем значения по умолчанию для города
-            court_info['latitude'] = 55.7558 if court.city == 'Москва' else 59.9343
-            court_info['longitude'] = 37.6173 if court.city == 'Москва' else 30.3351
-            court_info['has_coordinates'] = False
-
-        courts_data.append(court_info)
+    # Снимок всех активных площадок пересобирается только при их изменении
+    snapshot = get_map_snapshot('full')
 
     context = {
         'page_title': 'Карта волейбольных площадок',
-        'courts': courts,
-        'courts_json': json.dumps(courts_data, ensure_ascii=False),
-        'courts_count': courts.count(),
-        'free_courts_count': courts.filter(is_free=True).count(),
-        'indoor_courts_count': courts.filter(court_type='indoor').count(),
-        'outdoor_courts_count': courts.filter(court_type='outdoor').count(),
-        'beach_courts_count': courts.filter(court_type='beach').count(),
+        'courts': VolleyballCourt.objects.filter(is_active=True),
+        'courts_json': snapshot['courts_json'],
+        **snapshot['stats'],
+        'facets': get_court_facets(parse_court_filters({}), scope='full'),
         'current_filters': {}
     }
 
@@ -419,88 +393,106 @@ def full_map_view(request):
 def map_view(request):
     """Карта ТОЛЬКО ОДОБРЕННЫХ волейбольных площадок с функцией бронирования"""
 
-    # Получаем только одобренные и активные площадки
-    courts = VolleyballCourt.objects.filter(
-        status='approved',
-        is_active=True,
-        is_verified=True
-    )
-    
+    # Готовый снимок одобренных площадок (одно обращение к кэшу)
+    snapshot = get_map_snapshot('map')
+
     # Применяем фильтры из GET-параметров
     court_type = request.GET.get('type', '')
     is_free = request.GET.get('free', '')
     has_lighting = request.GET.get('lighting', '')
-    
-    if court_type:
-        courts = courts.filter(court_type=court_type)
-    if is_free == 'true':
-        courts = courts.filter(is_free=True)
+
+    filters = parse_court_filters({})
+    filters['court_type'] = court_type
+    filters['free_only'] = is_free == 'true'
     if has_lighting == 'true':
-        courts = courts.filter(is_lighted=True)
-    
-    # Подготавливаем данные для карты и бронирования
-    courts_data = []
-    for court in courts:
-        court_info = {
-            'id': court.id,
-            'name': court.name,
-            'address': court.address,
-            'city': court.city,
-            'court_type': court.court_type,
-            'court_type_display': court.get_court_type_display(),
-            'is_free': court.is_free,
-            'price': float(court.price_per_hour) if court.price_per_hour else 0,
-            'is_lighted': court.is_lighted,
-            'has_parking': court.has_parking,
-            'has_showers': court.has_showers,
-            'has_cafe': court.has_cafe,
-            'has_locker_rooms': court.has_locker_rooms,
-            'has_equipment_rental': court.has_equipment_rental,
-            'description': court.description[:100] if court.description else '',
-            'working_days': court.working_days,
-            'opening_time': str(court.opening_time) if court.opening_time else '08:00',
-            'closing_time': str(court.closing_time) if court.closing_time else '22:00',
-            'phone': court.phone or '',
-            'website': court.website or '',
-            'photo_url': court.photo_url or '',
-            'booking_enabled': court.booking_enabled,
-            'min_booking_hours': court.min_booking_hours,
-            'max_booking_hours': court.max_booking_hours,
-            'advance_booking_days': court.advance_booking_days,
-        }
-        
-        # Добавляем координаты если они есть
-        if court.latitude and court.longitude:
-            court_info['latitude'] = float(court.latitude)
-            court_info['longitude'] = float(court.longitude)
-            court_info['has_coordinates'] = True
-        else:
-            # Если нет координат, используем значения по умолчанию для города
-            court_info['latitude'] = 55.7558 if court.city == 'Москва' else 59.9343
-            court_info['longitude'] = 37.6173 if court.city == 'Москва' else 30.3351
-            court_info['has_coordinates'] = False
-        
-        courts_data.append(court_info)
-    
+        filters['amenities'] = ['is_lighted']
+
+    courts = apply_court_filters(
+        VolleyballCourt.objects.filter(
+            status='approved',
+            is_active=True,
+            is_verified=True
+        ),
+        filters
+    )
+
+    if court_type or is_free == 'true' or has_lighting == 'true':
+        # Фильтруем снимок в памяти вместо повторных запросов к БД
+        courts_data = [
+            court for court in snapshot['courts']
+            if (not court_type or court['court_type'] == court_type)
+            and (is_free != 'true' or court['is_free'])
+            and (has_lighting != 'true' or court['is_lighted'])
+        ]
+        courts_json = json.dumps(courts_data, ensure_ascii=False)
+        stats = snapshot_stats(courts_data)
+    else:
+        courts_json = snapshot['courts_json']
+        stats = snapshot['stats']
+
     # Статистика для отображения
     context = {
         'page_title': 'Карта волейбольных площадок',
         'courts': courts,
-        'courts_json': json.dumps(courts_data, ensure_ascii=False),
-        'courts_count': courts.count(),
-        'free_courts_count': courts.filter(is_free=True).count(),
-        'indoor_courts_count': courts.filter(court_type='indoor').count(),
-        'outdoor_courts_count': courts.filter(court_type='outdoor').count(),
-        'beach_courts_count': courts.filter(court_type='beach').count(),
+        'courts_json': courts_json,
+        **stats,
+        # Счётчики для подписей фильтров: "Пляж (12)"
+        'facets': get_court_facets(filters, scope='map'),
         'current_filters': {
             'type': court_type,
             'free': is_free,
             'lighting': has_lighting,
         }
     }
-    
+
     return render(request, 'court/map.html', context)
 
+
+@require_GET
+def courts_map_api(request):
+    """
+    Снимок публичной карты площадок со статистикой.
+
+    Отдаётся с сильным ETag: неизменившаяся карта стоит одного
+    обращения к кэшу или ответа 304.
+    """
+    snapshot = get_map_snapshot('map')
+
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+    if if_none_match and snapshot['etag'] in parse_etags(if_none_match):
+        response = HttpResponseNotModified()
+    else:
+        response = HttpResponse(snapshot['body'], content_type='application/json; charset=utf-8')
+
+    response['ETag'] = snapshot['etag']
+    response['Cache-Control'] = 'public, no-cache'
+    return response
+
+
+@require_GET
+def court_tile_api(request, z, x, y):
+    """
+    Тайл слоя площадок /tiles/courts/{z}/{x}/{y}.json.
+
+    URL тайла одинаков для всех пользователей, поэтому его могут
+    кэшировать браузеры и прокси; после истечения max-age тайл
+    перепроверяется по ETag.
+    """
+    if not is_valid_tile(z, x, y):
+        return JsonResponse({'success': False, 'error': 'Тайл не существует'}, status=404)
+
+    tile = get_tile(z, x, y)
+
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+    if if_none_match and tile['etag'] in parse_etags(if_none_match):
+        response = HttpResponseNotModified()
+    else:
+        response = HttpResponse(tile['body'], content_type='application/json; charset=utf-8')
+
+    response['ETag'] = tile['etag']
+    response['Cache-Control'] = f'public, max-age={TILE_MAX_AGE}'
+    return response
+
 # ============================================================================
 # СИСТЕМА БРОНИРОВАНИЯ ПЛОЩАДОК
 # ============================================================================
@@ -514,40 +506,28 @@ def book_court(request, court_id):
         messages.error(request, 'Планирование игры для этой площадки временно недоступно')
         return redirect('map_view')
     
+    hold = None
     if request.method == 'POST':
         form = CourtBookingForm(request.POST, court=court, user=request.user)
         
         if form.is_valid():
             try:
-                # Создаем игру
+                # Создаем игру и занимаем слоты в одной транзакции
                 booking = form.save(commit=False)
                 booking.court = court
                 booking.user = request.user
-                booking.price_per_hour = court.price_per_hour
-                booking.total_price = court.price_per_hour * booking.hours
-                
-                # Расчет времени окончания
-                start_datetime = datetime.combine(booking.booking_date, booking.start_time)
-                end_datetime = start_datetime + timedelta(hours=booking.hours)
-                booking.end_time = end_datetime.time()
                 
-                # Сохраняем игру
-                booking.save()
-                
-                # Создаем временные слоты для этой игры
-                for i in range(booking.hours):
-                    slot_time = (start_datetime + timedelta(hours=i)).time()
-                    slot_end = (start_datetime + timedelta(hours=i+1)).time()
-                    
-                    TimeSlot.objects.create(
-                        court=court,
-                        date=booking.booking_date,
-                        start_time=slot_time,
-                        end_time=slot_end,
-                        is_booked=True,
-                        booking=booking,
-                        price=court.price_per_hour
+                repeat_weeks = form.cleaned_data.get('repeat_weeks') or 1
+                if repeat_weeks > 1:
+                    series = create_booking_series(booking, repeat_weeks)
+                    messages.success(request,
+                        f'✅ Регулярная игра на площадке "{court.name}" запланирована: '
+                        f'{len(series)} игр с {series[0].booking_date:%d.%m.%Y} '
+                        f'по {series[-1].booking_date:%d.%m.%Y}.'
                     )
+                    return redirect('booking_confirmation', booking_id=series[0].id)
+                
+                create_booking(booking)
                 
                 # Добавляем участников если указаны email
                 participants_emails = form.cleaned_data.get('participants_emails', '')
@@ -563,6 +543,9 @@ def book_court(request, court_id):
                 
                 return redirect('booking_confirmation', booking_id=booking.id)
                 
+            except BookingConflict as e:
+                form.add_error(None, str(e))
+                messages.error(request, str(e))
             except Exception as e:
                 messages.error(request, f'Ошибка при создании игры: {str(e)}')
         else:
@@ -584,18 +567,159 @@ def book_court(request, court_id):
         except:
             pass
         
+        # Выбранное на сетке время удерживается, пока игрок заполняет форму
+        if request.GET.get('date') and request.GET.get('start_time'):
+            try:
+                hold_date, hold_start, hold_hours = parse_hold_params(request.GET, court)
+                hold = place_hold(court, request.user, hold_date, hold_start, hold_hours)
+                initial_data.update({
+                    'booking_date': hold_date,
+                    'start_time': hold_start,
+                    'hours': hold_hours,
+                })
+            except (ValueError, BookingConflict) as e:
+                messages.warning(request, str(e))
+        
         form = CourtBookingForm(court=court, user=request.user, initial=initial_data)
     
     context = {
         'page_title': f'Планирование игры: {court.name}',
         'court': court,
         'form': form,
+        'hold': hold,
         'today': timezone.now().date(),
         'max_date': timezone.now().date() + timedelta(days=court.advance_booking_days),
     }
     
     return render(request, 'book_court.html', context)
 
+def parse_hold_params(params, court):
+    """Дата, начало и длительность удержания из запроса; ValueError при ошибке"""
+    try:
+        hold_date = datetime.strptime(params.get('date', ''), '%Y-%m-%d').date()
+        hold_start = datetime.strptime(params.get('start_time', ''), '%H:%M').time()
+        hold_hours = int(params.get('hours') or court.min_booking_hours)
+    except ValueError:
+        raise ValueError('Неверные дата, время или длительность')
+
+    if not court.min_booking_hours <= hold_hours <= court.max_booking_hours:
+        raise ValueError(
+            f'Длительность игры - от {court.min_booking_hours} до {court.max_booking_hours} ч.'
+        )
+    # Удерживать можно только то время, которое можно забронировать
+    try:
+        check_booking_date(court, hold_date)
+        check_booking_time(court, hold_date, hold_start, hold_hours)
+    except ValidationError as e:
+        raise ValueError(e.messages[0])
+    return hold_date, hold_start, hold_hours
+
+@login_required
+@require_http_methods(['POST', 'DELETE'])
+def booking_hold_api(request, court_id):
+    """
+    Удержание времени на площадке: POST (date, start_time, hours) - удержать,
+    DELETE - снять свои удержания
+    """
+    court = get_object_or_404(VolleyballCourt, id=court_id, status='approved', is_active=True)
+
+    if request.method == 'DELETE':
+        release_holds(court, request.user)
+        return JsonResponse({'success': True})
+
+    if not court.booking_enabled:
+        return JsonResponse({'success': False, 'error': 'Бронирование площадки недоступно'}, status=400)
+
+    try:
+        hold_date, hold_start, hold_hours = parse_hold_params(request.POST, court)
+    except ValueError as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=400)
+
+    try:
+        hold = place_hold(court, request.user, hold_date, hold_start, hold_hours)
+    except BookingConflict as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=409)
+
+    return JsonResponse({
+        'success': True,
+        'hold': {
+            'date': hold.date.isoformat(),
+            'start_time': hold.start_time.strftime('%H:%M'),
+            'end_time': hold.end_time.strftime('%H:%M'),
+            'expires_at': hold.expires_at.isoformat(),
+        },
+    })
+
+def parse_block_moment(value, end=False):
+    """
+    Момент из 'YYYY-MM-DDTHH:MM' или дата 'YYYY-MM-DD' (начало дня;
+    для конца интервала - конец дня). ValueError при ошибке.
+    """
+    for fmt in ('%Y-%m-%dT%H:%M', '%Y-%m-%d %H:%M'):
+        try:
+            return timezone.make_aware(datetime.strptime(value, fmt))
+        except ValueError:
+            pass
+    day = datetime.strptime(value, '%Y-%m-%d')
+    if end:
+        day += timedelta(days=1)
+    return timezone.make_aware(day)
+
+@login_required
+@require_POST
+def court_blocks_api(request):
+    """
+    Закрытие площадок для администраторов: action (block/unblock),
+    court_ids (несколько), start, end, reason
+    """
+    if not request.user.is_staff:
+        return JsonResponse({'success': False, 'error': 'Доступ запрещён'}, status=403)
+
+    action = request.POST.get('action')
+    if action not in ('block', 'unblock'):
+        return JsonResponse({'success': False, 'error': 'action: block или unblock'}, status=400)
+
+    try:
+        court_ids = [int(court_id) for value in request.POST.getlist('court_ids') for court_id in value.split(',') if court_id]
+        start_at = parse_block_moment(request.POST.get('start', ''))
+        end_at = parse_block_moment(request.POST.get('end', ''), end=True)
+    except ValueError:
+        return JsonResponse({'success': False, 'error': 'Неверные площадки, начало или окончание'}, status=400)
+
+    if not court_ids:
+        return JsonResponse({'success': False, 'error': 'Не выбраны площадки'}, status=400)
+    if end_at <= start_at:
+        return JsonResponse({'success': False, 'error': 'Окончание должно быть позже начала'}, status=400)
+    if end_at - start_at > timedelta(days=MAX_BLOCK_DAYS):
+        return JsonResponse({'success': False, 'error': f'Можно закрыть не более чем на {MAX_BLOCK_DAYS} дней'}, status=400)
+
+    courts = list(VolleyballCourt.objects.filter(id__in=court_ids))
+    if len(courts) != len(set(court_ids)):
+        return JsonResponse({'success': False, 'error': 'Площадка не найдена'}, status=404)
+
+    results = []
+    for court in courts:
+        if action == 'unblock':
+            results.append({'court_id': court.id, 'changed': unblock_court(court, start_at, end_at)})
+            continue
+
+        interval = block_court(court, start_at, end_at, request.POST.get('reason', '')[:200], request.user)
+        results.append({
+            'court_id': court.id,
+            'interval': {
+                'id': interval.id,
+                'start': timezone.localtime(interval.start_at).isoformat(),
+                'end': timezone.localtime(interval.end_at).isoformat(),
+                'reason': interval.reason,
+            },
+            # Брони не отменяются автоматически - администратор решает сам
+            'affected_bookings': [
+                booking.booking_number for booking in affected_bookings(court, start_at, end_at)
+            ],
+        })
+
+    return JsonResponse({'success': True, 'courts': results})
+
 @login_required
 def booking_confirmation(request, booking_id):
     """Страница подтверждения бронирования"""
@@ -723,38 +847,17 @@ def check_availability(request):
             is_available = False
             conflict_message = f"Площадка закрывается в {court.closing_time.strftime('%H:%M')}"
         
-        # 2. Проверяем существующие игры
-        if is_available:
-            conflicting_bookings = CourtBooking.objects.filter(
-                court=court,
-                booking_date=booking_date,
-                status__in=['pending', 'confirmed']
-            ).exclude(
-                Q(end_time__lte=start_time) | Q(start_time__gte=end_dt.strftime('%H:%M'))
-            )
-            
-            if conflicting_bookings.exists():
-                is_available = False
-                conflict_message = "Выбранное время уже занято"
-        
-        # 3. Проверяем заблокированные временные слоты
+        # 2. Проверяем бронирования и заблокированные слоты по карте занятости
         if is_available:
-            conflicting_slots = TimeSlot.objects.filter(
-                court=court,
-                date=booking_date,
-                start_time__lt=end_dt.time(),
-                end_time__gt=start_dt.time(),
-                is_blocked=True
+            conflict = get_day_availability(court.id, booking_date).conflict(
+                start_dt.time(), end_dt.time(), user_id=request.user.id
             )
-            
-            if conflicting_slots.exists():
+            if conflict:
                 is_available = False
-                conflict_message = "Выбранное время временно недоступно"
+                conflict_message = AVAILABILITY_CONFLICT_MESSAGES[conflict]
         
-        # Рассчитываем стоимость
-        total_price = 0
-        if not court.is_free:
-            total_price = float(court.price_per_hour * hours)
+        # Рассчитываем стоимость по вектору цен дня
+        total_price = float(quote_price(court, booking_date, start_dt.time(), hours))
         
         return JsonResponse({
             'available': is_available,
@@ -785,38 +888,20 @@ def get_time_slots(request, court_id):
     except ValueError:
         return JsonResponse({'error': 'Неверный формат даты'}, status=400)
     
-    # Получаем все слоты на указанную дату
-    time_slots = TimeSlot.objects.filter(
-        court=court,
-        date=query_date
-    ).order_by('start_time')
-    
-    # Формируем список доступных слотов
-    available_slots = []
-    current_time = court.opening_time
-    
-    while current_time < court.closing_time:
-        slot_end = (datetime.combine(date.today(), current_time) + timedelta(hours=1)).time()
-        
-        # Проверяем, доступен ли этот слот
-        is_booked = False
-        is_blocked = False
-        
-        slot = time_slots.filter(start_time=current_time).first()
-        if slot:
-            is_booked = slot.is_booked
-            is_blocked = slot.is_blocked
-        
-        available_slots.append({
-            'start_time': current_time.strftime('%H:%M'),
-            'end_time': slot_end.strftime('%H:%M'),
-            'available': not (is_booked or is_blocked),
-            'is_booked': is_booked,
-            'is_blocked': is_blocked,
-            'price': float(slot.price) if slot and slot.price else float(court.price_per_hour),
-        })
-        
-        current_time = slot_end
+    # Часовые слоты из общей сетки: занятость - из карты дня, цены - одним запросом
+    grid = build_slot_grid(court, [query_date], step_minutes=60, mark_past=False, user_id=request.user.id)
+    available_slots = [
+        {
+            'start_time': slot['start_time'],
+            'end_time': slot['end_time'],
+            'available': slot['state'] == 'free',
+            'is_booked': slot['state'] == 'booked',
+            'is_blocked': slot['state'] == 'blocked',
+            'free_courts': slot['free_courts'],
+            'price': slot['price'],
+        }
+        for slot in grid[0]['slots']
+    ]
     
     return JsonResponse({
         'court_id': court.id,
@@ -829,65 +914,69 @@ def get_time_slots(request, court_id):
         'slots': available_slots,
     })
 
-def court_detail_api(request, court_id):
-    """API для получения детальной информации о площадке"""
+@require_GET
+def court_slot_grid_api(request, court_id):
+    """Сетка слотов площадки на несколько дней: ?date_from=&days=&step="""
     court = get_object_or_404(VolleyballCourt, id=court_id)
-    
-    # Получаем отзывы
-    reviews = Review.objects.filter(court=court, is_published=True).order_by('-created_at')[:5]
-    reviews_data = []
-    
-    for review in reviews:
-        reviews_data.append({
-            'user': review.user.username,
-            'rating': float(review.average_rating),
-            'title': review.title,
-            'comment': review.comment,
-            'pros': review.pros,
-            'cons': review.cons,
-            'created_at': review.created_at.strftime('%d.%m.%Y'),
-        })
-    
-    # Средний рейтинг
-    avg_rating = Review.objects.filter(court=court, is_published=True).aggregate(
-        avg=Avg('rating_overall')
-    )['avg'] or 0
-    
-    data = {
-        'id': court.id,
-        'name': court.name,
-        'address': court.address,
-        'city': court.city,
-        'court_type': court.court_type,
-        'court_type_display': court.get_court_type_display(),
-        'price_per_hour': float(court.price_per_hour) if court.price_per_hour else 0,
-        'is_free': court.is_free,
-        'is_lighted': court.is_lighted,
-        'has_parking': court.has_parking,
-        'has_showers': court.has_showers,
-        'has_cafe': court.has_cafe,
-        'has_locker_rooms': court.has_locker_rooms,
-        'has_equipment_rental': court.has_equipment_rental,
-        'description': court.description,
-        'phone': court.phone,
-        'website': court.website,
-        'photo_url': court.photo_url,
-        'opening_time': str(court.opening_time),
-        'closing_time': str(court.closing_time),
-        'working_days': court.working_days,
-        'booking_enabled': court.booking_enabled,
+
+    try:
+        date_from = datetime.strptime(request.GET['date_from'], '%Y-%m-%d').date() if request.GET.get('date_from') else timezone.localdate()
+        days = int(request.GET.get('days', DEFAULT_GRID_DAYS))
+        step = int(request.GET.get('step', DEFAULT_GRID_STEP))
+    except ValueError:
+        return JsonResponse({'success': False, 'error': 'Неверные параметры сетки'}, status=400)
+
+    if not 1 <= days <= MAX_GRID_DAYS:
+        return JsonResponse({'success': False, 'error': f'Можно запросить от 1 до {MAX_GRID_DAYS} дней'}, status=400)
+    if step not in GRID_STEPS:
+        return JsonResponse({'success': False, 'error': 'Шаг сетки: ' + ', '.join(map(str, GRID_STEPS)) + ' минут'}, status=400)
+
+    return JsonResponse({
+        'success': True,
+        'court_id': court.id,
+        'court_name': court.name,
+        'opening_time': court.opening_time.strftime('%H:%M'),
+        'closing_time': court.closing_time.strftime('%H:%M'),
         'min_booking_hours': court.min_booking_hours,
         'max_booking_hours': court.max_booking_hours,
         'advance_booking_days': court.advance_booking_days,
-        'rating': float(avg_rating),
-        'reviews_count': Review.objects.filter(court=court, is_published=True).count(),
-        'reviews': reviews_data,
-    }
-    
-    if court.latitude and court.longitude:
-        data['latitude'] = float(court.latitude)
-        data['longitude'] = float(court.longitude)
-    
+        'step': step,
+        'days': build_slot_grid(court, grid_dates(date_from, days), step_minutes=step, user_id=request.user.id),
+    })
+
+def court_detail_api(request, court_id):
+    """API для получения детальной информации о площадке"""
+    try:
+        fields = parse_fields(request.GET.get('fields'), COURT_DETAIL_FIELDS + COURT_DETAIL_EXTRA_FIELDS)
+    except ValueError as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=400)
+
+    bundle = get_court_bundle(court_id)
+    if bundle is None:
+        raise Http404('Площадка не найдена')
+
+    serializer = CourtSerializer(COURT_DETAIL_FIELDS, fields)
+    court = bundle['court']
+    data = serializer.serialize({column: getattr(court, column) for column in serializer.columns})
+
+    if fields is None or 'reviews' in fields:
+        data['reviews'] = [
+            {
+                'user': review.user.username,
+                'rating': float(review.average_rating),
+                'title': review.title,
+                'comment': review.comment,
+                'pros': review.pros,
+                'cons': review.cons,
+                'created_at': review.created_at.strftime('%d.%m.%Y'),
+            }
+            for review in bundle['reviews'][:5]
+        ]
+    if fields is None or 'rating' in fields:
+        data['rating'] = bundle['avg_review_rating']
+    if fields is None or 'reviews_count' in fields:
+        data['reviews_count'] = bundle['reviews_count']
+
     return JsonResponse(data)
 
 # ============================================================================
@@ -1086,75 +1175,134 @@ def courts_api(request):
     status = request.GET.get('status', 'approved')
     court_type = request.GET.get('type', '')
     city = request.GET.get('city', '')
-    
+
+    # Окно просмотра карты: bbox=minLng,minLat,maxLng,maxLat&zoom=
+    bbox = None
+    zoom = None
+    try:
+        if request.GET.get('bbox'):
+            bbox = parse_bbox(request.GET['bbox'])
+        zoom = parse_zoom(request.GET.get('zoom'))
+    except ValueError as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=400)
+
+    try:
+        serializer = CourtSerializer(
+            COURTS_API_FIELDS,
+            parse_fields(request.GET.get('fields'), COURTS_API_FIELDS)
+        )
+        output_format = parse_format(request.GET.get('format'))
+    except ValueError as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=400)
+
+    # Потоковая выдача для больших выгрузок (status=all, ночная синхронизация)
+    stream = request.GET.get('stream') == 'true'
+    if stream and output_format == 'columnar':
+        return JsonResponse({'success': False, 'error': 'Потоковая выдача доступна только в формате json'}, status=400)
+
+    # Инкрементальная синхронизация: since=<cursor> из прошлого ответа
+    since = None
+    if request.GET.get('since'):
+        try:
+            since = parse_sync_cursor(request.GET['since'])
+        except ValueError as e:
+            return JsonResponse({'success': False, 'error': str(e)}, status=400)
+        if is_cursor_expired(since):
+            # Отметки об удалении уже не хранятся - отдаём полный список
+            since = None
+    cursor = make_sync_cursor()
+
+    if bbox and zoom is not None:
+        # Выравниваем окно по тайловой сетке, чтобы мелкие сдвиги карты
+        # давали одинаковый запрос
+        bbox = snap_bbox_to_tiles(bbox, zoom)
+
     # Базовый queryset
     if status == 'all':
         courts = VolleyballCourt.objects.all()
     else:
         courts = VolleyballCourt.objects.filter(status=status, is_active=True)
-    
+
+    # Фильтр по видимой области карты
+    if bbox:
+        courts = courts.filter(bbox_q(bbox))
+
     # Фильтр по типу
     if court_type:
         courts = courts.filter(court_type=court_type)
-    
+
     # Фильтр по городу
     if city:
         courts = courts.filter(city__icontains=city)
-    
-    # Подготавливаем данные
-    courts_data = []
-    for court in courts:
-        court_info = {
-            'id': court.id,
-            'name': court.name,
-            'address': court.address,
-            'city': court.city,
-            'court_type': court.court_type,
-            'court_type_display': court.get_court_type_display(),
-            'status': court.status,
-            'status_display': court.get_status_display(),
-            'is_free': court.is_free,
-            'price': float(court.price_per_hour) if court.price_per_hour else 0,
-            'is_lighted': court.is_lighted,
-            'has_parking': court.has_parking,
-            'has_showers': court.has_showers,
-            'has_cafe': court.has_cafe,
-            'description': court.description or '',
-            'phone': court.phone or '',
-            'website': court.website or '',
-            'photo_url': court.photo_url or '',
-            'created_at': court.created_at.strftime('%d.%m.%Y'),
-            'suggested_by': court.suggested_by.username if court.suggested_by else 'Неизвестно',
-            'booking_enabled': court.booking_enabled,
-        }
-        
-        # Координаты
-        if court.latitude and court.longitude:
-            court_info['latitude'] = float(court.latitude)
-            court_info['longitude'] = float(court.longitude)
-        else:
-            # Значения по умолчанию для города
-            if court.city == 'Москва':
-                court_info['latitude'] = 55.7558
-                court_info['longitude'] = 37.6173
-            elif court.city == 'Санкт-Петербург':
-                court_info['latitude'] = 59.9343
-                court_info['longitude'] = 30.3351
-            else:
-                court_info['latitude'] = 55.7558
-                court_info['longitude'] = 37.6173
-        
-        courts_data.append(court_info)
-    
-    return JsonResponse({
-        'success': True,
-        'courts': courts_data,
-        'count': len(courts_data),
+
+    removed = []
+    if since:
+        removed = removed_court_ids(courts, since)
+        courts = courts.filter(updated_at__gt=since)
+
+    meta = {
+        'removed': removed,
+        'full': since is None,
+        'cursor': cursor,
         'filters': {
             'status': status,
             'type': court_type,
-            'city': city
+            'city': city,
+            'bbox': list(bbox) if bbox else None,
+            'zoom': zoom,
         }
+    }
+
+    if stream:
+        # Площадки пишутся в ответ по мере чтения из БД - память воркера
+        # не растёт с размером таблицы
+        streamed = [0]
+
+        def iter_courts():
+            for court in serializer.iter_queryset(courts):
+                streamed[0] += 1
+                yield court
+
+        return streaming_json_response(request, iter_json_object(
+            {'success': True, 'format': output_format},
+            'courts',
+            iter_courts(),
+            lambda: {'count': streamed[0], **meta}
+        ))
+
+    courts_data = serializer.serialize_queryset(courts)
+    count = len(courts_data)
+    if output_format == 'columnar':
+        courts_data = to_columnar(courts_data, serializer.keys)
+
+    return compressed_json_response(request, {
+        'success': True,
+        'format': output_format,
+        'courts': courts_data,
+        'count': count,
+        **meta,
+    })
+
+@require_GET
+def courts_clusters_api(request):
+    """API кластеров площадок для карты (zoom обязателен, bbox - по желанию)"""
+    try:
+        zoom = parse_zoom(request.GET.get('zoom'))
+        bbox = parse_bbox(request.GET['bbox']) if request.GET.get('bbox') else None
+    except ValueError as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=400)
+
+    if zoom is None:
+        return JsonResponse({'success': False, 'error': 'Не указан zoom'}, status=400)
+
+    clusters = get_clusters_in_bbox(zoom, bbox)
+
+    return JsonResponse({
+        'success': True,
+        'zoom': zoom,
+        'clusters': clusters,
+        'count': len(clusters),
+        'courts_count': sum(cluster['count'] for cluster in clusters),
     })
 
 # ============================================================================
@@ -1186,31 +1334,18 @@ def create_game(request):
                 game.is_active = True
 
                 # Если выбрана площадка, заполняем автоматически location
+                # (одобрение и часы работы площадки проверены в форме)
                 court = form.cleaned_data.get('court')
                 if court:
                     game.court = court
                     game.location = f"{court.name}, {court.address}"
 
-                    # Проверяем, что площадка одобрена
-                    if court.status != 'approved':
-                        messages.error(request, 'Выбранная площадка еще не одобрена')
-                        return redirect('create_game')
-
-                    # Проверяем доступность времени на площадке
-                    game_date = form.cleaned_data.get('game_date')
-                    game_time = form.cleaned_data.get('game_time')
-                    end_time = form.cleaned_data.get('end_time')
-
-                    # Проверяем время работы
-                    if game_time < court.opening_time:
-                        messages.error(request, f'Площадка открывается в {court.opening_time.strftime("%H:%M")}')
-                        return redirect('create_game')
-
-                    if end_time and end_time > court.closing_time:
-                        messages.error(request, f'Площадка закрывается в {court.closing_time.strftime("%H:%M")}')
-                        return redirect('create_game')
-
-                game.save()
+                # Время площадки перепроверяется под блокировкой вместе с бронями
+                try:
+                    schedule_game(game)
+                except BookingConflict as e:
+                    messages.error(request, str(e))
+                    return redirect('create_game')
 
                 # Автоматически добавляем организатора как участника
                 game.participants.add(request.user)
@@ -1882,34 +2017,23 @@ def update_court_rating(court):
 # ============================================================================
 
 def court_detail(request, court_id):
-    """Детальн��я страница площадки"""
-    
-    court = get_object_or_404(VolleyballCourt, id=court_id, status='approved')
-    
-    # Получаем отзывы
-    reviews = Review.objects.filter(court=court, is_published=True).order_by('-created_at')
-    
-    # Получаем фотографии
-    photos = CourtPhoto.objects.filter(court=court).order_by('-is_main')
-    
-    # Проверяем, может ли пользователь оставить отзыв
-    can_review = False
-    if request.user.is_authenticated:
-        has_booking = CourtBooking.objects.filter(
-            court=court,
-            user=request.user,
-            status__in=['confirmed', 'completed']
-        ).exists()
-        has_review = Review.objects.filter(court=court, user=request.user).exists()
-        can_review = has_booking and not has_review
-    
+    """Детальная страница площадки"""
+
+    # Площадка, отзывы, фото и счётчики - из кэша страницы площадки
+    bundle = get_court_bundle(court_id)
+    if bundle is None or bundle['court'].status != 'approved':
+        raise Http404('Площадка не найдена')
+
+    court = bundle['court']
+
     context = {
         'page_title': court.name,
         'court': court,
-        'reviews': reviews,
-        'photos': photos,
-        'can_review': can_review,
-        'reviews_count': reviews.count(),
+        'reviews': bundle['reviews'],
+        'photos': bundle['photos'],
+        # Проверяем, может ли пользователь оставить отзыв
+        'can_review': user_can_review(request.user, court_id),
+        'reviews_count': bundle['reviews_count'],
         'avg_rating': court.rating,
     }
     
@@ -2241,19 +2365,28 @@ def search_courts_view(request):
 
 
 def search_courts_api(request):
-    """API для поиска волейбольных площадок"""
-    query = request.GET.get('query', '')
-    court_type = request.GET.get('court_type', '')
-    surface = request.GET.get('surface', '')
-    city = request.GET.get('city', '')
-    price_min = request.GET.get('price_min', '')
-    price_max = request.GET.get('price_max', '')
-    free_only = request.GET.get('free_only', '') == 'true'
-    with_lighting = request.GET.get('with_lighting', '') == 'true'
-    with_parking = request.GET.get('with_parking', '') == 'true'
-    with_showers = request.GET.get('with_showers', '') == 'true'
-    with_locker_rooms = request.GET.get('with_locker_rooms', '') == 'true'
-    with_equipment = request.GET.get('with_equipment', '') == 'true'
+    """
+    API для поиска волейбольных площадок
+
+    Результаты ранжируются по релевантности запроса query. Без limit и
+    cursor отдаются все площадки, как раньше; с ними - страницами по
+    limit штук. Курсор следующей страницы - в заголовке X-Next-Cursor
+    (в колоночном формате - в поле next_cursor).
+    """
+    try:
+        serializer = CourtSerializer(SEARCH_FIELDS, parse_fields(request.GET.get('fields'), SEARCH_FIELDS))
+        output_format = parse_format(request.GET.get('format'))
+        cursor = decode_cursor(request.GET['cursor']) if request.GET.get('cursor') else None
+    except ValueError as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=400)
+
+    limit = None
+    if request.GET.get('limit') or cursor is not None:
+        limit = parse_page_size(request.GET.get('limit'))
+    filters = parse_court_filters(request.GET)
+    query = filters['query'].strip()
+    # Текстовый запрос обрабатывает полнотекстовый поиск, а не icontains
+    filters['query'] = ''
 
     # Начинаем с базового QuerySet
     courts = VolleyballCourt.objects.filter(
@@ -2262,74 +2395,141 @@ def search_courts_api(request):
     )
 
     # Применяем фильтры
-    if query:
-        courts = courts.filter(
-            Q(name__icontains=query) | Q(address__icontains=query)
-        )
+    courts = apply_court_filters(courts, filters)
+
+    page = search_courts(courts, query, cursor=cursor, limit=limit)
+    rows = list(page.values(*serializer.columns, 'search_rank'))
+    courts_data = [serializer.serialize(row) for row in rows]
+
+    next_cursor = None
+    if limit is not None and len(rows) == limit:
+        next_cursor = encode_cursor(rows[-1]['search_rank'], rows[-1]['id'])
+
+    if output_format == 'columnar':
+        # Колоночный формат - объект вместо списка
+        return compressed_json_response(request, {
+            'format': output_format,
+            'courts': to_columnar(courts_data, serializer.keys),
+            'count': len(courts_data),
+            'next_cursor': next_cursor,
+        })
 
-    if court_type:
-        courts = courts.filter(court_type=court_type)
+    response = compressed_json_response(request, courts_data, safe=False)
+    if next_cursor:
+        response['X-Next-Cursor'] = next_cursor
+    return response
 
-    if surface:
-        courts = courts.filter(surface=surface)
 
-    if city:
-        courts = courts.filter(city__icontains=city)
+@require_GET
+def courts_autocomplete_api(request):
+    """Подсказки площадок для поля ввода: ?q=&limit="""
+    try:
+        limit = max(1, min(int(request.GET.get('limit', AUTOCOMPLETE_DEFAULT_LIMIT)), AUTOCOMPLETE_MAX_LIMIT))
+    except ValueError:
+        limit = AUTOCOMPLETE_DEFAULT_LIMIT
 
-    if price_min:
-        try:
-            price_min_val = int(price_min)
-            courts = courts.filter(price_per_hour__gte=price_min_val)
-        except ValueError:
-            pass
+    suggestions = autocomplete_courts(request.GET.get('q', ''), limit)
+    return JsonResponse({
+        'success': True,
+        'suggestions': suggestions,
+    })
 
-    if price_max:
-        try:
-            price_max_val = int(price_max)
-            courts = courts.filter(price_per_hour__lte=price_max_val)
-        except ValueError:
-            pass
 
-    if free_only:
-        courts = courts.filter(is_free=True)
+@require_GET
+def courts_facets_api(request):
+    """Счётчики по значениям фильтров поиска (те же параметры, что у search_courts_api)"""
+    facets = get_court_facets(parse_court_filters(request.GET))
+    return JsonResponse({
+        'success': True,
+        'facets': facets,
+    })
 
-    if with_lighting:
-        courts = courts.filter(is_lighted=True)
 
-    if with_parking:
-        courts = courts.filter(has_parking=True)
+@require_GET
+def courts_nearest_api(request):
+    """API ближайших площадок: ?lat=&lng=&k=&radius= и фильтры поиска"""
+    try:
+        lat = float(request.GET['lat'])
+        lng = float(request.GET['lng'])
+    except (KeyError, ValueError):
+        return JsonResponse({'success': False, 'error': 'Укажите координаты lat и lng'}, status=400)
 
-    if with_showers:
-        courts = courts.filter(has_showers=True)
+    if not (-90 <= lat <= 90 and -180 <= lng <= 180):
+        return JsonResponse({'success': False, 'error': 'Координаты вне допустимого диапазона'}, status=400)
 
-    if with_locker_rooms:
-        courts = courts.filter(has_locker_rooms=True)
+    try:
+        k = int(request.GET.get('k', DEFAULT_K))
+        radius_km = float(request.GET.get('radius', DEFAULT_RADIUS_KM))
+    except ValueError:
+        return JsonResponse({'success': False, 'error': 'Неверные параметры k или radius'}, status=400)
 
-    if with_equipment:
-        courts = courts.filter(has_equipment_rental=True)
+    k = max(1, min(k, MAX_K))
+    radius_km = max(0.0, min(radius_km, MAX_RADIUS_KM))
 
-    # Получаем значения
-    courts = courts.values(
-        'id', 'name', 'address', 'latitude', 'longitude',
-        'court_type', 'surface', 'is_free', 'is_lighted',
-        'has_parking', 'has_showers', 'has_locker_rooms',
-        'has_equipment_rental', 'has_cafe', 'description',
-        'status', 'price_per_hour', 'opening_time', 'closing_time',
-        'city', 'rating'
-    )
+    courts = find_nearest_courts(lat, lng, k=k, radius_km=radius_km, filters=parse_court_filters(request.GET))
 
-    # Преобразуем Decimal значения в float для JSON сериализации
-    courts_list = []
-    for court in courts:
-        court_dict = {}
-        for key, value in court.items():
-            if isinstance(value, decimal.Decimal):
-                court_dict[key] = float(value)
-            else:
-                court_dict[key] = value
-        courts_list.append(court_dict)
+    return JsonResponse({
+        'success': True,
+        'courts': courts,
+        'count': len(courts),
+    })
 
-    return JsonResponse(courts_list, safe=False)
+
+@require_GET
+def courts_free_windows_api(request):
+    """
+    Свободное время по всем подходящим площадкам:
+    ?hours=&date_from=&date_to=&lat=&lng=&radius=&sort=start|distance&limit= и фильтры поиска
+    """
+    try:
+        hours = int(request.GET.get('hours', 1))
+    except ValueError:
+        return JsonResponse({'success': False, 'error': 'Неверная длительность'}, status=400)
+    if not 1 <= hours <= 24:
+        return JsonResponse({'success': False, 'error': 'Длительность должна быть от 1 до 24 часов'}, status=400)
+
+    lat = lng = None
+    radius_km = DEFAULT_RADIUS_KM
+    if request.GET.get('lat') or request.GET.get('lng'):
+        try:
+            lat = float(request.GET['lat'])
+            lng = float(request.GET['lng'])
+            radius_km = float(request.GET.get('radius', DEFAULT_RADIUS_KM))
+        except (KeyError, ValueError):
+            return JsonResponse({'success': False, 'error': 'Неверные координаты или радиус'}, status=400)
+        if not (-90 <= lat <= 90 and -180 <= lng <= 180):
+            return JsonResponse({'success': False, 'error': 'Координаты вне допустимого диапазона'}, status=400)
+        radius_km = max(0.0, min(radius_km, MAX_RADIUS_KM))
+
+    sort = request.GET.get('sort', 'start')
+    if sort not in FREE_WINDOWS_SORT_OPTIONS:
+        return JsonResponse({'success': False, 'error': 'Неверная сортировка'}, status=400)
+    if sort == 'distance' and lat is None:
+        return JsonResponse({'success': False, 'error': 'Для сортировки по расстоянию укажите lat и lng'}, status=400)
+
+    try:
+        limit = max(1, min(int(request.GET.get('limit', FREE_WINDOWS_DEFAULT_LIMIT)), FREE_WINDOWS_MAX_LIMIT))
+    except ValueError:
+        limit = FREE_WINDOWS_DEFAULT_LIMIT
+
+    try:
+        date_from, date_to = parse_date_range(
+            request.GET.get('date_from'), request.GET.get('date_to'), timezone.localdate()
+        )
+    except ValueError as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=400)
+
+    courts = candidate_courts(parse_court_filters(request.GET), lat, lng, radius_km)
+    windows = find_free_windows(courts, hours, date_from, date_to, sort=sort, limit=limit)
+
+    return JsonResponse({
+        'success': True,
+        'hours': hours,
+        'date_from': date_from.isoformat(),
+        'date_to': date_to.isoformat(),
+        'windows': windows,
+        'count': len(windows),
+    })
 
 """
 API views для приложения myapp
@@ -113,6 +113,17 @@ if DEBUG:
             'BACKEND': 'django.core.cache.backends.dummy.DummyCache',
         }
     }
+else:
+    # Кэш должен быть общим для всех воркеров gunicorn: снимки карты
+    # сбрасываются сигналами в том воркере, где изменили площадку.
+    # По умолчанию - файловый кэш, для Redis/Memcached задайте
+    # CACHE_BACKEND и CACHE_LOCATION.
+    CACHES = {
+        'default': {
+            'BACKEND': os.getenv('CACHE_BACKEND', 'django.core.cache.backends.filebased.FileBasedCache'),
+            'LOCATION': os.getenv('CACHE_LOCATION', str(BASE_DIR / '.cache')),
+        }
+    }
 
 
 # =============================================================================
@@ -125,6 +136,11 @@ if os.getenv("USE_SQLITE") == "True":
         "default": {
             "ENGINE": "django.db.backends.sqlite3",
             "NAME": BASE_DIR / "db.sqlite3",
+            # Параллельные брони ждут блокировку, а не падают с "database is locked"
+            "OPTIONS": {"timeout": 20},
+            # Тестовая база в файле: потоки тестов конкурентности работают
+            # с ней через отдельные соединения
+            "TEST": {"NAME": BASE_DIR / "test_db.sqlite3"},
         }
     }
     print("Use SQLITE")